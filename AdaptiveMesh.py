@@ -0,0 +1,108 @@
+import numpy
+from scipy.optimize import OptimizeResult
+
+
+# Returns sample points spanning the same interval as xSamplePoints that equidistribute the arc length monitor
+#   M = sqrt(1 + (gradientWeight * dy/dx)^2)
+# of state, so each new cell holds the same share of the solution curve's length and points cluster where the gradient is large.
+# The monitor is smoothed with a few (1, 2, 1) passes to keep neighbouring spacings similar, and capped at maximumRefinement so
+# the smallest cell is at most about maximumRefinement times smaller than an evenly spaced one. The end points never move.
+def EquidistributeGrid(xSamplePoints, state, gradientWeight=1.0, maximumRefinement=20.0, smoothingPasses=4):
+    xSamplePoints = numpy.asarray(xSamplePoints, dtype=float)
+    spacing = numpy.diff(xSamplePoints)
+
+    # One monitor value per cell
+    slope = numpy.diff(state) / spacing
+    monitor = numpy.minimum(numpy.sqrt(1.0 + (gradientWeight * slope)**2), maximumRefinement)
+    for smoothingPass in range(0, smoothingPasses):
+        monitor[1:-1] = 0.25 * monitor[:-2] + 0.5 * monitor[1:-1] + 0.25 * monitor[2:]
+
+    # Invert the cumulative monitor integral at evenly spaced levels
+    arcLength = numpy.concatenate(([0.0], numpy.cumsum(monitor * spacing)))
+    newXSamplePoints = numpy.interp(numpy.linspace(0.0, arcLength[-1], len(xSamplePoints)), arcLength, xSamplePoints)
+    newXSamplePoints[0] = xSamplePoints[0]
+    newXSamplePoints[-1] = xSamplePoints[-1]
+    return newXSamplePoints
+
+
+# Solves a DifferentialSystem on a moving grid: the time samples are integrated in segments of remeshInterval output steps, and
+# between segments the grid is rebuilt with EquidistributeGrid and the state is linearly interpolated onto it. The number of
+# points stays the same, so a steep front is resolved with far fewer unknowns than an evenly refined rod needs.
+# Any integration method of the system can be used. The result holds y at every output time like SolveSystem, plus x, the
+# (points, times) grid each column of y lives on; GetSolutionOn interpolates it onto a fixed grid.
+class AdaptiveMeshSolver:
+    # Local Variables
+    differentialSystem = None
+    remeshInterval = None
+    gradientWeight = None
+    maximumRefinement = None
+    numberOfRemeshes = 0
+
+
+    def __init__(self, differentialSystem, remeshInterval=10, gradientWeight=1.0, maximumRefinement=20.0):
+        if int(remeshInterval) < 1:
+            raise ValueError("remeshInterval must be at least 1, got " + str(remeshInterval))
+        self.differentialSystem = differentialSystem
+        self.remeshInterval = int(remeshInterval)
+        self.gradientWeight = float(gradientWeight)
+        self.maximumRefinement = float(maximumRefinement)
+
+
+    # Moves the system onto a grid adapted to state and returns state interpolated onto it
+    def Remesh(self, state):
+        oldXSamplePoints = self.differentialSystem.xSamplePoints
+        newXSamplePoints = EquidistributeGrid(oldXSamplePoints, state, self.gradientWeight, self.maximumRefinement)
+        self.differentialSystem.SetGrid(newXSamplePoints)
+        self.numberOfRemeshes += 1
+        return numpy.interp(newXSamplePoints, oldXSamplePoints, state)
+
+
+    def Solve(self):
+        system = self.differentialSystem
+        timeSamplePoints = system.timeSamplePoints
+        n = len(system.xSamplePoints)
+        y = numpy.empty((n, len(timeSamplePoints)), dtype=float)
+        x = numpy.empty((n, len(timeSamplePoints)), dtype=float)
+        statistics = {'nfev': 0, 'njev': 0, 'nlu': 0}
+
+        print('...working...')
+        if system.instrumentation is not None:
+            system.instrumentation.StartSolve((timeSamplePoints[0], timeSamplePoints[-1]))
+
+        with system.TimedPhase('solve'):
+            # Adapt to the initial condition before the first segment
+            state = self.Remesh(system.initialState)
+            system.initialState = state
+            y[:, 0] = state
+            x[:, 0] = system.xSamplePoints
+
+            for start in range(0, len(timeSamplePoints) - 1, self.remeshInterval):
+                end = min(start + self.remeshInterval, len(timeSamplePoints) - 1)
+                segment = system.Integrate(timeSamplePoints[start:end + 1], state)
+                for name in statistics:
+                    statistics[name] += int(segment.get(name, 0))
+                if not segment.success:
+                    return self.GetResult(timeSamplePoints[:start + 1], y[:, :start + 1], x[:, :start + 1], segment.status, segment.message, statistics)
+
+                y[:, start + 1:end + 1] = segment.y[:, 1:]
+                x[:, start + 1:end + 1] = system.xSamplePoints[:, None]
+                state = segment.y[:, -1]
+                if end < len(timeSamplePoints) - 1:
+                    state = self.Remesh(state)
+
+        return self.GetResult(timeSamplePoints, y, x, 0, "The solver successfully reached the end of the integration interval.", statistics)
+
+
+    def GetResult(self, t, y, x, status, message, statistics):
+        result = OptimizeResult(t=t, y=y, x=x, sol=None, t_events=None, y_events=None, status=status, message=message, success=status >= 0,
+                                remeshes=self.numberOfRemeshes, **statistics)
+        self.differentialSystem.computationalSolution = result
+        if self.differentialSystem.instrumentation is not None:
+            self.differentialSystem.instrumentation.RecordSolution(result)
+        return result
+
+
+    # Interpolates every column of an adaptive solution onto the fixed grid xSamplePoints, giving a (points, times) array
+    @staticmethod
+    def GetSolutionOn(solution, xSamplePoints):
+        return numpy.stack([numpy.interp(xSamplePoints, solution.x[:, k], solution.y[:, k]) for k in range(0, len(solution.t))], axis=1)
@@ -0,0 +1,207 @@
+import base64
+import io
+import itertools
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy
+
+
+# Renders a solution to an MP4, GIF or HTML file without a display. Frames are drawn with the Agg canvas directly (no pyplot
+# and no interactive backend): the axes are drawn once, and every frame restores that background and draws only the line and
+# its title (blitting). Only the output times needed for the requested frame rate and duration are read, and each frame is
+# reduced to at most maximumPoints points, keeping the minimum and maximum of every bucket of points so narrow spikes and
+# fronts stay visible. With numberOfWorkers > 1 the frames are rendered to PNG files by worker processes and then encoded.
+# MP4 output needs ffmpeg (matplotlib's animation.ffmpeg_path), GIF and HTML output use Pillow.
+defaultFramesPerSecond = 30
+defaultDuration = 10.0
+defaultMaximumPoints = 2000
+# Frames whose columns are read and downsampled at once
+framesPerBlock = 16
+supportedExtensions = ('.mp4', '.gif', '.html')
+
+
+# Returns the indices of the output times shown when t is played in duration seconds at framesPerSecond, evenly spaced in time.
+# Every output time is shown when there are fewer than that many.
+def GetFrameIndices(t, framesPerSecond=defaultFramesPerSecond, duration=defaultDuration):
+    t = numpy.asarray(t, dtype=float)
+    numberOfFrames = max(2, int(round(framesPerSecond * duration)))
+    if numberOfFrames >= len(t):
+        return numpy.arange(len(t))
+
+    indices = numpy.searchsorted(t, numpy.linspace(t[0], t[-1], numberOfFrames))
+    return numpy.unique(numpy.clip(indices, 0, len(t) - 1))
+
+
+# Reduces the columns of y (points, frames) to at most maximumPoints points each. Points are split into buckets and every bucket
+# keeps its minimum and maximum, in x order. x is either shared (points) or per column (points, frames).
+# Returns (x, y), both (reduced points, frames).
+def DownsampleMinMax(x, y, maximumPoints=defaultMaximumPoints):
+    x = numpy.asarray(x, dtype=float)
+    y = numpy.asarray(y, dtype=float)
+    n = y.shape[0]
+    if n <= maximumPoints:
+        return (numpy.broadcast_to(x[:, None], y.shape) if x.ndim == 1 else x), y
+
+    bucketSize = -(-n // max(1, maximumPoints // 2))
+    numberOfBuckets = -(-n // bucketSize)
+    # The last bucket is padded by repeating the last point
+    index = numpy.minimum(numpy.arange(numberOfBuckets * bucketSize), n - 1).reshape(numberOfBuckets, bucketSize)
+    blocks = y[index]
+    buckets = numpy.arange(numberOfBuckets)[:, None]
+    minimumIndex = index[buckets, numpy.argmin(blocks, axis=1)]
+    maximumIndex = index[buckets, numpy.argmax(blocks, axis=1)]
+
+    pointIndex = numpy.stack([numpy.minimum(minimumIndex, maximumIndex), numpy.maximum(minimumIndex, maximumIndex)], axis=1).reshape(2 * numberOfBuckets, -1)
+    reducedX = x[pointIndex] if x.ndim == 1 else numpy.take_along_axis(x, pointIndex, axis=0)
+    return reducedX, numpy.take_along_axis(y, pointIndex, axis=0)
+
+
+# Draws frames on an off-screen Agg figure, redrawing only the animated line and title over a cached background
+class FrameRenderer:
+    # Local Variables
+    figure = None
+    canvas = None
+    line = None
+    title = None
+    background = None
+
+
+    def __init__(self, xLimits, yLimits, figureSize=(6.4, 4.8), dpi=100):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.figure = Figure(figsize=figureSize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        axes = self.figure.add_subplot()
+        axes.set_xlim(xLimits[0], xLimits[1])
+        axes.set_ylim(yLimits[0] - 1, yLimits[1] + 1)
+        axes.set(xlabel='Point on rod', ylabel='Value')
+        self.line, = axes.plot([], [], animated=True)
+        self.title = axes.text(0.5, 1.02, '', transform=axes.transAxes, horizontalalignment='center', verticalalignment='bottom', animated=True)
+
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+
+    # Returns the frame as a (height, width, 4) RGBA array
+    def Render(self, x, y, title):
+        self.canvas.restore_region(self.background)
+        self.line.set_data(x, y)
+        self.title.set_text(title)
+        self.figure.draw_artist(self.line)
+        self.figure.draw_artist(self.title)
+        return numpy.asarray(self.canvas.buffer_rgba()).copy()
+
+
+# Renders one worker's frames to numbered PNG files. Module level so it can be sent to worker processes.
+def RenderFrameFiles(job):
+    from PIL import Image
+
+    renderer = FrameRenderer(**job['figure'])
+    for number, x, y, title in zip(job['numbers'], job['x'], job['y'], job['titles']):
+        Image.fromarray(renderer.Render(x, y, title)).save(os.path.join(job['directory'], 'frame' + str(number).zfill(6) + '.png'))
+    return len(job['numbers'])
+
+
+def WriteMP4(path, frames, framesPerSecond):
+    import matplotlib
+
+    frames = iter(frames)
+    first = next(frames)
+    height, width = first.shape[:2]
+    command = [matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgba',
+               '-s', str(width) + 'x' + str(height), '-r', str(framesPerSecond), '-i', '-',
+               '-vcodec', 'libx264', '-pix_fmt', 'yuv420p', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', path]
+    with subprocess.Popen(command, stdin=subprocess.PIPE) as process:
+        for frame in itertools.chain([first], frames):
+            process.stdin.write(frame.tobytes())
+        process.stdin.close()
+    if process.returncode != 0:
+        raise RuntimeError("ffmpeg failed with exit code " + str(process.returncode) + " writing " + path)
+
+
+def WriteGIF(path, frames, framesPerSecond):
+    from PIL import Image
+
+    images = (Image.fromarray(frame[:, :, :3]) for frame in frames)
+    first = next(images)
+    first.save(path, save_all=True, append_images=images, duration=int(round(1000 / framesPerSecond)), loop=0)
+
+
+# Writes a self-contained page that plays the PNG encoded frames, with a slider to scrub through them
+def WriteHTML(path, frames, framesPerSecond):
+    from PIL import Image
+
+    with open(path, 'wt') as fileStream:
+        fileStream.write('<!DOCTYPE html>\n<html><body>\n<img id="frame"><br>\n<input id="slider" type="range" min="0" value="0" style="width: 640px">\n'
+                         '<button id="play">Play / pause</button>\n<script>\nconst frames = [\n')
+        for frame in frames:
+            buffer = io.BytesIO()
+            Image.fromarray(frame).save(buffer, format='png')
+            fileStream.write('"data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii') + '",\n')
+        fileStream.write('];\n'
+                         'const image = document.getElementById("frame"), slider = document.getElementById("slider");\n'
+                         'let index = 0, timer = null;\n'
+                         'slider.max = frames.length - 1;\n'
+                         'function Show(i) { index = i; image.src = frames[i]; slider.value = i; }\n'
+                         'function Play() { timer = setInterval(() => Show((index + 1) % frames.length), ' + str(1000.0 / framesPerSecond) + '); }\n'
+                         'slider.oninput = () => Show(Number(slider.value));\n'
+                         'document.getElementById("play").onclick = () => { if (timer) { clearInterval(timer); timer = null; } else { Play(); } };\n'
+                         'Show(0);\nPlay();\n</script>\n</body></html>\n')
+
+
+# Renders the solution y (points, times) at output times t to path, whose extension (.mp4, .gif or .html) selects the format.
+# x holds the sample points, or one column of sample points per output time for adaptive meshes. Returns the number of frames.
+def RenderAnimation(path, x, t, y, framesPerSecond=defaultFramesPerSecond, duration=defaultDuration, maximumPoints=defaultMaximumPoints, numberOfWorkers=1,
+                    precision=2, figureSize=(6.4, 4.8), dpi=100):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in supportedExtensions:
+        raise ValueError("Unsupported animation format: " + extension + " (options: " + ", ".join(supportedExtensions) + ")")
+
+    x = numpy.asarray(x, dtype=float)
+    frameIndices = GetFrameIndices(t, framesPerSecond, duration)
+
+    # Read and reduce the shown columns a block at a time, so memory follows the frame count rather than the output times
+    frameX = []
+    frameY = []
+    for start in range(0, len(frameIndices), framesPerBlock):
+        indices = frameIndices[start:start + framesPerBlock]
+        blockX, blockY = DownsampleMinMax(x if x.ndim == 1 else x[:, indices], numpy.asarray(y[:, indices]), maximumPoints)
+        frameX.extend(blockX.T)
+        frameY.extend(blockY.T)
+
+    titles = [f't = {t[i]: .{precision}f}' for i in frameIndices]
+    figure = {'xLimits': (numpy.min(x), numpy.max(x)), 'yLimits': (min(map(numpy.min, frameY)), max(map(numpy.max, frameY))),
+              'figureSize': figureSize, 'dpi': dpi}
+    writers = {'.mp4': WriteMP4, '.gif': WriteGIF, '.html': WriteHTML}
+
+    if numberOfWorkers <= 1:
+        renderer = FrameRenderer(**figure)
+        writers[extension](path, (renderer.Render(frameX[k], frameY[k], titles[k]) for k in range(0, len(frameIndices))), framesPerSecond)
+        return len(frameIndices)
+
+    from PIL import Image
+
+    with tempfile.TemporaryDirectory() as directory:
+        numberOfJobs = min(len(frameIndices), 4 * numberOfWorkers)
+        jobs = []
+        for numbers in numpy.array_split(numpy.arange(len(frameIndices)), numberOfJobs):
+            jobs.append({'figure': figure, 'directory': directory, 'numbers': numbers.tolist(), 'x': [frameX[k] for k in numbers],
+                         'y': [frameY[k] for k in numbers], 'titles': [titles[k] for k in numbers]})
+        with ProcessPoolExecutor(max_workers=numberOfWorkers) as executor:
+            list(executor.map(RenderFrameFiles, jobs))
+
+        files = sorted(os.listdir(directory))
+        writers[extension](path, (numpy.asarray(Image.open(os.path.join(directory, name))) for name in files), framesPerSecond)
+
+    return len(frameIndices)
+
+
+# Renders the solution of a solved system, labelling frames with as many decimals as deltaT has
+def RenderSolution(differentialSystem, path, framesPerSecond=defaultFramesPerSecond, duration=defaultDuration, maximumPoints=defaultMaximumPoints, numberOfWorkers=1):
+    solution = differentialSystem.computationalSolution
+    precision = len(str(differentialSystem.deltaT).split('.')[-1])
+    x = solution.x if 'x' in solution else differentialSystem.xSamplePoints
+    return RenderAnimation(path, x, solution.t, solution.y, framesPerSecond, duration, maximumPoints, numberOfWorkers, precision)
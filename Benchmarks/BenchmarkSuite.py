@@ -0,0 +1,166 @@
+# Runs a fixed matrix of problems headlessly and records wall time, evaluation counts, peak traced memory and error against a
+# tight-tolerance reference solve. Results are written as JSON and can be compared with an earlier run to flag regressions.
+#
+# Run from the repository root, for example:
+#   python -m Benchmarks.BenchmarkSuite --quick --output benchmark.json
+#   python -m Benchmarks.BenchmarkSuite --output new.json --baseline benchmark.json --threshold 0.2
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy
+import scipy
+from scipy.integrate import solve_ivp
+from DifferentialSystem import DifferentialSystem
+from ProblemSpecification import ProblemSpecification
+from SolverInstrumentation import SolverInstrumentation
+
+
+gridSizes = [50, 500, 5000, 50000, 100000]
+quickGridSizes = [50, 500]
+timeHorizons = [0.1, 1.0, 10.0]
+quickTimeHorizons = [0.1, 1.0]
+# Every pairing the PDEs allow: at least one end must be a fixed value, and Bateman-Burgers only offers fixed values
+boundaryConditionPairings = {
+    "Heat": [("Fixed value", "Fixed value"), ("Fixed value", "Heat flux"), ("Fixed value", "Cooling"), ("Heat flux", "Fixed value"), ("Cooling", "Fixed value")],
+    "Bateman-Burgers": [("Fixed value", "Fixed value")],
+}
+# Number of output times of every case
+numberOfOutputTimes = 101
+# Reference solves are skipped above this grid size
+maximumReferencePoints = 5000
+referenceTolerance = 1.0e-12
+
+
+def GetSpecification(PDE, leftBoundaryCondition, rightBoundaryCondition, numberOfPoints, endTime):
+    specification = ProblemSpecification(numberOfPoints=numberOfPoints, startTime=0.0, endTime=endTime, deltaT=endTime / (numberOfOutputTimes - 1),
+                                         PDE=PDE, leftBoundaryCondition=leftBoundaryCondition, rightBoundaryCondition=rightBoundaryCondition,
+                                         leftFlux=1.0, rightFlux=-1.0, leftCoefficientOfCooling=2.0, rightCoefficientOfCooling=2.0)
+    if PDE == "Heat":
+        return specification.Replace(alpha=1.0, lateralCoefficientOfCooling=0.5, lateralAmbientY=0.0, leftStartingY=1.0, rightStartingY=0.0)
+    return specification.Replace(alpha=0.05, leftStartingY=1.0, rightStartingY=-1.0)
+
+
+def GetCaseName(specification):
+    return (specification.PDE + "|" + specification.leftBoundaryCondition + "|" + specification.rightBoundaryCondition
+            + "|n=" + str(specification.numberOfPoints) + "|T=" + str(specification.endTime))
+
+
+def GetCases(sizes, horizons):
+    cases = []
+    for PDE, pairings in boundaryConditionPairings.items():
+        for leftBoundaryCondition, rightBoundaryCondition in pairings:
+            for numberOfPoints in sizes:
+                for endTime in horizons:
+                    cases.append(GetSpecification(PDE, leftBoundaryCondition, rightBoundaryCondition, numberOfPoints, endTime))
+    return cases
+
+
+# Maximum absolute difference from a solve of the same semi-discrete system at a much tighter tolerance
+def GetReferenceError(differentialSystem):
+    solution = differentialSystem.computationalSolution
+    reference = solve_ivp(differentialSystem.GenerateOrdinaryDifferentialEquationSystem, (solution.t[0], solution.t[-1]), differentialSystem.initialState,
+                          method='Radau', t_eval=solution.t, atol=referenceTolerance, rtol=referenceTolerance, jac=differentialSystem.GenerateJacobian)
+    return float(numpy.max(numpy.abs(reference.y - solution.y)))
+
+
+# Every case is solved twice: once untraced for the wall time, as allocation tracing slows the array code unevenly, and once
+# under tracemalloc (and the instrumentation) for the peak memory and the evaluation counts, which do not depend on timing
+def RunCase(specification):
+    start = time.perf_counter()
+    differentialSystem = DifferentialSystem(specification)
+    solution = differentialSystem.SolveSystem()
+    wallSeconds = time.perf_counter() - start
+
+    instrumentation = SolverInstrumentation()
+    tracemalloc.start()
+    DifferentialSystem(specification, instrumentation).SolveSystem()
+    peakBytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    report = instrumentation.Report()
+    result = {
+        'name': GetCaseName(specification),
+        'specification': specification.ToDictionary(),
+        'success': bool(solution.success),
+        'wallSeconds': wallSeconds,
+        'peakBytes': peakBytes,
+        'rightHandSideEvaluations': report['rightHandSideEvaluations'],
+        'jacobianEvaluations': report['jacobianEvaluations'],
+        'solverStatistics': report['solverStatistics'],
+        'error': None,
+    }
+
+    # Solving the reference would dominate the run time on large grids
+    if solution.success and specification.numberOfPoints <= maximumReferencePoints:
+        result['error'] = GetReferenceError(differentialSystem)
+
+    return result
+
+
+def GetEnvironment():
+    return {'python': platform.python_version(), 'numpy': numpy.__version__, 'scipy': scipy.__version__, 'platform': platform.platform(),
+            'processor': platform.processor()}
+
+
+# Returns the metrics of cases that grew by more than threshold (a fraction) relative to the baseline run
+def FindRegressions(results, baseline, threshold):
+    baselineCases = {case['name']: case for case in baseline['cases']}
+    regressions = []
+    for case in results['cases']:
+        previous = baselineCases.get(case['name'])
+        if previous is None:
+            continue
+
+        for metric in ['wallSeconds', 'peakBytes', 'rightHandSideEvaluations', 'jacobianEvaluations', 'error']:
+            if case[metric] is None or previous[metric] is None or previous[metric] <= 0:
+                continue
+            ratio = case[metric] / previous[metric]
+            if ratio > 1.0 + threshold:
+                regressions.append({'name': case['name'], 'metric': metric, 'baseline': previous[metric], 'value': case[metric], 'ratio': ratio})
+
+        if previous['success'] and not case['success']:
+            regressions.append({'name': case['name'], 'metric': 'success', 'baseline': True, 'value': False, 'ratio': None})
+
+    return regressions
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Runs the benchmark matrix and optionally compares it against a baseline.')
+    parser.add_argument('--output', default='benchmark.json', help='JSON file the results are written to (default: benchmark.json)')
+    parser.add_argument('--quick', action='store_true', help='only run the small grid sizes and short horizons')
+    parser.add_argument('--sizes', type=int, nargs='+', help='grid sizes to run instead of the default matrix')
+    parser.add_argument('--horizons', type=float, nargs='+', help='end times to run instead of the default matrix')
+    parser.add_argument('--baseline', help='earlier results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative growth flagged as a regression (default: 0.2)')
+    options = parser.parse_args(arguments)
+
+    sizes = options.sizes or (quickGridSizes if options.quick else gridSizes)
+    horizons = options.horizons or (quickTimeHorizons if options.quick else timeHorizons)
+
+    results = {'environment': GetEnvironment(), 'cases': []}
+    for specification in GetCases(sizes, horizons):
+        case = RunCase(specification)
+        results['cases'].append(case)
+        error = 'n/a' if case['error'] is None else f"{case['error']:.2e}"
+        print(f"{case['name']:<55} {case['wallSeconds']:>9.3f} s {case['peakBytes'] / 1.0e6:>9.2f} MB "
+              f"{case['rightHandSideEvaluations']:>7} RHS {case['jacobianEvaluations']:>5} J  error {error}")
+
+    with open(options.output, 'wt') as fileStream:
+        json.dump(results, fileStream, indent=4)
+
+    if options.baseline is not None:
+        with open(options.baseline, 'rt') as fileStream:
+            baseline = json.load(fileStream)
+
+        regressions = FindRegressions(results, baseline, options.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['name']} {regression['metric']}: {regression['baseline']} -> {regression['value']}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# Builds many systems in one process, as a sweep or the solve server does over its lifetime, and checks that memory stays
+# flat: traced memory is sampled after every block of systems and the growth between the first and the last sample must stay
+# under a threshold. Systems are built from specifications that cycle through every PDE and boundary condition pairing and,
+# with --clone, by cloning one system with changed parameters and rebinding it to a new grid (see DifferentialSystem.Clone).
+# Exits with status 1 when memory grew. Run from the repository root with:
+#   python -m Benchmarks.ConstructionStressTest [--systems 100000] [--clone]
+import argparse
+import contextlib
+import gc
+import io
+import sys
+import time
+import tracemalloc
+import numpy
+from DifferentialSystem import DifferentialSystem
+from ProblemSpecification import ProblemSpecification
+
+
+specifications = [
+    ProblemSpecification(numberOfPoints=51, PDE="Heat", leftBoundaryCondition="Fixed value", rightBoundaryCondition="Fixed value"),
+    ProblemSpecification(numberOfPoints=51, PDE="Heat", leftBoundaryCondition="Heat flux", rightBoundaryCondition="Fixed value", leftFlux=1.0),
+    ProblemSpecification(numberOfPoints=51, PDE="Heat", leftBoundaryCondition="Fixed value", rightBoundaryCondition="Cooling", rightCoefficientOfCooling=2.0),
+    ProblemSpecification(numberOfPoints=51, PDE="Bateman-Burgers", alpha=0.05, spatialOrder=4),
+]
+
+
+def Build(index, template):
+    specification = specifications[index % len(specifications)]
+    if template is None:
+        return DifferentialSystem(specification.Replace(alpha=1.0 + 1.0e-6 * index))
+    # Every other clone also moves to a finer grid
+    xSamplePoints = numpy.linspace(0.0, 1.0, 101) if index % 2 else None
+    return template[index % len(template)].Clone(xSamplePoints, alpha=1.0 + 1.0e-6 * index)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Builds many systems in one process and checks that memory stays flat.')
+    parser.add_argument('--systems', type=int, default=100000, help='number of systems to build (default: 100000)')
+    parser.add_argument('--samples', type=int, default=10, help='number of memory samples (default: 10)')
+    parser.add_argument('--clone', action='store_true', help='clone prebuilt systems instead of building from specifications')
+    parser.add_argument('--threshold', type=float, default=1.0, help='largest acceptable growth in MB (default: 1)')
+    options = parser.parse_args(arguments)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        template = [DifferentialSystem(specification) for specification in specifications] if options.clone else None
+        # The first systems fill module level state (imports, weight tables) that is not growth
+        for index in range(0, 100):
+            Build(index, template)
+
+    blockSize = max(1, options.systems // options.samples)
+    samples = []
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for index in range(0, options.systems):
+            Build(index, template)
+            if (index + 1) % blockSize == 0:
+                gc.collect()
+                samples.append(tracemalloc.get_traced_memory()[0])
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+
+    growth = (samples[-1] - samples[0]) / 1.0e6
+    print(f"{options.systems} systems in {elapsed:.1f} s ({1.0e6 * elapsed / options.systems:.0f} us each)")
+    print("Traced MB after every " + str(blockSize) + " systems: " + " ".join(f"{sample / 1.0e6:.3f}" for sample in samples))
+    print(f"Growth: {growth:.3f} MB (threshold {options.threshold} MB)")
+    return 1 if growth > options.threshold else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# Compares the dense and sparse Jacobian paths of DifferentialSystem: assembly time, matrix memory, LU factorization time and
+# memory, and the time of a complete Radau solve. Run from the repository root with: python -m Benchmarks.JacobianBenchmark
+import contextlib
+import io
+import time
+import tracemalloc
+import numpy
+import scipy.linalg
+import scipy.sparse.linalg
+from DifferentialSystem import DifferentialSystem
+from ProblemSpecification import ProblemSpecification
+
+
+# Grid sizes beyond this are only run through the sparse path, the dense matrix alone would need n * n * 8 bytes
+maximumDenseSize = 2000
+# Grid sizes beyond this are not run through a complete solve
+maximumSolveSize = 10000
+
+
+# Heat problem with a heat flux on the left and a fixed value on the right
+def BuildSystem(numberOfPoints):
+    specification = ProblemSpecification(numberOfPoints=numberOfPoints, endTime=0.1, deltaT=0.01, PDE="Heat", alpha=1.0,
+                                          lateralCoefficientOfCooling=0.5, leftBoundaryCondition="Heat flux", leftFlux=1.0,
+                                          leftStartingY=1.0, rightStartingY=0.0)
+    return DifferentialSystem(specification)
+
+
+# Returns the result of function() along with its wall time and peak traced memory
+def Measure(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def MatrixBytes(matrix):
+    if scipy.sparse.issparse(matrix):
+        return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return matrix.nbytes
+
+
+def RunCase(numberOfPoints, jacobianMode):
+    differentialSystem = BuildSystem(numberOfPoints)
+    differentialSystem.jacobianMode = jacobianMode
+    state = differentialSystem.initialState
+
+    if jacobianMode == "dense":
+        matrix, assemblyTime, assemblyPeak = Measure(lambda: differentialSystem.GenerateDenseJacobian(0.0, state))
+        system = numpy.eye(numberOfPoints) - 0.01 * matrix
+        _, factorTime, factorPeak = Measure(lambda: scipy.linalg.lu_factor(system))
+    else:
+        matrix, assemblyTime, assemblyPeak = Measure(lambda: differentialSystem.GenerateJacobian(0.0, state))
+        system = (scipy.sparse.identity(numberOfPoints, format='csc') - 0.01 * matrix).tocsc()
+        _, factorTime, factorPeak = Measure(lambda: scipy.sparse.linalg.splu(system))
+
+    solveTime = float('nan')
+    if numberOfPoints <= maximumSolveSize:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            differentialSystem.SolveSystem()
+            solveTime = time.perf_counter() - start
+
+    return {
+        'points': numberOfPoints,
+        'mode': jacobianMode,
+        'matrixBytes': MatrixBytes(matrix),
+        'assemblySeconds': assemblyTime,
+        'assemblyPeakBytes': assemblyPeak,
+        'factorSeconds': factorTime,
+        'factorPeakBytes': factorPeak,
+        'solveSeconds': solveTime,
+    }
+
+
+def main():
+    print(f"{'points':>8} {'mode':>7} {'matrix MB':>10} {'assembly s':>11} {'LU s':>9} {'LU peak MB':>11} {'solve s':>9}")
+    for numberOfPoints in [100, 500, 1000, 2000, 10000, 100000]:
+        for jacobianMode in ["dense", "sparse"]:
+            if jacobianMode == "dense" and numberOfPoints > maximumDenseSize:
+                continue
+            row = RunCase(numberOfPoints, jacobianMode)
+            print(f"{row['points']:>8} {row['mode']:>7} {row['matrixBytes'] / 1.0e6:>10.3f} {row['assemblySeconds']:>11.5f} "
+                  f"{row['factorSeconds']:>9.5f} {row['factorPeakBytes'] / 1.0e6:>11.3f} {row['solveSeconds']:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
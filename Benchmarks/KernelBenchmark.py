@@ -0,0 +1,73 @@
+# Compares the per-call time of the NumPy and Numba kernel backends of DifferentialSystem: right hand side evaluation and
+# Jacobian band assembly, for both PDEs across grid sizes. Run from the repository root with: python -m Benchmarks.KernelBenchmark
+# Without numba installed only the NumPy backend is timed.
+import contextlib
+import io
+import timeit
+import numpy
+from DifferentialSystem import DifferentialSystem
+from PartialDifferentialEquations import CompiledKernels
+from ProblemSpecification import ProblemSpecification
+
+
+gridSizes = [50, 500, 5000, 50000, 500000]
+# Each timing is the best of this many repeats of about 0.2 seconds
+numberOfRepeats = 5
+
+
+# Heat with a cooling left end and lateral cooling, or Bateman-Burgers with fixed ends
+def BuildSystem(PDE, numberOfPoints, kernelBackend):
+    if PDE == "Heat":
+        specification = ProblemSpecification(numberOfPoints=numberOfPoints, PDE="Heat", alpha=1.0, lateralCoefficientOfCooling=0.5,
+                                              leftBoundaryCondition="Cooling", leftCoefficientOfCooling=2.0, kernelBackend=kernelBackend)
+    else:
+        specification = ProblemSpecification(numberOfPoints=numberOfPoints, PDE="Bateman-Burgers", alpha=0.05, rightStartingY=-1.0,
+                                              kernelBackend=kernelBackend)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DifferentialSystem(specification)
+
+
+# Best time of one call of function, in seconds
+def TimeCall(function):
+    timer = timeit.Timer(function)
+    numberOfCalls = timer.autorange()[0]
+    return min(timer.repeat(numberOfRepeats, numberOfCalls)) / numberOfCalls
+
+
+def RunCase(PDE, numberOfPoints, kernelBackend):
+    differentialSystem = BuildSystem(PDE, numberOfPoints, kernelBackend)
+    state = numpy.random.default_rng(0).uniform(-1.0, 1.0, numberOfPoints)
+    ODEs = numpy.empty(numberOfPoints)
+
+    # The first calls compile the kernels
+    differentialSystem.GenerateOrdinaryDifferentialEquationSystem(0.0, state, ODEs)
+    differentialSystem.GenerateJacobianBands(0.0, state)
+
+    return {
+        'rightHandSideSeconds': TimeCall(lambda: differentialSystem.GenerateOrdinaryDifferentialEquationSystem(0.0, state, ODEs)),
+        'jacobianSeconds': TimeCall(lambda: differentialSystem.GenerateJacobianBands(0.0, state)),
+    }
+
+
+def main():
+    numbaAvailable = CompiledKernels.LoadNumba()
+    backends = ["numpy", "numba"] if numbaAvailable else ["numpy"]
+    if not numbaAvailable:
+        print("numba is not installed, only the numpy backend is timed")
+
+    print(f"{'PDE':>16} {'points':>8} {'backend':>8} {'RHS us':>10} {'bands us':>10} {'RHS speedup':>12} {'bands speedup':>14}")
+    for PDE in ["Heat", "Bateman-Burgers"]:
+        for numberOfPoints in gridSizes:
+            results = {backend: RunCase(PDE, numberOfPoints, backend) for backend in backends}
+            for backend in backends:
+                row = results[backend]
+                speedups = ""
+                if backend != "numpy":
+                    speedups = (f"{results['numpy']['rightHandSideSeconds'] / row['rightHandSideSeconds']:>11.2f}x "
+                                f"{results['numpy']['jacobianSeconds'] / row['jacobianSeconds']:>13.2f}x")
+                print(f"{PDE:>16} {numberOfPoints:>8} {backend:>8} {row['rightHandSideSeconds'] * 1.0e6:>10.2f} "
+                      f"{row['jacobianSeconds'] * 1.0e6:>10.2f} {speedups}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# Compares Parareal (see Integrators/PararealIntegrator) with the serial Radau run it parallelizes, on long Heat and
+# Bateman-Burgers runs. Reports the wall time of both, the Parareal iterations, the error against the serial run, the measured
+# speedup and the projected speedup with a core per slice (serial time over the Parareal critical path), which is what the
+# measured one approaches when there are at least as many free cores as slices.
+# The serial run uses the fine method, Radau by default; a fixed-step fine method (--fine-method Crank-Nicolson --substeps 20)
+# spends the same effort on every slice, where Radau's effort is concentrated where the solution changes fastest.
+# Run from the repository root with: python -m Benchmarks.PararealBenchmark [--slices 4 8 16] [--coarse-steps 10]
+import argparse
+import contextlib
+import io
+import os
+import time
+import numpy
+from DifferentialSystem import DifferentialSystem
+from Integrators.PararealIntegrator import PararealIntegrator
+from ProblemSpecification import ProblemSpecification
+
+
+# Both start from a state that meets their boundary values, so the cost of the serial run is spread over the whole horizon
+# rather than spent on a non-smooth start, which no slicing can shorten
+cases = {
+    "Heat": ProblemSpecification(numberOfPoints=201, endTime=10.0, deltaT=0.01, PDE="Heat", alpha=0.01, lateralCoefficientOfCooling=0.5,
+                                 lateralAmbientY=0.5, rightBoundaryCondition="Cooling", rightCoefficientOfCooling=0.1, rightAmbientY=0.0),
+    "Bateman-Burgers": ProblemSpecification(numberOfPoints=201, endTime=10.0, deltaT=0.01, PDE="Bateman-Burgers", alpha=0.01),
+}
+
+
+def Solve(specification):
+    with contextlib.redirect_stdout(io.StringIO()):
+        differentialSystem = DifferentialSystem(specification)
+        start = time.perf_counter()
+        solution = differentialSystem.SolveSystem()
+    return solution, time.perf_counter() - start
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Compares Parareal with the serial Radau run.')
+    parser.add_argument('--slices', type=int, nargs='+', default=[4, 8, 16], help='numbers of slices to run (default: 4 8 16)')
+    parser.add_argument('--coarse-steps', type=int, default=PararealIntegrator.coarseSteps, help='backward Euler steps per slice')
+    parser.add_argument('--fine-method', default=PararealIntegrator.fineMethod, help='method of the serial run and of every slice (default: Radau)')
+    parser.add_argument('--substeps', type=int, default=1, help='substeps of a fixed-step fine method (default: 1)')
+    parser.add_argument('--tolerance', type=float, default=1.0e-6, help='Parareal tolerance (default: 1e-6)')
+    options = parser.parse_args(arguments)
+    PararealIntegrator.coarseSteps = options.coarse_steps
+    PararealIntegrator.fineMethod = options.fine_method
+
+    print("Processors: " + str(os.cpu_count()))
+    print(f"{'PDE':>16} {'slices':>7} {'serial s':>9} {'parareal s':>11} {'iterations':>11} {'error':>10} {'speedup':>8} {'projected':>10}")
+    for name, specification in cases.items():
+        specification = specification.Replace(substeps=options.substeps)
+        reference, serialSeconds = Solve(specification.Replace(integrationMethod=options.fine_method))
+        for slices in options.slices:
+            solution, pararealSeconds = Solve(specification.Replace(integrationMethod="Parareal", pararealSlices=slices, pararealTolerance=options.tolerance))
+            error = numpy.max(numpy.abs(solution.y - reference.y)) if solution.success else float('nan')
+            print(f"{name:>16} {slices:>7} {serialSeconds:>9.3f} {pararealSeconds:>11.3f} {solution.iterations:>11} {error:>10.2e} "
+                  f"{serialSeconds / pararealSeconds:>8.2f} {serialSeconds / solution.criticalPathSeconds:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
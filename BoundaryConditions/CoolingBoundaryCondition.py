@@ -1,56 +1,190 @@
+import copy
+import numpy
+from PartialDifferentialEquations.FiniteDifferenceWeights import BoundaryWeights, RowProduct
+
+
 class LeftCoolingBoundaryCondition:
     # Local Variables
     name = "Cooling"
-    PDE = None
-    simplifiedConstants = None
-    leftCoefficientOfCooling = None
-    leftAmbientY = None
+    isLinear = True  # The row is linear in the state, see DifferentialSystem.IsLinear
+    parameterNames = ("leftCoefficientOfCooling", "leftAmbientY")
+    # Per instance: the PDE, the end spacing deltaX, the parameters, and this end's row (see FiniteDifferenceWeights.BoundaryWeights)
+    #   y''(0) ~ weights . y[0:m] + derivativeWeight * y'(0)
+    # with rowWeights = alpha * weights, computed for boundaryDistances at spatialOrder
+    __slots__ = ("PDE", "deltaX", "leftCoefficientOfCooling", "leftAmbientY", "weights", "derivativeWeight", "rowWeights", "boundaryDistances", "spatialOrder")
 
 
     def __init__(self, PDE):
+        self.PDE = None
+        self.leftCoefficientOfCooling = None
+        self.leftAmbientY = None
+        self.boundaryDistances = None
+        self.spatialOrder = None
+        self.Rebind(PDE)
+
+
+    # Reads the cooling parameters from specification when one is given, otherwise prompts for them
+    def Initialize(self, specification=None):
+        if specification is None:
+            self.leftCoefficientOfCooling = float(input('Enter left coefficient of cooling value: ')) # Future work: Add error handling
+            self.leftAmbientY = float(input('Enter temperature an infinite distance from left side of the sample space: '))  # Future work: Add error handling
+        else:
+            self.leftCoefficientOfCooling = float(specification.leftCoefficientOfCooling)
+            self.leftAmbientY = float(specification.leftAmbientY)
+
+
+    # Attaches the boundary condition to another PDE, recomputing the constants taken from it and its grid.
+    # Cooling sets the inward derivative, alpha * y'(0) = leftCoefficientOfCooling * (y[0] - leftAmbientY). At second order the row is the ghost node closure, with
+    # the ghost node mirrored across the spacing deltaX next to this end.
+    def Rebind(self, PDE):
         self.PDE = PDE
-        self.simplifiedConstants = PDE.alphaOverDeltaXSquared()
+        self.deltaX = PDE.leftDeltaX
+        # The weights only depend on the grid near this end, so a clone on the same grid keeps them
+        if self.spatialOrder != PDE.spatialOrder or not numpy.array_equal(self.boundaryDistances, PDE.leftBoundaryDistances):
+            self.weights, self.derivativeWeight = BoundaryWeights(PDE.leftBoundaryDistances, PDE.spatialOrder)
+            self.boundaryDistances = PDE.leftBoundaryDistances
+            self.spatialOrder = PDE.spatialOrder
+        self.rowWeights = PDE.alpha * self.weights
+
+
+    # Returns a copy with the named parameters changed, attached to PDE (this one's by default)
+    def Clone(self, PDE=None, **changes):
+        clone = copy.copy(self)
+        for name, value in changes.items():
+            if name not in self.parameterNames:
+                raise ValueError("Unknown " + self.name + " boundary condition parameter: " + name + " (options: " + ", ".join(self.parameterNames) + ")")
+            setattr(clone, name, float(value))
+        clone.Rebind(self.PDE if PDE is None else PDE)
+        return clone
 
 
-    def Initialize(self):
-        self.leftCoefficientOfCooling = float(input('Enter left coefficient of cooling value: ')) # Future work: Add error handling
-        self.leftAmbientY = float(input('Enter temperature an infinite distance from left side of the sample space: '))  # Future work: Add error handling
+    def ODE(self, state):
+        return numpy.dot(self.rowWeights, state[:len(self.weights)]) + self.derivativeWeight * self.leftCoefficientOfCooling * (state[0] - self.leftAmbientY) + self.PDE.lateralCoefficientOfCooling * (self.PDE.lateralAmbientY - state[0])
 
 
-    def ODE(self, state):
-        return 2.0 * self.simplifiedConstants * (state[1] - state[0]) - (2.0 / self.PDE.deltaX) * self.leftCoefficientOfCooling * (state[0] - self.leftAmbientY)
+    # Writes this boundary's entry of the ODE system into the caller owned buffer
+    # Leading axes of state and ODEs are members of an ensemble, whose parameters are then (members, 1) arrays (see EnsembleSystem).
+    def VectorizedODE(self, state, ODEs):
+        # The end node's own terms are gathered into one coefficient and one constant
+        coolingConstant = self.derivativeWeight * self.leftCoefficientOfCooling
+        ODEs[..., 0:1] = RowProduct(self.rowWeights, state[..., :len(self.weights)]) + (coolingConstant - self.PDE.lateralCoefficientOfCooling) * state[..., 0:1] + (self.PDE.lateralCoefficientOfCooling * self.PDE.lateralAmbientY - coolingConstant * self.leftAmbientY)
 
 
     def PartialDerivative(self, jacobianMatrix):
-        jacobianMatrix[0][0] = -2.0 * self.simplifiedConstants - (2.0 / self.PDE.deltaX) * self.leftCoefficientOfCooling
-        jacobianMatrix[0][1] = 2.0 * self.simplifiedConstants
+        jacobianMatrix[0][0:len(self.weights)] = self.rowWeights
+        jacobianMatrix[0][0] += self.derivativeWeight * self.leftCoefficientOfCooling - self.PDE.lateralCoefficientOfCooling
+
+
+    # Returns (diagonal, offDiagonal, constant) of this boundary's second order row, ODE = diagonal * y[end] + offDiagonal * y[neighbour] + constant
+    def GetRowCoefficients(self):
+        coolingConstant = self.derivativeWeight * self.leftCoefficientOfCooling
+        return (self.rowWeights[0] + coolingConstant - self.PDE.lateralCoefficientOfCooling, self.rowWeights[1],
+                -coolingConstant * self.leftAmbientY + self.PDE.lateralCoefficientOfCooling * self.PDE.lateralAmbientY)
+
+
+    # Returns alpha times the inward derivative at this end for every leading index of state (see Observables), from the cooling law
+    def GetFlux(self, state):
+        return (self.leftCoefficientOfCooling * (state[..., 0:1] - self.leftAmbientY))[..., 0]
+
+
+    # Fills this boundary's row of the jacobian in solve_banded layout (see PDE FillJacobianBands)
+    def FillJacobianBands(self, bands):
+        halfBandwidth = bands.shape[-2] // 2
+        for j in range(0, len(self.weights)):
+            bands[..., halfBandwidth - j, j:j + 1] = self.rowWeights[..., j:j + 1]
+        bands[..., halfBandwidth, 0:1] += self.derivativeWeight * self.leftCoefficientOfCooling - self.PDE.lateralCoefficientOfCooling
 
 
 class RightCoolingBoundaryCondition:
     # Local Variables
     name = "Cooling"
-    PDE = None
-    simplifiedConstants = None
-    rightCoefficientOfCooling = None
-    rightAmbientY = None
+    isLinear = True  # The row is linear in the state, see DifferentialSystem.IsLinear
+    parameterNames = ("rightCoefficientOfCooling", "rightAmbientY")
+    # Per instance: the PDE, the end spacing deltaX, the parameters, and this end's row (see FiniteDifferenceWeights.BoundaryWeights)
+    #   y''(L) ~ weights . y[n - 1], y[n - 2], ... + derivativeWeight * (-y'(L))
+    # with rowWeights = alpha * weights, computed for boundaryDistances at spatialOrder
+    __slots__ = ("PDE", "deltaX", "rightCoefficientOfCooling", "rightAmbientY", "weights", "derivativeWeight", "rowWeights", "boundaryDistances", "spatialOrder")
 
 
     def __init__(self, PDE):
+        self.PDE = None
+        self.rightCoefficientOfCooling = None
+        self.rightAmbientY = None
+        self.boundaryDistances = None
+        self.spatialOrder = None
+        self.Rebind(PDE)
+
+
+    # Reads the cooling parameters from specification when one is given, otherwise prompts for them
+    def Initialize(self, specification=None):
+        if specification is None:
+            self.rightCoefficientOfCooling = float(input('Enter left coefficient of cooling value: ')) # Future work: Add error handling
+            self.rightAmbientY = float(input('Enter temperature an infinite distance from right side of the sample space: '))  # Future work: Add error handling
+        else:
+            self.rightCoefficientOfCooling = float(specification.rightCoefficientOfCooling)
+            self.rightAmbientY = float(specification.rightAmbientY)
+
+
+    # Attaches the boundary condition to another PDE, recomputing the constants taken from it and its grid.
+    # Cooling sets the inward derivative, -alpha * y'(L) = rightCoefficientOfCooling * (y[n - 1] - rightAmbientY). At second order the row is the ghost node closure, with
+    # the ghost node mirrored across the spacing deltaX next to this end.
+    def Rebind(self, PDE):
         self.PDE = PDE
-        self.simplifiedConstants = PDE.alphaOverDeltaXSquared()
+        self.deltaX = PDE.rightDeltaX
+        # The weights only depend on the grid near this end, so a clone on the same grid keeps them
+        if self.spatialOrder != PDE.spatialOrder or not numpy.array_equal(self.boundaryDistances, PDE.rightBoundaryDistances):
+            self.weights, self.derivativeWeight = BoundaryWeights(PDE.rightBoundaryDistances, PDE.spatialOrder)
+            self.boundaryDistances = PDE.rightBoundaryDistances
+            self.spatialOrder = PDE.spatialOrder
+        self.rowWeights = PDE.alpha * self.weights
+
+
+    # Returns a copy with the named parameters changed, attached to PDE (this one's by default)
+    def Clone(self, PDE=None, **changes):
+        clone = copy.copy(self)
+        for name, value in changes.items():
+            if name not in self.parameterNames:
+                raise ValueError("Unknown " + self.name + " boundary condition parameter: " + name + " (options: " + ", ".join(self.parameterNames) + ")")
+            setattr(clone, name, float(value))
+        clone.Rebind(self.PDE if PDE is None else PDE)
+        return clone
 
 
-    def Initialize(self):
-        self.rightCoefficientOfCooling = float(input('Enter left coefficient of cooling value: ')) # Future work: Add error handling
-        self.rightAmbientY = float(input('Enter temperature an infinite distance from right side of the sample space: '))  # Future work: Add error handling
+    def ODE(self, state):
+        return numpy.dot(self.rowWeights, state[::-1][:len(self.weights)]) + self.derivativeWeight * self.rightCoefficientOfCooling * (state[-1] - self.rightAmbientY) + self.PDE.lateralCoefficientOfCooling * (self.PDE.lateralAmbientY - state[-1])
 
 
-    def ODE(self, state):
-        n = len(state)
-        return - 2.0 * self.simplifiedConstants * (state[n - 1] - state[n - 2]) - (2.0 / self.PDE.deltaX) * self.rightCoefficientOfCooling * (state[n - 1] - self.rightAmbientY)
+    # Writes this boundary's entry of the ODE system into the caller owned buffer
+    # Leading axes of state and ODEs are members of an ensemble, whose parameters are then (members, 1) arrays (see EnsembleSystem).
+    def VectorizedODE(self, state, ODEs):
+        # The end node's own terms are gathered into one coefficient and one constant
+        coolingConstant = self.derivativeWeight * self.rightCoefficientOfCooling
+        ODEs[..., -1:] = RowProduct(self.rowWeights, state[..., :-len(self.weights) - 1:-1]) + (coolingConstant - self.PDE.lateralCoefficientOfCooling) * state[..., -1:] + (self.PDE.lateralCoefficientOfCooling * self.PDE.lateralAmbientY - coolingConstant * self.rightAmbientY)
 
 
     def PartialDerivative(self, jacobianMatrix):
         n = len(jacobianMatrix[0])
-        jacobianMatrix[n - 1][n - 2] = 2.0 * self.simplifiedConstants
-        jacobianMatrix[n - 1][n - 1] = -2.0 * self.simplifiedConstants - (2.0 / self.PDE.deltaX) * self.rightCoefficientOfCooling
\ No newline at end of file
+        for j in range(0, len(self.weights)):
+            jacobianMatrix[n - 1][n - 1 - j] = self.rowWeights[j]
+        jacobianMatrix[n - 1][n - 1] += self.derivativeWeight * self.rightCoefficientOfCooling - self.PDE.lateralCoefficientOfCooling
+
+
+    # Returns (diagonal, offDiagonal, constant) of this boundary's second order row, ODE = diagonal * y[end] + offDiagonal * y[neighbour] + constant
+    def GetRowCoefficients(self):
+        coolingConstant = self.derivativeWeight * self.rightCoefficientOfCooling
+        return (self.rowWeights[0] + coolingConstant - self.PDE.lateralCoefficientOfCooling, self.rowWeights[1],
+                -coolingConstant * self.rightAmbientY + self.PDE.lateralCoefficientOfCooling * self.PDE.lateralAmbientY)
+
+
+    # Returns alpha times the inward derivative at this end for every leading index of state (see Observables), from the cooling law
+    def GetFlux(self, state):
+        return (self.rightCoefficientOfCooling * (state[..., -1:] - self.rightAmbientY))[..., 0]
+
+
+    # Fills this boundary's row of the jacobian in solve_banded layout (see PDE FillJacobianBands)
+    def FillJacobianBands(self, bands):
+        halfBandwidth = bands.shape[-2] // 2
+        n = bands.shape[-1]
+        for j in range(0, len(self.weights)):
+            bands[..., halfBandwidth + j, n - 1 - j:n - j] = self.rowWeights[..., j:j + 1]
+        bands[..., halfBandwidth, n - 1:] += self.derivativeWeight * self.rightCoefficientOfCooling - self.PDE.lateralCoefficientOfCooling
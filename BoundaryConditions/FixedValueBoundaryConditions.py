@@ -1,20 +1,45 @@
+import copy
+from PartialDifferentialEquations.FiniteDifferenceWeights import StencilWeights
+
+
 class LeftFixedValueBoundaryCondition:
     # Local Variables
     name = "Fixed value"
-    PDE = None
+    isLinear = True  # The row is linear in the state, see DifferentialSystem.IsLinear
+    parameterNames = ()
+    __slots__ = ("PDE",)
 
     def __init__(self, PDE):
         self.PDE = PDE
 
 
-    def Initialize(self):
+    def Initialize(self, specification=None):
         return
 
 
+    # Attaches the boundary condition to another PDE
+    def Rebind(self, PDE):
+        self.PDE = PDE
+
+
+    # Returns a copy attached to PDE, this one's by default. There are no parameters to change.
+    def Clone(self, PDE=None, **changes):
+        if changes:
+            raise ValueError("Unknown " + self.name + " boundary condition parameters: " + ", ".join(sorted(changes)))
+        clone = copy.copy(self)
+        clone.Rebind(self.PDE if PDE is None else PDE)
+        return clone
+
+
     def ODE(self, state):
         return 0
 
 
+    # Writes this boundary's entry of the ODE system into the caller owned buffer
+    def VectorizedODE(self, state, ODEs):
+        ODEs[..., 0] = 0.0
+
+
     def PartialDerivative(self, jacobianMatrix):
         n = len(jacobianMatrix[0])
         for i in range(0, n):
@@ -23,25 +48,84 @@ class LeftFixedValueBoundaryCondition:
         return
 
 
+    # Returns (diagonal, offDiagonal, constant) of this boundary's row, ODE = diagonal * y[end] + offDiagonal * y[neighbour] + constant
+    def GetRowCoefficients(self):
+        return (0.0, 0.0, 0.0)
+
+
+    # Returns alpha times the inward derivative at this end for every leading index of state (see Observables), the quantity a
+    # heat flux boundary sets. The derivative is the one-sided difference over the spatialOrder + 1 nodes nearest the end, at most four.
+    def GetFlux(self, state):
+        distances = self.PDE.leftBoundaryDistances[:self.PDE.spatialOrder + 1]
+        return (self.PDE.alpha * state[..., :len(distances)]) @ StencilWeights(0.0, distances, 1)
+
+
+    # Fills this boundary's row of the jacobian in solve_banded layout (see PDE FillJacobianBands)
+    def FillJacobianBands(self, bands):
+        halfBandwidth = bands.shape[-2] // 2
+        for j in range(0, halfBandwidth + 1):
+            bands[..., halfBandwidth - j, j] = 0.0
+
+
 class RightFixedValueBoundaryCondition:
     # Local Variables
     name = "Fixed value"
-    PDE = None
+    isLinear = True  # The row is linear in the state, see DifferentialSystem.IsLinear
+    parameterNames = ()
+    __slots__ = ("PDE",)
 
     def __init__(self, PDE):
         self.PDE = PDE
 
 
-    def Initialize(self):
+    def Initialize(self, specification=None):
         return
 
 
+    # Attaches the boundary condition to another PDE
+    def Rebind(self, PDE):
+        self.PDE = PDE
+
+
+    # Returns a copy attached to PDE, this one's by default. There are no parameters to change.
+    def Clone(self, PDE=None, **changes):
+        if changes:
+            raise ValueError("Unknown " + self.name + " boundary condition parameters: " + ", ".join(sorted(changes)))
+        clone = copy.copy(self)
+        clone.Rebind(self.PDE if PDE is None else PDE)
+        return clone
+
+
     def ODE(self, state):
         return 0
 
 
+    # Writes this boundary's entry of the ODE system into the caller owned buffer
+    def VectorizedODE(self, state, ODEs):
+        ODEs[..., -1] = 0.0
+
+
     def PartialDerivative(self, jacobianMatrix):
         n = len(jacobianMatrix[0])
         for i in range(0, n):
             # left boundary - fixed temperature
-            jacobianMatrix[n - 1][i] = 0.0
\ No newline at end of file
+            jacobianMatrix[n - 1][i] = 0.0
+
+
+    # Returns (diagonal, offDiagonal, constant) of this boundary's row, ODE = diagonal * y[end] + offDiagonal * y[neighbour] + constant
+    def GetRowCoefficients(self):
+        return (0.0, 0.0, 0.0)
+
+
+    # Returns alpha times the inward derivative at this end for every leading index of state (see Observables), the quantity a
+    # heat flux boundary sets. The derivative is the one-sided difference over the spatialOrder + 1 nodes nearest the end, at most four.
+    def GetFlux(self, state):
+        distances = self.PDE.rightBoundaryDistances[:self.PDE.spatialOrder + 1]
+        return (self.PDE.alpha * state[..., :-len(distances) - 1:-1]) @ StencilWeights(0.0, distances, 1)
+
+
+    # Fills this boundary's row of the jacobian in solve_banded layout (see PDE FillJacobianBands)
+    def FillJacobianBands(self, bands):
+        halfBandwidth = bands.shape[-2] // 2
+        for j in range(0, halfBandwidth + 1):
+            bands[..., halfBandwidth + j, -1 - j] = 0.0
\ No newline at end of file
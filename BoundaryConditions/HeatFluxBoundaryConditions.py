@@ -1,52 +1,180 @@
+import copy
+import numpy
+from PartialDifferentialEquations.FiniteDifferenceWeights import BoundaryWeights, RowProduct
+
+
 class LeftHeatFluxBoundaryCondition:
     # Local Variables
     name = "Heat flux"
-    PDE = None
-    leftFlux = None
-    simplifiedConstants = None
+    isLinear = True  # The row is linear in the state, see DifferentialSystem.IsLinear
+    parameterNames = ("leftFlux",)
+    # Per instance: the PDE, the end spacing deltaX, the parameters, and this end's row (see FiniteDifferenceWeights.BoundaryWeights)
+    #   y''(0) ~ weights . y[0:m] + derivativeWeight * y'(0)
+    # with rowWeights = alpha * weights, computed for boundaryDistances at spatialOrder
+    __slots__ = ("PDE", "deltaX", "leftFlux", "weights", "derivativeWeight", "rowWeights", "boundaryDistances", "spatialOrder")
 
 
     def __init__(self, PDE):
-        self.PDE = PDE
-        self.simplifiedConstants = PDE.alphaOverDeltaXSquared()
+        self.PDE = None
+        self.leftFlux = None
+        self.boundaryDistances = None
+        self.spatialOrder = None
+        self.Rebind(PDE)
 
 
-    def Initialize(self):
-        self.leftFlux = float(input('Enter left heat flux value: ')) # Future work: Add error handling
+    # Reads the flux from specification when one is given, otherwise prompts for it
+    def Initialize(self, specification=None):
+        if specification is None:
+            self.leftFlux = float(input('Enter left heat flux value: ')) # Future work: Add error handling
+        else:
+            self.leftFlux = float(specification.leftFlux)
+
+
+    # Attaches the boundary condition to another PDE, recomputing the constants taken from it and its grid.
+    # The flux sets the inward derivative, alpha * y'(0) = leftFlux. At second order the row is the ghost node closure, with
+    # the ghost node mirrored across the spacing deltaX next to this end.
+    def Rebind(self, PDE):
+        self.PDE = PDE
+        self.deltaX = PDE.leftDeltaX
+        # The weights only depend on the grid near this end, so a clone on the same grid keeps them
+        if self.spatialOrder != PDE.spatialOrder or not numpy.array_equal(self.boundaryDistances, PDE.leftBoundaryDistances):
+            self.weights, self.derivativeWeight = BoundaryWeights(PDE.leftBoundaryDistances, PDE.spatialOrder)
+            self.boundaryDistances = PDE.leftBoundaryDistances
+            self.spatialOrder = PDE.spatialOrder
+        self.rowWeights = PDE.alpha * self.weights
+
+
+    # Returns a copy with the named parameters changed, attached to PDE (this one's by default)
+    def Clone(self, PDE=None, **changes):
+        clone = copy.copy(self)
+        for name, value in changes.items():
+            if name not in self.parameterNames:
+                raise ValueError("Unknown " + self.name + " boundary condition parameter: " + name + " (options: " + ", ".join(self.parameterNames) + ")")
+            setattr(clone, name, float(value))
+        clone.Rebind(self.PDE if PDE is None else PDE)
+        return clone
 
 
     def ODE(self, state):
-        return 2.0 * self.simplifiedConstants * (state[1] - state[0]) - (2.0 / self.PDE.deltaX) * self.leftFlux
+        return numpy.dot(self.rowWeights, state[:len(self.weights)]) + self.derivativeWeight * self.leftFlux + self.PDE.lateralCoefficientOfCooling * (self.PDE.lateralAmbientY - state[0])
+
+
+    # Writes this boundary's entry of the ODE system into the caller owned buffer
+    # Leading axes of state and ODEs are members of an ensemble, whose parameters are then (members, 1) arrays (see EnsembleSystem).
+    def VectorizedODE(self, state, ODEs):
+        # The end node's own terms are gathered into one coefficient and one constant
+        ODEs[..., 0:1] = RowProduct(self.rowWeights, state[..., :len(self.weights)]) - self.PDE.lateralCoefficientOfCooling * state[..., 0:1] + (self.derivativeWeight * self.leftFlux + self.PDE.lateralCoefficientOfCooling * self.PDE.lateralAmbientY)
 
 
     def PartialDerivative(self, jacobianMatrix):
-        jacobianMatrix[0][0] = -2.0 * self.simplifiedConstants
-        jacobianMatrix[0][1] = 2.0 * self.simplifiedConstants
+        jacobianMatrix[0][0:len(self.weights)] = self.rowWeights
+        jacobianMatrix[0][0] -= self.PDE.lateralCoefficientOfCooling
+
+
+    # Returns (diagonal, offDiagonal, constant) of this boundary's second order row, ODE = diagonal * y[end] + offDiagonal * y[neighbour] + constant
+    def GetRowCoefficients(self):
+        return (self.rowWeights[0] - self.PDE.lateralCoefficientOfCooling, self.rowWeights[1],
+                self.derivativeWeight * self.leftFlux + self.PDE.lateralCoefficientOfCooling * self.PDE.lateralAmbientY)
+
+
+    # Returns alpha times the inward derivative at this end for every leading index of state (see Observables), which is the flux
+    def GetFlux(self, state):
+        return numpy.broadcast_to(self.leftFlux, state[..., 0:1].shape)[..., 0].copy()
+
+
+    # Fills this boundary's row of the jacobian in solve_banded layout (see PDE FillJacobianBands)
+    def FillJacobianBands(self, bands):
+        halfBandwidth = bands.shape[-2] // 2
+        for j in range(0, len(self.weights)):
+            bands[..., halfBandwidth - j, j:j + 1] = self.rowWeights[..., j:j + 1]
+        bands[..., halfBandwidth, 0:1] -= self.PDE.lateralCoefficientOfCooling
 
 
 class RightHeatFluxBoundaryCondition:
     # Local Variables
     name = "Heat flux"
-    PDE = None
-    rightFlux = None
-    simplifiedConstants = None
+    isLinear = True  # The row is linear in the state, see DifferentialSystem.IsLinear
+    parameterNames = ("rightFlux",)
+    # Per instance: the PDE, the end spacing deltaX, the parameters, and this end's row (see FiniteDifferenceWeights.BoundaryWeights)
+    #   y''(L) ~ weights . y[n - 1], y[n - 2], ... + derivativeWeight * (-y'(L))
+    # with rowWeights = alpha * weights, computed for boundaryDistances at spatialOrder
+    __slots__ = ("PDE", "deltaX", "rightFlux", "weights", "derivativeWeight", "rowWeights", "boundaryDistances", "spatialOrder")
 
 
     def __init__(self, PDE):
-        self.PDE = PDE
-        self.simplifiedConstants = PDE.alphaOverDeltaXSquared()
+        self.PDE = None
+        self.rightFlux = None
+        self.boundaryDistances = None
+        self.spatialOrder = None
+        self.Rebind(PDE)
 
 
-    def Initialize(self):
-        self.rightFlux = float(input('Enter right heat flux value: ')) # Future work: Add error handling
+    # Reads the flux from specification when one is given, otherwise prompts for it
+    def Initialize(self, specification=None):
+        if specification is None:
+            self.rightFlux = float(input('Enter right heat flux value: ')) # Future work: Add error handling
+        else:
+            self.rightFlux = float(specification.rightFlux)
+
+
+    # Attaches the boundary condition to another PDE, recomputing the constants taken from it and its grid.
+    # The flux sets the inward derivative, -alpha * y'(L) = rightFlux. At second order the row is the ghost node closure, with
+    # the ghost node mirrored across the spacing deltaX next to this end.
+    def Rebind(self, PDE):
+        self.PDE = PDE
+        self.deltaX = PDE.rightDeltaX
+        # The weights only depend on the grid near this end, so a clone on the same grid keeps them
+        if self.spatialOrder != PDE.spatialOrder or not numpy.array_equal(self.boundaryDistances, PDE.rightBoundaryDistances):
+            self.weights, self.derivativeWeight = BoundaryWeights(PDE.rightBoundaryDistances, PDE.spatialOrder)
+            self.boundaryDistances = PDE.rightBoundaryDistances
+            self.spatialOrder = PDE.spatialOrder
+        self.rowWeights = PDE.alpha * self.weights
+
+
+    # Returns a copy with the named parameters changed, attached to PDE (this one's by default)
+    def Clone(self, PDE=None, **changes):
+        clone = copy.copy(self)
+        for name, value in changes.items():
+            if name not in self.parameterNames:
+                raise ValueError("Unknown " + self.name + " boundary condition parameter: " + name + " (options: " + ", ".join(self.parameterNames) + ")")
+            setattr(clone, name, float(value))
+        clone.Rebind(self.PDE if PDE is None else PDE)
+        return clone
 
 
     def ODE(self, state):
-        n = len(state)
-        return - 2.0 * self.simplifiedConstants * (state[n - 1] - state[n - 2]) - (2.0 / self.PDE.deltaX) * self.rightFlux
+        return numpy.dot(self.rowWeights, state[::-1][:len(self.weights)]) + self.derivativeWeight * self.rightFlux + self.PDE.lateralCoefficientOfCooling * (self.PDE.lateralAmbientY - state[-1])
+
+
+    # Writes this boundary's entry of the ODE system into the caller owned buffer
+    # Leading axes of state and ODEs are members of an ensemble, whose parameters are then (members, 1) arrays (see EnsembleSystem).
+    def VectorizedODE(self, state, ODEs):
+        # The end node's own terms are gathered into one coefficient and one constant
+        ODEs[..., -1:] = RowProduct(self.rowWeights, state[..., :-len(self.weights) - 1:-1]) - self.PDE.lateralCoefficientOfCooling * state[..., -1:] + (self.derivativeWeight * self.rightFlux + self.PDE.lateralCoefficientOfCooling * self.PDE.lateralAmbientY)
 
 
     def PartialDerivative(self, jacobianMatrix):
         n = len(jacobianMatrix[0])
-        jacobianMatrix[n - 1][n - 2] = 2.0 * self.simplifiedConstants
-        jacobianMatrix[n - 1][n - 1] = -2.0 * self.simplifiedConstants
+        for j in range(0, len(self.weights)):
+            jacobianMatrix[n - 1][n - 1 - j] = self.rowWeights[j]
+        jacobianMatrix[n - 1][n - 1] -= self.PDE.lateralCoefficientOfCooling
+
+
+    # Returns (diagonal, offDiagonal, constant) of this boundary's second order row, ODE = diagonal * y[end] + offDiagonal * y[neighbour] + constant
+    def GetRowCoefficients(self):
+        return (self.rowWeights[0] - self.PDE.lateralCoefficientOfCooling, self.rowWeights[1],
+                self.derivativeWeight * self.rightFlux + self.PDE.lateralCoefficientOfCooling * self.PDE.lateralAmbientY)
+
+
+    # Returns alpha times the inward derivative at this end for every leading index of state (see Observables), which is the flux
+    def GetFlux(self, state):
+        return numpy.broadcast_to(self.rightFlux, state[..., -1:].shape)[..., 0].copy()
+
+
+    # Fills this boundary's row of the jacobian in solve_banded layout (see PDE FillJacobianBands)
+    def FillJacobianBands(self, bands):
+        halfBandwidth = bands.shape[-2] // 2
+        n = bands.shape[-1]
+        for j in range(0, len(self.weights)):
+            bands[..., halfBandwidth + j, n - 1 - j:n - j] = self.rowWeights[..., j:j + 1]
+        bands[..., halfBandwidth, n - 1:] -= self.PDE.lateralCoefficientOfCooling
@@ -0,0 +1,44 @@
+import json
+import os
+import tempfile
+import numpy
+from ProblemSpecification import ProblemSpecification
+
+
+# A checkpoint is a .npz archive holding everything needed to continue a transient run:
+#
+#   version         checkpointFormatVersion
+#   t               time of the saved state
+#   state           solution at every sample point at time t
+#   stepSize        last full step of the solve_ivp solver, NaN when unknown (fixed-step integrators)
+#   specification   JSON of the ProblemSpecification the run was built from, with the deltaT actually used
+#
+# Checkpoints are written to a temporary file in the same directory and moved into place with os.replace, so a run that is
+# interrupted while writing leaves the previous checkpoint intact. See DifferentialSystem.FromCheckpoint for resuming.
+checkpointFormatVersion = 1
+
+
+def WriteCheckpoint(path, specification, t, state, stepSize=None):
+    fileDescriptor, temporaryPath = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fileDescriptor, 'wb') as fileStream:
+            numpy.savez(fileStream, version=checkpointFormatVersion, t=float(t), state=numpy.asarray(state, dtype=float),
+                        stepSize=numpy.nan if stepSize is None else float(stepSize), specification=json.dumps(specification.ToDictionary()))
+        os.replace(temporaryPath, path)
+    except BaseException:
+        os.remove(temporaryPath)
+        raise
+
+
+# Returns the checkpoint as a dictionary with the keys t, state, stepSize (None when unknown) and specification
+def ReadCheckpoint(path):
+    with numpy.load(path) as archive:
+        if int(archive['version']) != checkpointFormatVersion:
+            raise ValueError(path + " is a version " + str(int(archive['version'])) + " checkpoint, expected version " + str(checkpointFormatVersion))
+        stepSize = float(archive['stepSize'])
+        return {
+            't': float(archive['t']),
+            'state': numpy.array(archive['state'], dtype=float),
+            'stepSize': None if numpy.isnan(stepSize) else stepSize,
+            'specification': ProblemSpecification.FromDictionary(json.loads(str(archive['specification']))),
+        }
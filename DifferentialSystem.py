@@ -1,10 +1,24 @@
+import contextlib
+import copy
 import math
 import numpy
+import scipy.sparse
+import scipy.sparse.linalg
 from scipy.integrate import solve_ivp
+from scipy.optimize import OptimizeResult
+import Checkpoint
 import PartialDifferentialEquations
 from InitialConditions.LinearInitialCondition import LinearInitialCondition
+from Integrators.BDF2Integrator import BDF2Integrator
+from Integrators.ExponentialIntegrator import ExponentialIntegrator
+from Integrators.PararealIntegrator import PararealIntegrator
+from Integrators.IMEXIntegrator import IMEXIntegrator
+from Integrators.SteadyStateSolver import SteadyStateSolver
+from Integrators.ThetaMethodIntegrator import ThetaMethodIntegrator
+from PartialDifferentialEquations import CompiledKernels, FiniteDifferenceWeights
 from PartialDifferentialEquations.BatemanBurgersPDE import BatemanBurgersPDE
 from PartialDifferentialEquations.HeatPDE import HeatPDE
+from ProblemSpecification import ProblemSpecification
 
 
 class DifferentialSystem:
@@ -16,30 +30,112 @@ class DifferentialSystem:
     computationalSolution = None
     deltaX = 0.1
     deltaT = 0.1
-    xSamplePoints = []
-    timeSamplePoints = []
-    initialState = []
-
-
-    def __init__(self):
+    xSamplePoints = None
+    timeSamplePoints = None
+    # Order of accuracy of the spatial differences, 2 or 4 (see FiniteDifferenceWeights)
+    spatialOrder = 2
+    initialState = None
+    # Problem specification used to build the system without prompting, None when built interactively
+    specification = None
+    # Optional SolverInstrumentation that records evaluation counts and timings
+    instrumentation = None
+    # How the Jacobian is handed to solve_ivp: "sparse" (analytic, CSC), "dense" (analytic, n x n array) or "sparsity" (finite
+    # differences over the banded pattern)
+    jacobianMode = "sparse"
+    # Diagonals of the banded Jacobian, FiniteDifferenceWeights.GetHalfBandwidth(spatialOrder) on either side of the main one
+    jacobianBandOffsets = (1, 0, -1)
+    # Time integration, see SpecifySolverParameters
+    integrationMethod = "Radau"
+    absoluteTolerance = 1.0e-9
+    relativeTolerance = 1.0e-9
+    denseOutput = True
+    theta = 0.5
+    substeps = 1
+    steadyStateTolerance = 0.0
+    storeTimeSamples = True
+    pararealSlices = 0
+    pararealTolerance = 1.0e-6
+    # "numpy" evaluates the PDE and boundary conditions with array operations, "numba" with the fused CompiledKernels
+    kernelBackend = "numpy"
+    # Upper bound on the solution columns held at once by IterateSolution when no window size is given
+    maximumWindowBytes = 64 * 1024 * 1024
+    # Checkpoints written over a run when a checkpoint path is given without a window size (see IterateSolution)
+    checkpointsPerRun = 10
+    # Initial step size handed to solve_ivp, None lets it choose. Set from the checkpoint a run is resumed from.
+    firstStep = None
+    # Last full step of the latest solve_ivp run with dense output, None when unknown
+    lastStepSize = None
+    # For a linear system (see IsLinear), f(y) = J y + b with J and b assembled once per integration by PrepareLinearOperator,
+    # None otherwise. linearFactorizations holds the solvers of (I - coefficient * J) x = r made from J, keyed by coefficient.
+    linearJacobian = None
+    linearJacobianBands = None
+    linearConstantTerm = None
+    linearFactorizations = None
+
+
+    # Builds the system from a ProblemSpecification when one is given, otherwise prompts for every value.
+    # When instrumentation is given the setup is timed as its "setup" phase.
+    def __init__(self, specification=None, instrumentation=None):
+        self.specification = specification
+        self.instrumentation = instrumentation
+
+        with self.TimedPhase('setup'):
+            self.Setup()
+
+
+    def Setup(self):
         self.SpecifySpaceParameters()
         self.SpecifyTimeParameters()
         self.SpecifyPDE()
         self.SpecifyBoundaryConditions()
         self.SpecifyInitialConditionFunction()
+        self.SpecifySolverParameters()
         self.SetInitialState()
 
 
+    # Turns on instrumentation for subsequent solves and returns it
+    def EnableInstrumentation(self, progressCallback=None, progressInterval=1.0):
+        from SolverInstrumentation import SolverInstrumentation
+        self.instrumentation = SolverInstrumentation(progressCallback, progressInterval)
+        return self.instrumentation
+
+
+    # Returns a context manager that times the named phase when instrumentation is enabled
+    def TimedPhase(self, name):
+        if self.instrumentation is None:
+            return contextlib.nullcontext()
+        return self.instrumentation.Phase(name)
+
+
     def SpecifySpaceParameters(self):
         # Future work: Could be parameterized, and implement scaling of the solution # Note: linear initial distribution relies on start and end being 0 and 1
         startingPosition = 0
         endingPosition = 1
 
-        numberOfPoints = int(input('Enter quantity of evenly spaced sampling points: '))
-
-        # Validate input
-        while numberOfPoints < 2:
-            numberOfPoints = int(input('Invalid response: Enter quantity of evenly spaced sampling points (Must be greater than 2): '))
+        if self.specification is not None:
+            self.spatialOrder = int(self.specification.spatialOrder)
+            if self.spatialOrder not in FiniteDifferenceWeights.supportedOrders:
+                raise ValueError("Unknown spatial order: " + str(self.spatialOrder) + " (options: " + ", ".join(map(str, FiniteDifferenceWeights.supportedOrders)) + ")")
+        halfBandwidth = FiniteDifferenceWeights.GetHalfBandwidth(self.spatialOrder)
+        self.jacobianBandOffsets = tuple(range(halfBandwidth, -halfBandwidth - 1, -1))
+
+        if self.specification is None:
+            numberOfPoints = int(input('Enter quantity of evenly spaced sampling points: '))
+
+            # Validate input
+            while numberOfPoints < 2:
+                numberOfPoints = int(input('Invalid response: Enter quantity of evenly spaced sampling points (Must be greater than 2): '))
+        elif self.specification.xSamplePoints is not None:
+            # Explicit, possibly non-uniform, sample points replace the evenly spaced ones
+            xSamplePoints = numpy.array(self.specification.xSamplePoints, dtype=float)
+            if len(xSamplePoints) < 2 or xSamplePoints[0] != startingPosition or xSamplePoints[-1] != endingPosition or numpy.any(numpy.diff(xSamplePoints) <= 0.0):
+                raise ValueError("xSamplePoints must be at least 2 strictly increasing points from " + str(startingPosition) + " to " + str(endingPosition))
+            self.SetGrid(xSamplePoints)
+            return
+        else:
+            numberOfPoints = int(self.specification.numberOfPoints)
+            if numberOfPoints < 2:
+                raise ValueError("numberOfPoints must be at least 2, got " + str(numberOfPoints))
 
         # Calculate deltaX (x-axis step size)
         self.deltaX = (endingPosition - startingPosition) / (float(numberOfPoints) - 1.0)
@@ -50,10 +146,30 @@ class DifferentialSystem:
             self.xSamplePoints[i] = self.deltaX * i
 
 
+    # Moves the system onto new sample points. deltaX becomes the smallest spacing, and the PDE and its boundary conditions
+    # recompute their stencil weights. The state is not remapped, see AdaptiveMesh for that.
+    def SetGrid(self, xSamplePoints):
+        self.xSamplePoints = numpy.asarray(xSamplePoints, dtype=float)
+        self.deltaX = float(numpy.min(numpy.diff(self.xSamplePoints)))
+        self.linearJacobian = None
+        if self.PDE is not None:
+            self.PDE.SetGrid(self.xSamplePoints, self.spatialOrder)
+        for boundaryCondition in [self.leftBoundaryCondition, self.rightBoundaryCondition]:
+            if boundaryCondition is not None:
+                boundaryCondition.Rebind(self.PDE)
+
+
     def SpecifyTimeParameters(self):
-        startTime = float(input('Enter initial time: '))
-        endTime = float(input('Enter final time: '))
-        self.deltaT = float(input('Enter time step size DeltaT: ')) # Stored for use in solve_ivp library function call
+        if self.specification is None:
+            startTime = float(input('Enter initial time: '))
+            endTime = float(input('Enter final time: '))
+            self.deltaT = float(input('Enter time step size DeltaT: ')) # Stored for use in solve_ivp library function call
+        else:
+            startTime = float(self.specification.startTime)
+            endTime = float(self.specification.endTime)
+            self.deltaT = float(self.specification.deltaT)
+            if self.deltaT <= 0.0 or endTime <= startTime:
+                raise ValueError("endTime must be after startTime and deltaT must be positive")
 
         # Calculate number of time steps needed to cover specified time period.
         numberOfTimeSteps = ((endTime - startTime) / self.deltaT) + 1.0
@@ -69,10 +185,21 @@ class DifferentialSystem:
         # Instantiate array of sampling points along time-axis
         self.timeSamplePoints = numpy.zeros(roundedNumberOfTimeSteps)
         for i in range(0, roundedNumberOfTimeSteps):
-            self.timeSamplePoints[i] = self.deltaT * i
+            self.timeSamplePoints[i] = startTime + self.deltaT * i
 
 
     def SpecifyPDE(self):
+        if self.specification is not None:
+            match self.specification.PDE:
+                case HeatPDE.name:
+                    self.PDE = HeatPDE(self.deltaX, self.specification)
+                case BatemanBurgersPDE.name:
+                    self.PDE = BatemanBurgersPDE(self.deltaX, self.specification)
+                case _:
+                    raise ValueError("Unknown PDE: " + str(self.specification.PDE))
+            self.PDE.SetGrid(self.xSamplePoints, self.spatialOrder)
+            return
+
         # Print options
         print("Please select a PDE: ")
         print("1: Heat")
@@ -92,8 +219,22 @@ class DifferentialSystem:
             case "2":
                 self.PDE = BatemanBurgersPDE(self.deltaX)
 
+        self.PDE.SetGrid(self.xSamplePoints, self.spatialOrder)
+
 
     def SpecifyBoundaryConditions(self):
+        if self.specification is not None:
+            leftBoundaryConditionOptions = self.PDE.GetLeftBoundaryConditions()
+            leftIndex = self.FindBoundaryCondition(leftBoundaryConditionOptions, self.specification.leftBoundaryCondition, "left")
+            self.leftBoundaryCondition = leftBoundaryConditionOptions[leftIndex](self.PDE)
+            self.leftBoundaryCondition.Initialize(self.specification)
+
+            rightBoundaryConditionOptions = self.PDE.GetRightBoundaryConditions(leftIndex)
+            rightIndex = self.FindBoundaryCondition(rightBoundaryConditionOptions, self.specification.rightBoundaryCondition, "right")
+            self.rightBoundaryCondition = rightBoundaryConditionOptions[rightIndex](self.PDE)
+            self.rightBoundaryCondition.Initialize(self.specification)
+            return
+
         # Print left options
         print("Please select a left boundary condition type: ")
         leftBoundaryConditionOptions = self.PDE.GetLeftBoundaryConditions()
@@ -106,7 +247,7 @@ class DifferentialSystem:
             selection = int(input('Error: Please input a number listed above: '))
 
         # Instantiate selected boundary condition
-        self.leftBoundaryCondition = leftBoundaryConditionOptions[selection - 1]
+        self.leftBoundaryCondition = leftBoundaryConditionOptions[selection - 1](self.PDE)
         self.leftBoundaryCondition.Initialize()
 
 
@@ -122,11 +263,30 @@ class DifferentialSystem:
             selection = int(input('Error: Please input a number listed above: '))
 
         # Instantiate selected boundary condition
-        self.rightBoundaryCondition = rightBoundaryConditionOptions[selection - 1]
+        self.rightBoundaryCondition = rightBoundaryConditionOptions[selection - 1](self.PDE)
         self.rightBoundaryCondition.Initialize()
 
 
+    # Returns the index of the boundary condition option with the given name
+    @staticmethod
+    def FindBoundaryCondition(options, name, side):
+        for i in range(0, len(options)):
+            if options[i].name == name:
+                return i
+
+        availableNames = ", ".join(option.name for option in options)
+        raise ValueError("Unavailable " + side + " boundary condition: " + str(name) + " (options: " + availableNames + ")")
+
+
     def SpecifyInitialConditionFunction(self):
+        if self.specification is not None:
+            match self.specification.initialCondition:
+                case "Linear":
+                    self.initialConditionFunction = LinearInitialCondition(self, self.specification)
+                case _:
+                    raise ValueError("Unknown initial condition: " + str(self.specification.initialCondition))
+            return
+
         # Print options
         print("Please select an initial condition function type: ")
         print("1: Linear")
@@ -142,21 +302,159 @@ class DifferentialSystem:
                 self.initialConditionFunction = LinearInitialCondition(self)
 
 
-    def SetInitialState(self):
-        # Instantiate empty array to hold initial distribution of Y values at start time
-        n = len(self.xSamplePoints)
-        self.initialState = numpy.zeros(n, dtype=float)
+    # Solver settings are only read from a specification; interactive runs use the defaults above.
+    #
+    # Accuracy / speed against the default, measured on a 201 point run to t = 1 with 101 output times
+    # (Bateman-Burgers alpha = 0.05 / Heat with a cooling boundary; max error over all outputs, error at the final time):
+    #   "Radau", atol = rtol = 1e-9 (default)   84 ms / 153 ms     reference
+    #   "Radau", atol = rtol = 1e-6             28 ms / 53 ms      4e-7, 9e-9
+    #   "BDF", atol = rtol = 1e-6               22 ms / 41 ms      3e-6, 7e-7
+    #   "LSODA", atol = rtol = 1e-6             8 ms / 16 ms       2e-6, 7e-7   (banded Jacobian)
+    #   "RK45", atol = rtol = 1e-6              0.4 s / 6.7 s      4e-6, 6e-7   (explicit, step limited by alpha / deltaX^2)
+    #   "Crank-Nicolson"                        21 ms / 9 ms       1e-3 to 8e-2 just after the non-smooth start, 1e-5 to 7e-3 final
+    #   "BDF2"                                  20 ms / 7 ms       2e-3 to 4e-2, 3e-5 to 9e-6 final (damps the start instead of ringing)
+    #   "IMEX"                                  4 ms / 5 ms        2e-3 to 9e-2, 3e-5 to 7e-3 final; substeps = 4: 8e-5 to 2e-2, 2e-6 to 4e-5 final
+    #   "Exponential"                           - / 10 ms          1e-11 against a tighter reference (linear problems only, no time steps)
+    #   "Parareal"                              slower than "Radau" here; only faster with many cores and evenly spread effort (see PararealIntegrator)
+    # The fixed-step methods converge as substeps grow. IMEX never iterates, but its explicit advection is only stable while
+    # deltaT * max|y| / deltaX stays below about 1. Dense output keeps every step's interpolant in memory; turn it off when only
+    # the sampled values are needed.
+    def SpecifySolverParameters(self):
+        if self.specification is None:
+            return
+
+        self.integrationMethod = self.specification.integrationMethod
+        self.absoluteTolerance = float(self.specification.absoluteTolerance)
+        self.relativeTolerance = float(self.specification.relativeTolerance)
+        self.denseOutput = bool(self.specification.denseOutput)
+        self.theta = float(self.specification.theta)
+        self.substeps = int(self.specification.substeps)
+        self.steadyStateTolerance = float(self.specification.steadyStateTolerance)
+        self.storeTimeSamples = bool(self.specification.storeTimeSamples)
+        self.pararealSlices = int(self.specification.pararealSlices)
+        self.pararealTolerance = float(self.specification.pararealTolerance)
+
+        self.kernelBackend = self.specification.kernelBackend
+        if self.kernelBackend not in ["numpy", "numba"]:
+            raise ValueError("Unknown kernel backend: " + str(self.kernelBackend) + " (options: numpy, numba)")
+        if self.kernelBackend == "numba" and not CompiledKernels.LoadNumba():
+            print("Warning: numba is not installed, the numpy kernel backend is used instead")
+            self.kernelBackend = "numpy"
+        if self.kernelBackend == "numba" and self.spatialOrder != 2:
+            print("Warning: the numba kernels are second order only, the numpy kernel backend is used instead")
+            self.kernelBackend = "numpy"
+
 
-        # non-dimensional initial conditions
-        # Future work: Could be replaced with a function parameter rather than using an explicit linear function here.
-        for i in range(0, n):
-            x = float(i) * self.deltaX
-            initialValueAtPositionX = self.initialConditionFunction.GetValue(x)
-            self.initialState[i] = initialValueAtPositionX
+    def SetInitialState(self):
+        # non-dimensional initial conditions, evaluated at every sample point at once
+        self.initialState = numpy.array(self.initialConditionFunction.GetValue(self.xSamplePoints), dtype=float)
+
+
+    # Returns the ProblemSpecification of this system. Systems built interactively have one assembled from the values entered.
+    def GetSpecification(self):
+        solverParameters = {name: getattr(self, name) for name in ['integrationMethod', 'absoluteTolerance', 'relativeTolerance', 'denseOutput', 'theta', 'substeps', 'steadyStateTolerance', 'storeTimeSamples', 'pararealSlices', 'pararealTolerance', 'kernelBackend']}
+        if self.specification is not None:
+            return self.specification.Replace(**solverParameters)
+
+        values = {
+            'numberOfPoints': len(self.xSamplePoints),
+            'xSamplePoints': None,
+            'spatialOrder': self.spatialOrder,
+            'startTime': float(self.timeSamplePoints[0]),
+            'endTime': float(self.timeSamplePoints[-1]),
+            'deltaT': self.deltaT,
+            'PDE': self.PDE.name,
+            'leftBoundaryCondition': self.leftBoundaryCondition.name,
+            'rightBoundaryCondition': self.rightBoundaryCondition.name,
+            'initialCondition': self.initialConditionFunction.name,
+            **solverParameters,
+        }
+
+        # Remaining fields are named after the attributes they set
+        for name in ProblemSpecification().ToDictionary():
+            if name in values:
+                continue
+            for component in [self.PDE, self.leftBoundaryCondition, self.rightBoundaryCondition, self.initialConditionFunction]:
+                if getattr(component, name, None) is not None:
+                    values[name] = getattr(component, name)
+
+        return ProblemSpecification.FromDictionary(values)
+
+
+    # Returns a new system with the named specification fields changed, moved onto xSamplePoints when they are given (see
+    # SetGrid), without the prompts or the full setup of a new system. Parameters of the PDE, boundary and initial conditions
+    # are changed on clones of those components, which keep the stencil weights while the grid is unchanged; changing any other
+    # field builds the new system from its specification instead. The clone starts unsolved and shares no mutable state.
+    # Single systems only, not ensembles.
+    def Clone(self, xSamplePoints=None, **changes):
+        specification = self.GetSpecification().Replace(**changes)
+        if xSamplePoints is not None:
+            specification = specification.Replace(xSamplePoints=numpy.asarray(xSamplePoints, dtype=float).tolist())
+
+        components = [self.PDE, self.leftBoundaryCondition, self.rightBoundaryCondition, self.initialConditionFunction]
+        if not all(any(name in component.parameterNames for component in components) for name in changes):
+            return DifferentialSystem(specification)
+
+        def ChangesOf(component):
+            return {name: value for name, value in changes.items() if name in component.parameterNames}
+
+        clone = copy.copy(self)
+        clone.specification = specification
+        clone.instrumentation = None
+        clone.computationalSolution = None
+        clone.lastStepSize = None
+        clone.linearJacobian = clone.linearJacobianBands = clone.linearConstantTerm = clone.linearFactorizations = None
+        clone.PDE = self.PDE.Clone(**ChangesOf(self.PDE))
+        clone.leftBoundaryCondition = self.leftBoundaryCondition.Clone(clone.PDE, **ChangesOf(self.leftBoundaryCondition))
+        clone.rightBoundaryCondition = self.rightBoundaryCondition.Clone(clone.PDE, **ChangesOf(self.rightBoundaryCondition))
+        clone.initialConditionFunction = self.initialConditionFunction.Clone(**ChangesOf(self.initialConditionFunction))
+        if xSamplePoints is not None:
+            clone.SetGrid(xSamplePoints)
+        clone.SetInitialState()
+        return clone
 
 
     # Generates the system of ODEs that represent the 1D partial differential equation being solved
-    def GenerateOrdinaryDifferentialEquationSystem(self, t, state):
+    # ODEs is an optional output buffer that is reused between calls. solve_ivp keeps references to the arrays it is given, so it is
+    # only passed by callers that own the buffer; otherwise a new uninitialized array is used (every entry is overwritten).
+    # Every call is counted by the instrumentation as a solver evaluation.
+    def GenerateOrdinaryDifferentialEquationSystem(self, t, state, ODEs=None):
+        ODEs = self.EvaluateOrdinaryDifferentialEquationSystem(state, ODEs)
+
+        if self.instrumentation is not None:
+            self.instrumentation.RecordRightHandSide(t)
+
+        return ODEs
+
+
+    # Evaluates the ODEs like GenerateOrdinaryDifferentialEquationSystem without recording the call, for evaluations the
+    # system makes for itself rather than for the integrator (the steady-state event, the constant term of a linear system)
+    def EvaluateOrdinaryDifferentialEquationSystem(self, state, ODEs=None):
+        if ODEs is None:
+            ODEs = numpy.empty(len(state), dtype=float)
+
+        if self.kernelBackend == "numba" and state.ndim == 1:
+            # Interior and boundary rows in one compiled pass
+            self.PDE.CompiledODE(state, ODEs, self.leftBoundaryCondition.GetRowCoefficients(), self.rightBoundaryCondition.GetRowCoefficients())
+        elif self.linearJacobian is not None:
+            # One sparse product replaces the stencils. Ensemble states are flattened to match the block diagonal J.
+            numpy.add(self.linearJacobian @ state.reshape(-1), self.linearConstantTerm, out=ODEs.reshape(-1))
+        else:
+            # Fill interior ODEs
+            self.PDE.VectorizedODE(state, ODEs)
+
+            # Set left boundary conditions
+            self.leftBoundaryCondition.VectorizedODE(state, ODEs)
+
+            # Set right boundary conditions
+            self.rightBoundaryCondition.VectorizedODE(state, ODEs)
+
+        return ODEs
+
+
+    # Reference implementation of GenerateOrdinaryDifferentialEquationSystem that evaluates the PDE one node at a time.
+    # Slow, but useful for checking the vectorized path against.
+    def GenerateReferenceOrdinaryDifferentialEquationSystem(self, t, state):
         n = len(self.xSamplePoints)
         ODEs = numpy.zeros(n, dtype=float)
 
@@ -170,14 +468,102 @@ class DifferentialSystem:
         # Set right boundary conditions
         ODEs[n - 1] = self.rightBoundaryCondition.ODE(state)
 
-        print('-> ', end='')
-
         return ODEs
 
 
-    # Generates Jacobian matrix
+    # Generates the non-zero diagonals of the Jacobian matrix in scipy.linalg.solve_banded layout, with half bandwidth
+    # b = len(jacobianBandOffsets) // 2: bands[b + i - j, j] = J[i][j]. For second order these are the three diagonals
+    # bands[0, i + 1] = J[i][i + 1], bands[1, i] = J[i][i], bands[2, i - 1] = J[i][i - 1]
+    def GenerateJacobianBands(self, t, state):
+        if self.instrumentation is not None:
+            self.instrumentation.RecordJacobian()
+
+        n = len(state)
+        if self.linearJacobian is not None:
+            # Callers may modify the bands in place
+            return self.linearJacobianBands.copy()
+        if self.kernelBackend == "numba":
+            # The kernels write every entry
+            bands = numpy.empty((len(self.jacobianBandOffsets), n), dtype=float)
+            return self.PDE.CompiledJacobianBands(state, bands, self.leftBoundaryCondition.GetRowCoefficients(), self.rightBoundaryCondition.GetRowCoefficients())
+
+        bands = numpy.zeros((len(self.jacobianBandOffsets), n), dtype=float)
+
+        # Fill interior rows
+        self.PDE.FillJacobianBands(state, bands)
+
+        # Set left boundary conditions
+        self.leftBoundaryCondition.FillJacobianBands(bands)
+        # Set right boundary conditions
+        self.rightBoundaryCondition.FillJacobianBands(bands)
+
+        return bands
+
+
+    # Generates the bands of the linear part L of the system, f(y) = L y + N(y), used by the IMEX integrator.
+    # For the Heat PDE this is the whole Jacobian; for Bateman-Burgers it is the diffusion term and the boundary rows.
+    def GenerateLinearJacobianBands(self):
+        n = len(self.xSamplePoints)
+        bands = numpy.zeros((len(self.jacobianBandOffsets), n), dtype=float)
+
+        self.PDE.FillLinearJacobianBands(bands)
+        self.leftBoundaryCondition.FillJacobianBands(bands)
+        self.rightBoundaryCondition.FillJacobianBands(bands)
+
+        return bands
+
+
+    # A system is linear when its PDE and both boundary conditions are. Its ODEs are then f(y) = J y + b with J and b constant.
+    def IsLinear(self):
+        return all(getattr(component, 'isLinear', False) for component in [self.PDE, self.leftBoundaryCondition, self.rightBoundaryCondition])
+
+
+    # Assembles J and b of a linear system once, so that the ODEs become one sparse product, solve_ivp gets the constant J
+    # instead of re-evaluating it, and the implicit fixed-step integrators solve every step with a cached factorization (see
+    # GetLinearSolver). Called at the start of every integration, so changes to the grid or parameters since the last one are
+    # picked up. Nonlinear systems keep the stencil evaluation.
+    def PrepareLinearOperator(self):
+        self.linearJacobian = None
+        self.linearFactorizations = {}
+        if not self.IsLinear():
+            return
+
+        n = len(self.initialState)
+        self.linearConstantTerm = self.EvaluateOrdinaryDifferentialEquationSystem(numpy.zeros(n))
+        self.linearJacobianBands = self.GenerateLinearJacobianBands()
+        # CSR has the faster product; solve_ivp and the factorizations convert it to CSC once
+        self.linearJacobian = scipy.sparse.dia_matrix((self.linearJacobianBands, self.jacobianBandOffsets), shape=(n, n)).tocsr()
+
+
+    # Returns a function solving (I - coefficient * J) x = r for a linear system, factorizing the matrix the first time the
+    # coefficient is seen. Fixed steps between evenly spaced output times differ by rounding only, and share a factorization.
+    def GetLinearSolver(self, coefficient):
+        for key, solve in self.linearFactorizations.items():
+            if abs(coefficient - key) <= 1.0e-12 * abs(coefficient):
+                return solve
+
+        n = self.linearJacobian.shape[0]
+        matrix = (scipy.sparse.identity(n, format='csc') - coefficient * self.linearJacobian).tocsc()
+        self.linearFactorizations[coefficient] = scipy.sparse.linalg.factorized(matrix)
+        return self.linearFactorizations[coefficient]
+
+
+    # Generates Jacobian matrix as a sparse banded matrix in CSC format, which Radau factorizes with a sparse LU in O(n)
     # Takes 3 arguments because the function is called in solve_ivp with 3 arguments. (Library requirements)
-    def GenerateJacobian(self, t, state):  # implement the differential-equation jacobian in this function
+    def GenerateJacobian(self, t, state):
+        n = len(state)
+        bands = self.GenerateJacobianBands(t, state)
+
+        # The solve_banded layout matches the dia_matrix layout for offsets (b, ..., 0, ..., -b)
+        return scipy.sparse.dia_matrix((bands, self.jacobianBandOffsets), shape=(n, n)).tocsc()
+
+
+    # Generates the dense n x n Jacobian matrix one node at a time.
+    # Kept as a reference for the sparse path and selectable with jacobianMode = 'dense'; costs O(n^2) memory and O(n^3) to factorize.
+    def GenerateDenseJacobian(self, t, state):  # implement the differential-equation jacobian in this function
+        if self.instrumentation is not None:
+            self.instrumentation.RecordJacobian()
+
         # Initialize empty n x n matrix
         n = len(self.xSamplePoints)
         jacobianMatrix = numpy.zeros((n, n), dtype=float)
@@ -194,14 +580,217 @@ class DifferentialSystem:
         return jacobianMatrix
 
 
-    def SolveSystem(self):
-        # Format time range
-        timeRange = numpy.zeros(2)
-        timeRange[0] = self.timeSamplePoints[0]
-        timeRange[1] = self.timeSamplePoints[len(self.timeSamplePoints) - 1]
+    # Generates the sparsity pattern of the Jacobian, used when solve_ivp estimates the Jacobian by finite differences
+    def GenerateJacobianSparsity(self):
+        n = len(self.xSamplePoints)
+        bands = numpy.ones((len(self.jacobianBandOffsets), n), dtype=float)
+        return scipy.sparse.dia_matrix((bands, self.jacobianBandOffsets), shape=(n, n)).tocsc()
 
+
+    # Solves for every output time. With a checkpointPath the run is integrated window by window (see IterateSolution), writing
+    # a checkpoint after each window of checkpointInterval output times (by default checkpointsPerRun checkpoints over the run),
+    # and the windows are joined into one solution.
+    def SolveSystem(self, checkpointPath=None, checkpointInterval=None):
         print('...working...')
-        # Calculate solution with library call to solve_ivp
-        self.computationalSolution = solve_ivp(self.GenerateOrdinaryDifferentialEquationSystem, timeRange, self.initialState, method ='Radau', t_eval = self.timeSamplePoints, dense_output = True, atol = 1.0e-9, rtol = 1.0e-9, jac = self.GenerateJacobian)
+        if checkpointPath is not None:
+            windows = list(self.IterateSolution(checkpointInterval, checkpointPath))
+            summary = self.computationalSolution
+            summary.t = numpy.concatenate([t for t, y in windows])
+            summary.y = numpy.concatenate([y for t, y in windows], axis=1)
+            return summary
+
+        if self.instrumentation is not None:
+            self.instrumentation.StartSolve((self.timeSamplePoints[0], self.timeSamplePoints[-1]))
+        with self.TimedPhase('solve'):
+            self.computationalSolution = self.Integrate(self.timeSamplePoints, self.initialState)
+        if self.instrumentation is not None:
+            self.instrumentation.RecordSolution(self.computationalSolution)
+
+        return self.computationalSolution
+
+
+    # Builds the system a checkpoint (see Checkpoint) was written from, starting at the checkpoint's time and state, with
+    # the solve_ivp step size the run had reached. Output times continue on the original run's grid. Giving an endTime past
+    # the original one extends the run to a longer horizon.
+    @classmethod
+    def FromCheckpoint(cls, path, endTime=None, instrumentation=None):
+        checkpoint = Checkpoint.ReadCheckpoint(path)
+        specification = checkpoint['specification']
+        endTime = specification.endTime if endTime is None else float(endTime)
+        if endTime <= checkpoint['t']:
+            raise ValueError("The checkpoint at t = " + str(checkpoint['t']) + " is already at or past endTime = " + str(endTime))
+
+        differentialSystem = cls(specification.Replace(startTime=checkpoint['t'], endTime=endTime), instrumentation)
+        if len(checkpoint['state']) != len(differentialSystem.xSamplePoints):
+            raise ValueError("The checkpoint state does not match the number of sample points")
+        differentialSystem.initialState = checkpoint['state']
+        differentialSystem.firstStep = checkpoint['stepSize']
+        return differentialSystem
+
+
+    # Writes the last state of the current solution as a checkpoint, from which FromCheckpoint resumes or extends the run
+    def WriteCheckpoint(self, path):
+        Checkpoint.WriteCheckpoint(path, self.GetSpecification().Replace(deltaT=self.deltaT), self.computationalSolution.t[-1],
+                                   self.computationalSolution.y[:, -1], self.lastStepSize)
+
+
+    # Integrates window by window, carrying the final state of each window into the next, and yields (t, y) for each window's new
+    # output times, with y shaped like solve_ivp's (points, times). Only one window of columns is held at a time and no dense
+    # interpolant is kept, so memory does not grow with the number of output times. Each yielded y is released once the
+    # consumer moves on. windowSize is the number of output times per window, by default as many as fit in maximumWindowBytes,
+    # and with a checkpointPath at most a checkpointsPerRun-th of the output times, so checkpoints are written periodically.
+    # Every window starts a new integration, so the solve_ivp step size and the BDF2 and IMEX history restart at window edges.
+    # When the generator finishes, computationalSolution holds only the last output time, with solver statistics summed over
+    # the windows, and a status, message and success that tell whether every output time was reached.
+    # With a checkpointPath a checkpoint is written after every window, and the solve_ivp step size is carried from one window
+    # into the next (which needs the dense output of each window), so a run resumed from any checkpoint takes the same steps.
+    def IterateSolution(self, windowSize=None, checkpointPath=None):
+        if windowSize is None:
+            windowSize = max(1, self.maximumWindowBytes // (8 * len(self.initialState)))
+            if checkpointPath is not None:
+                windowSize = min(windowSize, max(1, math.ceil((len(self.timeSamplePoints) - 1) / self.checkpointsPerRun)))
+        if self.integrationMethod == "Steady state":
+            windowSize = len(self.timeSamplePoints)
+
+        if self.instrumentation is not None:
+            self.instrumentation.StartSolve((self.timeSamplePoints[0], self.timeSamplePoints[-1]))
+
+        statistics = {'nfev': 0, 'njev': 0, 'nlu': 0}
+        state = numpy.array(self.initialState, dtype=float)
+        t = self.timeSamplePoints[:1]
+        status, message = 0, "The solver successfully reached the end of the integration interval."
+        yield t, state[:, None]
+
+        denseOutput, storeTimeSamples, firstStep = self.denseOutput, self.storeTimeSamples, self.firstStep
+        self.denseOutput, self.storeTimeSamples = checkpointPath is not None, True
+        try:
+            for start in range(0, len(self.timeSamplePoints) - 1, windowSize):
+                stop = min(start + windowSize, len(self.timeSamplePoints) - 1)
+                with self.TimedPhase('solve'):
+                    window = self.Integrate(self.timeSamplePoints[start:stop + 1], state)
+                for name in statistics:
+                    statistics[name] += int(window.get(name, 0))
+
+                # The first column repeats the previous window's last one
+                if len(window.t) > 1:
+                    t = window.t[1:]
+                    state = window.y[:, -1].copy()
+                    if checkpointPath is not None:
+                        self.firstStep = self.lastStepSize
+                        Checkpoint.WriteCheckpoint(checkpointPath, self.GetSpecification().Replace(deltaT=self.deltaT), t[-1], state, self.lastStepSize)
+                    yield t, window.y[:, 1:]
+                if window.status != 0:
+                    status, message = window.status, window.message
+                    break
+                del window
+        finally:
+            self.denseOutput, self.storeTimeSamples, self.firstStep = denseOutput, storeTimeSamples, firstStep
+            self.computationalSolution = OptimizeResult(t=t[-1:], y=state[:, None], sol=None, t_events=None, y_events=None, status=status,
+                                                        message=message, success=status >= 0, **statistics)
+            if self.instrumentation is not None:
+                self.instrumentation.RecordSolution(self.computationalSolution)
+
+
+    # Streams the solution into sink window by window (see IterateSolution). sink is either an object with an Append(t, y)
+    # method, such as SolutionStore.SolutionWriter, or a function called as sink(t, y). Returns the final computationalSolution.
+    # checkpointPath writes a checkpoint after every window.
+    def SolveStreaming(self, sink, windowSize=None, checkpointPath=None):
+        print('...working...')
+        append = sink.Append if hasattr(sink, 'Append') else sink
+        for t, y in self.IterateSolution(windowSize, checkpointPath):
+            append(t, y)
+
         return self.computationalSolution
 
+
+    # Integrates from initialState at timeSamplePoints[0] with the selected method and returns a solve_ivp style result
+    # holding the solution at every entry of timeSamplePoints
+    def Integrate(self, timeSamplePoints, initialState):
+        self.PrepareLinearOperator()
+        match self.integrationMethod:
+            case "Crank-Nicolson":
+                return ThetaMethodIntegrator(self, 0.5, self.substeps).Integrate(timeSamplePoints, initialState)
+            case "Theta":
+                return ThetaMethodIntegrator(self, self.theta, self.substeps).Integrate(timeSamplePoints, initialState)
+            case "BDF2":
+                return BDF2Integrator(self, self.substeps).Integrate(timeSamplePoints, initialState)
+            case "IMEX":
+                return IMEXIntegrator(self, self.substeps).Integrate(timeSamplePoints, initialState)
+            case "Exponential":
+                return ExponentialIntegrator(self).Integrate(timeSamplePoints, initialState)
+            case "Parareal":
+                return PararealIntegrator(self, self.pararealSlices, self.pararealTolerance).Integrate(timeSamplePoints, initialState)
+            case "Steady state":
+                return SteadyStateSolver(self).Integrate(timeSamplePoints, initialState)
+            case _:
+                return self.IntegrateWithSolveIVP(timeSamplePoints, initialState)
+
+
+    def IntegrateWithSolveIVP(self, timeSamplePoints, initialState):
+        # Format time range
+        timeRange = numpy.zeros(2)
+        timeRange[0] = timeSamplePoints[0]
+        timeRange[1] = timeSamplePoints[len(timeSamplePoints) - 1]
+
+        # Select how the Jacobian is supplied to the solver. Explicit methods do not use one, and LSODA takes the bands directly.
+        jacobianOptions = {}
+        if self.integrationMethod == "LSODA":
+            halfBandwidth = len(self.jacobianBandOffsets) // 2
+            jacobianOptions = {'jac': self.GenerateJacobianBands, 'lband': halfBandwidth, 'uband': halfBandwidth}
+        elif self.integrationMethod in ["Radau", "BDF"]:
+            match self.jacobianMode:
+                case "sparse" if self.linearJacobian is not None:
+                    # A constant matrix is never re-evaluated, and only refactorized when the step size changes
+                    jacobianOptions['jac'] = self.linearJacobian
+                case "sparse":
+                    jacobianOptions['jac'] = self.GenerateJacobian
+                case "dense":
+                    jacobianOptions['jac'] = self.GenerateDenseJacobian
+                case "sparsity":
+                    jacobianOptions['jac_sparsity'] = self.GenerateJacobianSparsity()
+                case _:
+                    raise ValueError("Unknown jacobian mode: " + str(self.jacobianMode))
+
+        # Optionally stop once the solution stops changing
+        events = None
+        if self.steadyStateTolerance > 0.0:
+            events = self.GenerateSteadyStateEvent()
+
+        # Without stored time samples only the end points are kept and the dense interpolant answers queries (see SolutionQuery)
+        outputTimes = timeSamplePoints
+        denseOutput = self.denseOutput
+        if not self.storeTimeSamples:
+            outputTimes = timeRange
+            denseOutput = True
+
+        # A given first step may not overshoot the interval
+        stepOptions = {}
+        if self.firstStep is not None:
+            stepOptions['first_step'] = min(self.firstStep, timeRange[1] - timeRange[0])
+
+        # Calculate solution with library call to solve_ivp
+        solution = solve_ivp(self.GenerateOrdinaryDifferentialEquationSystem, timeRange, initialState, method = self.integrationMethod, t_eval = outputTimes, dense_output = denseOutput, atol = self.absoluteTolerance, rtol = self.relativeTolerance, events = events, **jacobianOptions, **stepOptions)
+
+        # The last step is usually cut short to land on the end time, so the one before it is the step size the solver had reached
+        self.lastStepSize = None
+        if solution.sol is not None and len(solution.sol.ts) > 1:
+            steps = numpy.diff(solution.sol.ts)
+            self.lastStepSize = float(steps[-2] if len(steps) > 1 else steps[-1])
+
+        # A run stopped by the event ends with the state it stopped at, which is usually between output times
+        if solution.status == 1 and len(solution.t_events[0]) > 0 and solution.t_events[0][0] > solution.t[-1]:
+            solution.t = numpy.append(solution.t, solution.t_events[0][0])
+            solution.y = numpy.concatenate([solution.y, solution.y_events[0][0][:, None]], axis=1)
+        return solution
+
+
+    # Returns a terminal solve_ivp event that crosses zero when max|dy/dt| falls below steadyStateTolerance.
+    # The run then ends with status 1 at the time the event was found, after the output times reached so far.
+    # Event evaluations are not counted as right-hand side evaluations by the instrumentation.
+    def GenerateSteadyStateEvent(self):
+        def SteadyStateReached(t, state):
+            return numpy.max(numpy.abs(self.EvaluateOrdinaryDifferentialEquationSystem(state))) - self.steadyStateTolerance
+
+        SteadyStateReached.terminal = True
+        SteadyStateReached.direction = -1
+        return SteadyStateReached
@@ -0,0 +1,146 @@
+import copy
+import numpy
+import scipy.sparse
+from DifferentialSystem import DifferentialSystem
+
+
+# Solves M members that share a grid, output times, PDE, boundary condition types and solver settings, but differ in
+# parameters and initial conditions, as one stacked system of M * n ODEs in a single integration.
+# The PDE and boundary conditions are evaluated for every member at once: their parameters become (M, 1) arrays that
+# broadcast against the (M, n) state. The Jacobian is block diagonal with one banded block per member, so it keeps the
+# band layout and every integrator of DifferentialSystem works on the stacked system unchanged.
+# After SolveSystem, computationalSolution.y is shaped (M, n, T).
+class EnsembleSystem(DifferentialSystem):
+    # Local Variables
+    members = None
+    numberOfMembers = None
+    numberOfPoints = None
+
+
+    def __init__(self, specifications, instrumentation=None):
+        self.instrumentation = instrumentation
+        with self.TimedPhase('setup'):
+            self.members = [DifferentialSystem(specification) for specification in specifications]
+            if len(self.members) == 0:
+                raise ValueError("An ensemble needs at least one member")
+
+            self.CheckMembers()
+            self.StackMembers()
+
+
+    # Builds an ensemble whose members are baseSpecification with each dictionary of changes applied
+    @classmethod
+    def FromVariations(cls, baseSpecification, variations, instrumentation=None):
+        return cls([baseSpecification.Replace(**changes) for changes in variations], instrumentation)
+
+
+    def CheckMembers(self):
+        first = self.members[0]
+        for member in self.members[1:]:
+            if not (numpy.array_equal(member.xSamplePoints, first.xSamplePoints) and numpy.array_equal(member.timeSamplePoints, first.timeSamplePoints)):
+                raise ValueError("Ensemble members must share the same space and time sample points")
+            if (member.PDE.name, member.leftBoundaryCondition.name, member.rightBoundaryCondition.name, member.spatialOrder) != (first.PDE.name, first.leftBoundaryCondition.name, first.rightBoundaryCondition.name, first.spatialOrder):
+                raise ValueError("Ensemble members must use the same PDE, boundary condition types and spatial order")
+            if (member.integrationMethod, member.absoluteTolerance, member.relativeTolerance, member.theta, member.substeps, member.steadyStateTolerance) != (first.integrationMethod, first.absoluteTolerance, first.relativeTolerance, first.theta, first.substeps, first.steadyStateTolerance):
+                raise ValueError("Ensemble members must use the same solver settings")
+        # Parareal workers rebuild the system from one specification, which a stacked ensemble does not have
+        if first.integrationMethod == "Parareal":
+            raise ValueError("Parareal is not available for ensembles, solve the members separately or choose another integration method")
+
+
+    # Copies the shared settings of the first member and stacks the per-member parameters and initial states
+    def StackMembers(self):
+        first = self.members[0]
+        self.numberOfMembers = len(self.members)
+        self.numberOfPoints = len(first.xSamplePoints)
+        for name in ['deltaX', 'deltaT', 'xSamplePoints', 'spatialOrder', 'jacobianBandOffsets', 'timeSamplePoints', 'integrationMethod', 'absoluteTolerance', 'relativeTolerance',
+                     'denseOutput', 'theta', 'substeps', 'steadyStateTolerance', 'storeTimeSamples', 'kernelBackend', 'jacobianMode']:
+            setattr(self, name, getattr(first, name))
+
+        self.PDE = self.StackParameters([member.PDE for member in self.members])
+        self.leftBoundaryCondition = self.StackParameters([member.leftBoundaryCondition for member in self.members])
+        self.leftBoundaryCondition.Rebind(self.PDE)
+        self.rightBoundaryCondition = self.StackParameters([member.rightBoundaryCondition for member in self.members])
+        self.rightBoundaryCondition.Rebind(self.PDE)
+
+        self.initialState = numpy.concatenate([member.initialState for member in self.members])
+
+
+    # Returns a copy of the first component whose parameters are (M, 1) arrays holding every member's value
+    @staticmethod
+    def StackParameters(components):
+        stacked = copy.copy(components[0])
+        for name in stacked.parameterNames:
+            setattr(stacked, name, numpy.array([getattr(component, name) for component in components], dtype=float)[:, None])
+        return stacked
+
+
+    def GetSpecifications(self):
+        return [member.GetSpecification() for member in self.members]
+
+
+    # Evaluates the ODEs of every member at once on the (M, n) view of the flattened state
+    def EvaluateOrdinaryDifferentialEquationSystem(self, state, ODEs=None):
+        if ODEs is None:
+            ODEs = numpy.empty(len(state), dtype=float)
+
+        shape = (self.numberOfMembers, self.numberOfPoints)
+        super().EvaluateOrdinaryDifferentialEquationSystem(numpy.reshape(state, shape), ODEs.reshape(shape))
+        return ODEs
+
+
+    # Evaluates every member separately with the per-node reference implementation
+    def GenerateReferenceOrdinaryDifferentialEquationSystem(self, t, state):
+        memberStates = numpy.reshape(state, (self.numberOfMembers, self.numberOfPoints))
+        return numpy.concatenate([member.GenerateReferenceOrdinaryDifferentialEquationSystem(t, memberStates[i]) for i, member in enumerate(self.members)])
+
+
+    # Interleaves the (M, bands, n) member bands into the (bands, M * n) bands of the block diagonal matrix. The bands that would
+    # couple the last nodes of one member to the first nodes of the next are never written and stay zero.
+    def FlattenBands(self, memberBands):
+        return memberBands.transpose(1, 0, 2).reshape(memberBands.shape[1], self.numberOfMembers * self.numberOfPoints)
+
+
+    def GenerateJacobianBands(self, t, state):
+        if self.instrumentation is not None:
+            self.instrumentation.RecordJacobian()
+
+        memberStates = numpy.reshape(state, (self.numberOfMembers, self.numberOfPoints))
+        memberBands = numpy.zeros((self.numberOfMembers, len(self.jacobianBandOffsets), self.numberOfPoints), dtype=float)
+        self.PDE.FillJacobianBands(memberStates, memberBands)
+        self.leftBoundaryCondition.FillJacobianBands(memberBands)
+        self.rightBoundaryCondition.FillJacobianBands(memberBands)
+
+        return self.FlattenBands(memberBands)
+
+
+    def GenerateLinearJacobianBands(self):
+        memberBands = numpy.zeros((self.numberOfMembers, len(self.jacobianBandOffsets), self.numberOfPoints), dtype=float)
+        self.PDE.FillLinearJacobianBands(memberBands)
+        self.leftBoundaryCondition.FillJacobianBands(memberBands)
+        self.rightBoundaryCondition.FillJacobianBands(memberBands)
+
+        return self.FlattenBands(memberBands)
+
+
+    def GenerateDenseJacobian(self, t, state):
+        return self.GenerateJacobian(t, state).toarray()
+
+
+    def GenerateJacobianSparsity(self):
+        memberBands = numpy.ones((self.numberOfMembers, len(self.jacobianBandOffsets), self.numberOfPoints), dtype=float)
+        for row, offset in enumerate(self.jacobianBandOffsets):
+            if offset > 0:
+                memberBands[:, row, :offset] = 0.0
+            elif offset < 0:
+                memberBands[:, row, offset:] = 0.0
+
+        n = self.numberOfMembers * self.numberOfPoints
+        return scipy.sparse.dia_matrix((self.FlattenBands(memberBands), self.jacobianBandOffsets), shape=(n, n)).tocsc()
+
+
+    # Solves every member in one integration and reshapes y to (members, points, times)
+    def SolveSystem(self):
+        super().SolveSystem()
+        self.computationalSolution.y = self.computationalSolution.y.reshape(self.numberOfMembers, self.numberOfPoints, -1)
+        return self.computationalSolution
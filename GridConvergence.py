@@ -0,0 +1,155 @@
+import argparse
+import contextlib
+import io
+import json
+import math
+import numpy
+from DifferentialSystem import DifferentialSystem
+from ProblemSpecification import ProblemSpecification
+
+
+# Grid convergence study by Richardson extrapolation. The problem is solved on a sequence of grids that each halve the spacing
+# of the one before (uniform grids double numberOfPoints - 1, explicit xSamplePoints gain the midpoint of every interval), so
+# every point of a grid is also a point of the next and solutions are compared there without interpolation.
+# With u[k] the solution on grid k and p the order of accuracy, u[k] - u ~ C h[k]^p, so consecutive grids give
+#   error(u[k]) ~ |u[k + 1] - u[k]| * 2^p / (2^p - 1)   and   error(u[k + 1]) ~ |u[k + 1] - u[k]| / (2^p - 1)
+# p is the order observed on the last three grids, log2 of the ratio of their differences, or the formal spatialOrder while
+# there are only two. Differences are the largest over the shared points and every output time.
+# The time integration error is not separated out, so the solver tolerances must be well below the error tolerance.
+class GridConvergence:
+    # Local Variables
+    specification = None
+    tolerance = None
+    maximumLevels = None
+    levels = None
+
+
+    # Refines specification until the finest grid meets tolerance, up to maximumLevels grids (at least 3)
+    def __init__(self, specification, tolerance, maximumLevels=6):
+        self.specification = specification
+        self.tolerance = tolerance
+        self.maximumLevels = max(3, maximumLevels)
+        if min(specification.absoluteTolerance, specification.relativeTolerance) > 0.1 * tolerance:
+            print("Warning: the solver tolerances are not well below the error tolerance, so the time integration error may dominate")
+
+
+    # Returns the specification with the spacing of every interval halved
+    @staticmethod
+    def RefineSpecification(specification):
+        if specification.xSamplePoints is None:
+            return specification.Replace(numberOfPoints=2 * (int(specification.numberOfPoints) - 1) + 1)
+
+        xSamplePoints = numpy.asarray(specification.xSamplePoints, dtype=float)
+        refined = numpy.empty(2 * len(xSamplePoints) - 1)
+        refined[0::2] = xSamplePoints
+        refined[1::2] = 0.5 * (xSamplePoints[:-1] + xSamplePoints[1:])
+        return specification.Replace(xSamplePoints=refined.tolist())
+
+
+    @staticmethod
+    def Solve(specification):
+        with contextlib.redirect_stdout(io.StringIO()):
+            differentialSystem = DifferentialSystem(specification)
+            differentialSystem.SolveSystem()
+        solution = differentialSystem.computationalSolution
+        if not solution.success:
+            raise RuntimeError(solution.message)
+        return differentialSystem
+
+
+    # Solves the sequence of grids and returns a dictionary with one entry per grid in 'levels' (number of points, smallest
+    # spacing, difference from the previous grid, observed order and estimated error), the index of the coarsest grid whose
+    # estimated error meets the tolerance in 'coarsestLevel' (None when none does), and for uniform grids the number of
+    # points the estimated errors predict would just meet it in 'predictedNumberOfPoints'.
+    def Run(self):
+        specification = self.specification
+        formalOrder = int(specification.spatialOrder)
+        self.levels = []
+        previous = None
+        for level in range(0, self.maximumLevels):
+            differentialSystem = self.Solve(specification)
+            y = numpy.asarray(differentialSystem.computationalSolution.y)
+            entry = {'numberOfPoints': len(differentialSystem.xSamplePoints), 'deltaX': differentialSystem.deltaX, 'difference': None,
+                     'observedOrder': None, 'estimatedError': None}
+
+            if previous is not None:
+                if previous.shape[1] != y.shape[1]:
+                    raise RuntimeError("The grids reached different output times, so they cannot be compared")
+                entry['difference'] = float(numpy.max(numpy.abs(y[::2] - previous)))
+            self.levels.append(entry)
+            self.EstimateErrors(formalOrder)
+
+            if level >= 2 and self.levels[-1]['estimatedError'] <= self.tolerance:
+                break
+            previous = y
+            specification = self.RefineSpecification(specification)
+
+        coarsestLevel = next((k for k, entry in enumerate(self.levels) if entry['estimatedError'] <= self.tolerance), None)
+        return {'tolerance': self.tolerance, 'levels': self.levels, 'coarsestLevel': coarsestLevel,
+                'predictedNumberOfPoints': self.PredictNumberOfPoints()}
+
+
+    # Fills observedOrder and estimatedError of every level from the differences so far
+    def EstimateErrors(self, formalOrder):
+        for k in range(1, len(self.levels)):
+            order = formalOrder
+            if k >= 2 and self.levels[k]['difference'] > 0.0 and self.levels[k - 1]['difference'] > 0.0:
+                order = math.log2(self.levels[k - 1]['difference'] / self.levels[k]['difference'])
+                self.levels[k]['observedOrder'] = order
+            # Orders far from the formal one mean the grids are not yet in the asymptotic range; the formal one is safer then
+            if not 0.5 * formalOrder <= order <= 1.5 * formalOrder:
+                order = formalOrder
+
+            factor = 2.0 ** order
+            self.levels[k - 1]['estimatedError'] = self.levels[k]['difference'] * factor / (factor - 1.0)
+            self.levels[k]['estimatedError'] = self.levels[k]['difference'] / (factor - 1.0)
+
+
+    # Number of evenly spaced points at which the finest grid's error estimate scales down to the tolerance, using the observed order
+    def PredictNumberOfPoints(self):
+        if self.specification.xSamplePoints is not None or len(self.levels) < 2:
+            return None
+
+        finest = self.levels[-1]
+        order = finest['observedOrder'] or int(self.specification.spatialOrder)
+        if finest['estimatedError'] == 0.0 or order <= 0.0:
+            return None
+        return int(math.ceil((finest['numberOfPoints'] - 1) * (finest['estimatedError'] / self.tolerance) ** (1.0 / order))) + 1
+
+
+def PrintReport(result):
+    print(f"{'points':>8} {'deltaX':>12} {'difference':>12} {'order':>7} {'error':>12}")
+    for k, entry in enumerate(result['levels']):
+        difference = '' if entry['difference'] is None else f"{entry['difference']:.3e}"
+        order = '' if entry['observedOrder'] is None else f"{entry['observedOrder']:.2f}"
+        marker = '  <- coarsest meeting tolerance' if k == result['coarsestLevel'] else ''
+        print(f"{entry['numberOfPoints']:>8} {entry['deltaX']:>12.4e} {difference:>12} {order:>7} {entry['estimatedError']:>12.3e}{marker}")
+
+    if result['coarsestLevel'] is None:
+        print("No grid met the tolerance of " + str(result['tolerance']))
+    if result['predictedNumberOfPoints'] is not None:
+        print("Predicted evenly spaced points for a tolerance of " + str(result['tolerance']) + ": " + str(result['predictedNumberOfPoints']))
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Finds the coarsest grid that meets an error tolerance by Richardson extrapolation.')
+    parser.add_argument('--spec', required=True, help='JSON or TOML problem specification file, whose grid is the coarsest one tried')
+    parser.add_argument('--tolerance', type=float, required=True, help='largest acceptable error over every point and output time')
+    parser.add_argument('--levels', type=int, default=6, help='largest number of grids solved (default: 6)')
+    parser.add_argument('--order', type=int, help='spatial order to use instead of the specification\'s')
+    parser.add_argument('--output', help='write the study to this JSON file')
+    options = parser.parse_args(arguments)
+
+    specification = ProblemSpecification.FromFile(options.spec)
+    if options.order is not None:
+        specification = specification.Replace(spatialOrder=options.order)
+
+    result = GridConvergence(specification, options.tolerance, options.levels).Run()
+    PrintReport(result)
+    if options.output is not None:
+        with open(options.output, 'wt') as fileStream:
+            json.dump(result, fileStream, indent=4)
+
+
+if __name__ == '__main__':
+    main()
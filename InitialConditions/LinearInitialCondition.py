@@ -1,12 +1,31 @@
+import copy
+
+
 class LinearInitialCondition:
     # Local variables
-    leftStartingY = None
-    rightStartingY = None
+    name = "Linear"
+    parameterNames = ("leftStartingY", "rightStartingY")
+    __slots__ = ("leftStartingY", "rightStartingY")
 
-    def __init__(self, differentialSystem):
-        self.leftStartingY = float(input("Please enter the left hand side initial value: "))
-        self.rightStartingY = float(input("Please enter the right hand side initial value: "))
+    # Reads the end values from specification when one is given, otherwise prompts for them
+    def __init__(self, differentialSystem, specification=None):
+        if specification is None:
+            self.leftStartingY = float(input("Please enter the left hand side initial value: "))
+            self.rightStartingY = float(input("Please enter the right hand side initial value: "))
+        else:
+            self.leftStartingY = float(specification.leftStartingY)
+            self.rightStartingY = float(specification.rightStartingY)
 
 
     def GetValue(self, x):
-        return ((self.rightStartingY - self.leftStartingY) * x) + self.leftStartingY
\ No newline at end of file
+        return ((self.rightStartingY - self.leftStartingY) * x) + self.leftStartingY
+
+
+    # Returns a copy with the named parameters changed
+    def Clone(self, **changes):
+        clone = copy.copy(self)
+        for name, value in changes.items():
+            if name not in self.parameterNames:
+                raise ValueError("Unknown " + self.name + " initial condition parameter: " + name + " (options: " + ", ".join(self.parameterNames) + ")")
+            setattr(clone, name, float(value))
+        return clone
@@ -0,0 +1,63 @@
+import numpy
+from scipy.optimize import OptimizeResult
+from Integrators.NewtonSolver import NewtonSolver
+
+
+# Fixed-step second order backward differentiation formula:
+# y[n + 1] - (2 / 3) * h * f(t[n + 1], y[n + 1]) = (4 / 3) * y[n] - (1 / 3) * y[n - 1]
+# L-stable, so stiff transients are damped rather than oscillating as they can with Crank-Nicolson.
+# The first step, and any step after the step size changes, is a backward Euler step.
+class BDF2Integrator:
+    # Local Variables
+    differentialSystem = None
+    substeps = None
+    newtonSolver = None
+
+
+    def __init__(self, differentialSystem, substeps=1):
+        self.differentialSystem = differentialSystem
+        self.substeps = int(substeps)
+        self.newtonSolver = NewtonSolver(differentialSystem)
+
+
+    # Integrates from initialState at timeSamplePoints[0] and returns a solve_ivp style result with y at every timeSamplePoints entry
+    def Integrate(self, timeSamplePoints, initialState):
+        timeSamplePoints = numpy.asarray(timeSamplePoints, dtype=float)
+        y = numpy.empty((len(initialState), len(timeSamplePoints)), dtype=float)
+        y[:, 0] = initialState
+
+        state = numpy.array(initialState, dtype=float)
+        previousState = None
+        previousH = None
+
+        for k in range(1, len(timeSamplePoints)):
+            h = (timeSamplePoints[k] - timeSamplePoints[k - 1]) / self.substeps
+            for substep in range(0, self.substeps):
+                tNext = timeSamplePoints[k - 1] + (substep + 1) * h
+
+                if previousState is None or abs(h - previousH) > 1.0e-12 * abs(h):
+                    # Backward Euler start
+                    constant = state
+                    coefficient = h
+                    guess = state
+                else:
+                    constant = (4.0 / 3.0) * state - (1.0 / 3.0) * previousState
+                    coefficient = (2.0 / 3.0) * h
+                    guess = 2.0 * state - previousState
+
+                newState, f, converged = self.newtonSolver.Solve(tNext, guess, constant, coefficient)
+                if not converged:
+                    return self.GetResult(timeSamplePoints[:k], y[:, :k], -1, "Newton iteration did not converge at t = " + str(tNext))
+
+                previousState = state
+                previousH = h
+                state = newState
+
+            y[:, k] = state
+
+        return self.GetResult(timeSamplePoints, y, 0, "The solver successfully reached the end of the integration interval.")
+
+
+    def GetResult(self, t, y, status, message):
+        return OptimizeResult(t=t, y=y, sol=None, t_events=None, y_events=None, status=status, message=message, success=status >= 0,
+                              **self.newtonSolver.GetStatistics())
@@ -0,0 +1,90 @@
+import numpy
+import scipy.sparse
+import scipy.sparse.linalg
+from scipy.optimize import OptimizeResult
+
+
+# Fixed-step implicit-explicit integrator for f(y) = L y + N(y), where L is the constant linear part of the system
+# (the alpha diffusion term and boundary rows) and N(y) the remainder (the state**2 advection of Bateman-Burgers).
+# L is treated with Crank-Nicolson and N with second order Adams-Bashforth (CNAB2):
+#   (I - h / 2 L) y[n + 1] = (I + h / 2 L) y[n] + h * (3 / 2 N(y[n]) - 1 / 2 N(y[n - 1]))
+# The matrix on the left is constant, so it is factorized once per step size and every step is a single sparse solve.
+# The first step, and any step after the step size changes, uses forward Euler for N.
+# The explicit advection is stable only while deltaT * max|y| / deltaX stays below about 1.
+class IMEXIntegrator:
+    # Local Variables
+    differentialSystem = None
+    substeps = None
+    linearOperator = None
+    factorizations = None
+    numberOfRightHandSideEvaluations = 0
+    numberOfFactorizations = 0
+
+
+    def __init__(self, differentialSystem, substeps=1):
+        self.differentialSystem = differentialSystem
+        self.substeps = int(substeps)
+        self.factorizations = {}
+
+        bands = differentialSystem.GenerateLinearJacobianBands()
+        n = bands.shape[1]
+        self.linearOperator = scipy.sparse.dia_matrix((bands, differentialSystem.jacobianBandOffsets), shape=(n, n)).tocsc()
+
+
+    # Returns a solver for (I - h / 2 L) x = b, factorizing it the first time h is seen
+    def GetSolver(self, h):
+        if h not in self.factorizations:
+            n = self.linearOperator.shape[0]
+            matrix = (scipy.sparse.identity(n, format='csc') - (0.5 * h) * self.linearOperator).tocsc()
+            self.factorizations[h] = scipy.sparse.linalg.factorized(matrix)
+            self.numberOfFactorizations += 1
+        return self.factorizations[h]
+
+
+    # N(y) = f(y) - L y
+    def GetNonlinearTerm(self, t, state):
+        self.numberOfRightHandSideEvaluations += 1
+        return self.differentialSystem.GenerateOrdinaryDifferentialEquationSystem(t, state) - self.linearOperator @ state
+
+
+    # Integrates from initialState at timeSamplePoints[0] and returns a solve_ivp style result with y at every timeSamplePoints entry
+    def Integrate(self, timeSamplePoints, initialState):
+        timeSamplePoints = numpy.asarray(timeSamplePoints, dtype=float)
+        y = numpy.empty((len(initialState), len(timeSamplePoints)), dtype=float)
+        y[:, 0] = initialState
+
+        state = numpy.array(initialState, dtype=float)
+        nonlinearTerm = self.GetNonlinearTerm(timeSamplePoints[0], state)
+        previousNonlinearTerm = None
+        previousH = None
+
+        for k in range(1, len(timeSamplePoints)):
+            h = (timeSamplePoints[k] - timeSamplePoints[k - 1]) / self.substeps
+            # Uniformly spaced output times differ by rounding only, keep the same step (and factorization) for them
+            if previousH is not None and abs(h - previousH) <= 1.0e-12 * abs(h):
+                h = previousH
+            solve = self.GetSolver(h)
+            for substep in range(0, self.substeps):
+                if previousNonlinearTerm is None or h != previousH:
+                    explicitTerm = nonlinearTerm
+                else:
+                    explicitTerm = 1.5 * nonlinearTerm - 0.5 * previousNonlinearTerm
+
+                state = solve(state + (0.5 * h) * (self.linearOperator @ state) + h * explicitTerm)
+                if not numpy.all(numpy.isfinite(state)):
+                    tFailed = timeSamplePoints[k - 1] + (substep + 1) * h
+                    return self.GetResult(timeSamplePoints[:k], y[:, :k], -1, "IMEX integration became unstable at t = " + str(tFailed)
+                                          + ", reduce deltaT or increase substeps")
+
+                previousNonlinearTerm = nonlinearTerm
+                previousH = h
+                nonlinearTerm = self.GetNonlinearTerm(timeSamplePoints[k - 1] + (substep + 1) * h, state)
+
+            y[:, k] = state
+
+        return self.GetResult(timeSamplePoints, y, 0, "The solver successfully reached the end of the integration interval.")
+
+
+    def GetResult(self, t, y, status, message):
+        return OptimizeResult(t=t, y=y, sol=None, t_events=None, y_events=None, status=status, message=message, success=status >= 0,
+                              nfev=self.numberOfRightHandSideEvaluations, njev=0, nlu=self.numberOfFactorizations)
@@ -0,0 +1,61 @@
+import numpy
+from scipy.linalg import solve_banded
+
+
+# Solves the implicit stage equation y - coefficient * f(t, y) = constant of a one-step method with Newton's method.
+# Each iteration assembles the banded Jacobian from the PDE and boundary condition stencils and solves with solve_banded.
+# A linear system, f(y) = J y + b, is solved directly with the system's cached factorization of I - coefficient * J instead.
+class NewtonSolver:
+    # Local Variables
+    differentialSystem = None
+    tolerance = None
+    maximumIterations = None
+    ODEs = None
+    numberOfRightHandSideEvaluations = 0
+    numberOfJacobianEvaluations = 0
+    numberOfLinearSolves = 0
+
+
+    def __init__(self, differentialSystem, tolerance=1.0e-10, maximumIterations=20):
+        self.differentialSystem = differentialSystem
+        self.tolerance = tolerance
+        self.maximumIterations = maximumIterations
+        self.ODEs = None
+
+
+    # Returns (y, f, converged) where f = f(t, y) at the returned y. The returned f is an internal buffer that the next call overwrites.
+    def Solve(self, t, guess, constant, coefficient):
+        y = numpy.array(guess, dtype=float)
+        if self.ODEs is None or len(self.ODEs) != len(y):
+            self.ODEs = numpy.empty(len(y), dtype=float)
+
+        if self.differentialSystem.linearJacobian is not None:
+            # (I - coefficient * J) y = constant + coefficient * b
+            y = self.differentialSystem.GetLinearSolver(coefficient)(constant + coefficient * self.differentialSystem.linearConstantTerm)
+            self.numberOfLinearSolves += 1
+            self.numberOfRightHandSideEvaluations += 1
+            return y, self.differentialSystem.GenerateOrdinaryDifferentialEquationSystem(t, y, self.ODEs), True
+
+        for iteration in range(0, self.maximumIterations):
+            f = self.differentialSystem.GenerateOrdinaryDifferentialEquationSystem(t, y, self.ODEs)
+            self.numberOfRightHandSideEvaluations += 1
+
+            residual = y - coefficient * f - constant
+            if numpy.max(numpy.abs(residual)) <= self.tolerance * (1.0 + numpy.max(numpy.abs(y))):
+                return y, f, True
+
+            # (I - coefficient * J) delta = residual
+            bands = self.differentialSystem.GenerateJacobianBands(t, y)
+            self.numberOfJacobianEvaluations += 1
+            bands *= -coefficient
+            halfBandwidth = bands.shape[0] // 2
+            bands[halfBandwidth] += 1.0
+            y -= solve_banded((halfBandwidth, halfBandwidth), bands, residual, overwrite_ab=True, overwrite_b=True, check_finite=False)
+            self.numberOfLinearSolves += 1
+
+        return y, self.differentialSystem.GenerateOrdinaryDifferentialEquationSystem(t, y, self.ODEs), False
+
+
+    # Counters in the form solve_ivp reports them
+    def GetStatistics(self):
+        return {'nfev': self.numberOfRightHandSideEvaluations, 'njev': self.numberOfJacobianEvaluations, 'nlu': self.numberOfLinearSolves}
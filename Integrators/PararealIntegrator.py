@@ -0,0 +1,146 @@
+import contextlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy
+from scipy.optimize import OptimizeResult
+from Integrators.ThetaMethodIntegrator import ThetaMethodIntegrator
+
+# System every worker process integrates its slices with, built once per worker by InitializeWorker
+fineSystem = None
+
+
+# Runs once in every worker process: builds the fine system from the specification's dictionary
+def InitializeWorker(specificationValues):
+    global fineSystem
+    from DifferentialSystem import DifferentialSystem
+    from ProblemSpecification import ProblemSpecification
+    with contextlib.redirect_stdout(io.StringIO()):
+        fineSystem = DifferentialSystem(ProblemSpecification.FromDictionary(specificationValues))
+
+
+# Integrates one slice with the fine system from state at sliceTimes[0] and returns the solve_ivp style result plus the
+# slice's wall time under 'seconds'. Defined at module level so that worker processes can unpickle it.
+def FineSolve(sliceTimes, state):
+    start = time.perf_counter()
+    solution = fineSystem.Integrate(sliceTimes, state)
+    return OptimizeResult(t=solution.t, y=solution.y, status=solution.status, message=solution.message, nfev=int(solution.get('nfev', 0)),
+                          njev=int(solution.get('njev', 0)), nlu=int(solution.get('nlu', 0)), seconds=time.perf_counter() - start)
+
+
+# Parareal: the output times are split into slices that are integrated in parallel, each on a worker process with the fine
+# method (fineMethod, Radau by default, at the system's tolerances), while a cheap coarse method (backward Euler, coarseSteps
+# steps per slice) carries corrections across the slices serially. With U[n] the state at the start of slice n, F the fine and
+# G the coarse propagator,
+#   U[n + 1] <- G(U'[n]) + F(U[n]) - G(U[n])
+# where U' is the new iterate, repeated until no slice start changes by more than tolerance * (1 + |U|). Iteration k makes the
+# first k slices exact, so at most numberOfSlices iterations are needed; slices whose start did not change are not re-solved.
+# The parallel critical path (coarse time plus the slowest fine slice of every iteration) is kept in criticalPathSeconds,
+# the wall time the run would take with a core per slice.
+# The speedup is at most numberOfSlices / iterations, and only when the fine effort is spread evenly over the slices. Radau's
+# is not: these problems relax towards a steady state, so nearly all of its steps are taken early (half of them in the first
+# output interval after a non-smooth start) and the first slice costs about as much as the serial run. Measured with
+# Benchmarks/PararealBenchmark (201 points to t = 10, 2 to 4 iterations), the projected speedup with 16 cores is 1.0 for Heat
+# and 0.8 for Bateman-Burgers with Radau, and 4.1 and 1.4 with a fixed-step Crank-Nicolson fine method (substeps = 20).
+class PararealIntegrator:
+    # Local Variables
+    differentialSystem = None
+    numberOfSlices = None
+    tolerance = None
+    numberOfWorkers = None
+    coarseSteps = 10
+    fineMethod = "Radau"
+    coarseIntegrator = None
+    iterations = 0
+    criticalPathSeconds = 0.0
+
+
+    # numberOfSlices of 0 uses one per processor. numberOfWorkers defaults to one per slice, at most the number of processors.
+    def __init__(self, differentialSystem, numberOfSlices=0, tolerance=1.0e-6, numberOfWorkers=None):
+        self.differentialSystem = differentialSystem
+        self.numberOfSlices = int(numberOfSlices) if numberOfSlices > 0 else os.cpu_count()
+        self.tolerance = tolerance
+        self.numberOfWorkers = numberOfWorkers
+        self.coarseIntegrator = ThetaMethodIntegrator(differentialSystem, 1.0, self.coarseSteps)
+
+
+    # Returns exact integer indices into timeSamplePoints of the slice boundaries, at least one output interval per slice
+    def GetBoundaries(self, numberOfTimes):
+        return numpy.unique(numpy.linspace(0, numberOfTimes - 1, min(self.numberOfSlices, numberOfTimes - 1) + 1).round().astype(int))
+
+
+    # Coarse propagation over one slice, None when its Newton iteration fails
+    def Coarse(self, sliceTimes, state):
+        solution = self.coarseIntegrator.Integrate(sliceTimes[[0, -1]], state)
+        return solution.y[:, -1] if solution.status == 0 else None
+
+
+    def Integrate(self, timeSamplePoints, initialState):
+        timeSamplePoints = numpy.asarray(timeSamplePoints, dtype=float)
+        y = numpy.empty((len(initialState), len(timeSamplePoints)), dtype=float)
+        y[:, 0] = initialState
+        if len(timeSamplePoints) == 1:
+            return self.GetResult(timeSamplePoints, y, 0, "The solver successfully reached the end of the integration interval.", {})
+
+        boundaries = self.GetBoundaries(len(timeSamplePoints))
+        slices = [timeSamplePoints[boundaries[n]:boundaries[n + 1] + 1] for n in range(0, len(boundaries) - 1)]
+        specification = self.differentialSystem.GetSpecification().Replace(integrationMethod=self.fineMethod, denseOutput=False,
+                                                                           storeTimeSamples=True, steadyStateTolerance=0.0)
+        statistics = {'nfev': 0, 'njev': 0, 'nlu': 0}
+
+        # Initial coarse sweep
+        start = time.perf_counter()
+        starts = [numpy.array(initialState, dtype=float)]
+        coarse = []
+        for sliceTimes in slices:
+            coarse.append(self.Coarse(sliceTimes, starts[-1]))
+            if coarse[-1] is None:
+                return self.GetResult(timeSamplePoints[:1], y[:, :1], -1, "The coarse propagator did not converge at t = " + str(sliceTimes[-1]), statistics)
+            starts.append(coarse[-1])
+        self.criticalPathSeconds = time.perf_counter() - start
+
+        fine = [None] * len(slices)
+        fineStarts = [None] * len(slices)
+        workers = self.numberOfWorkers or min(len(slices), os.cpu_count())
+        with ProcessPoolExecutor(max_workers=workers, initializer=InitializeWorker, initargs=(specification.ToDictionary(),)) as executor:
+            for self.iterations in range(1, len(slices) + 1):
+                # Fine solves of every slice whose start changed, in parallel
+                futures = {n: executor.submit(FineSolve, slices[n], starts[n]) for n in range(0, len(slices))
+                           if fineStarts[n] is None or not numpy.array_equal(fineStarts[n], starts[n])}
+                fineSeconds = 0.0
+                for n, future in futures.items():
+                    fine[n] = future.result()
+                    fineStarts[n] = starts[n]
+                    fineSeconds = max(fineSeconds, fine[n].seconds)
+                    for name in statistics:
+                        statistics[name] += fine[n][name]
+                    if fine[n].status != 0:
+                        return self.GetResult(timeSamplePoints[:1], y[:, :1], -1, "The fine propagator failed on slice " + str(n) + ": " + str(fine[n].message), statistics)
+
+                # Serial correction sweep
+                start = time.perf_counter()
+                change = 0.0
+                for n in range(0, len(slices)):
+                    newCoarse = self.Coarse(slices[n], starts[n])
+                    if newCoarse is None:
+                        return self.GetResult(timeSamplePoints[:1], y[:, :1], -1, "The coarse propagator did not converge at t = " + str(slices[n][-1]), statistics)
+                    newStart = newCoarse + fine[n].y[:, -1] - coarse[n]
+                    coarse[n] = newCoarse
+                    change = max(change, numpy.max(numpy.abs(newStart - starts[n + 1]) / (1.0 + numpy.abs(newStart))))
+                    starts[n + 1] = newStart
+                self.criticalPathSeconds += fineSeconds + time.perf_counter() - start
+
+                if change <= self.tolerance:
+                    break
+
+        for n in range(0, len(slices)):
+            y[:, boundaries[n] + 1:boundaries[n + 1] + 1] = fine[n].y[:, 1:]
+        return self.GetResult(timeSamplePoints, y, 0, "The solver successfully reached the end of the integration interval.", statistics)
+
+
+    def GetResult(self, t, y, status, message, statistics):
+        coarseStatistics = self.coarseIntegrator.newtonSolver.GetStatistics()
+        statistics = {name: statistics.get(name, 0) + coarseStatistics.get(name, 0) for name in ['nfev', 'njev', 'nlu']}
+        return OptimizeResult(t=t, y=y, sol=None, t_events=None, y_events=None, status=status, message=message, success=status >= 0,
+                              iterations=self.iterations, criticalPathSeconds=self.criticalPathSeconds, **statistics)
@@ -0,0 +1,113 @@
+import numpy
+from scipy.linalg import solve_banded
+from scipy.optimize import OptimizeResult
+from BoundaryConditions.FixedValueBoundaryConditions import LeftFixedValueBoundaryCondition, RightFixedValueBoundaryCondition
+
+
+# Solves F(y) = 0 for the steady state of the ODE system directly instead of integrating until the transient dies out.
+# Fixed value boundary rows have F = 0 and an empty Jacobian row, so they are replaced by y = their initial value.
+# For a linear PDE F(y) = J y + b, and one banded solve gives the steady state. Otherwise Newton's method is used with
+# pseudo-transient continuation: every iteration solves
+#   (I / tau - J) delta = F(y)
+# which is a backward Euler step of pseudo time step tau. tau grows as the residual falls (switched evolution relaxation,
+# tau *= |F_old| / |F_new|) until the iteration is plain Newton, shrinks when a step increases the residual, and is cut
+# tenfold when a step produces non-finite values.
+class SteadyStateSolver:
+    # Local Variables
+    differentialSystem = None
+    tolerance = None
+    maximumIterations = None
+    initialPseudoTimeStep = None
+    maximumPseudoTimeStep = 1.0e8  # Beyond this 1 / tau is negligible next to J and plain Newton is used
+    numberOfRightHandSideEvaluations = 0
+    numberOfJacobianEvaluations = 0
+    numberOfLinearSolves = 0
+
+
+    # initialPseudoTimeStep defaults to the system's deltaT, tolerance applies to the Newton update relative to 1 + max|y|
+    def __init__(self, differentialSystem, tolerance=1.0e-10, maximumIterations=200, initialPseudoTimeStep=None):
+        self.differentialSystem = differentialSystem
+        self.tolerance = tolerance
+        self.maximumIterations = maximumIterations
+        self.initialPseudoTimeStep = differentialSystem.deltaT if initialPseudoTimeStep is None else initialPseudoTimeStep
+
+
+    # Indices of the rows held by fixed value boundaries. Ensembles store members one after the other, so every member contributes.
+    def GetFixedRows(self, length):
+        n = len(self.differentialSystem.xSamplePoints)
+        rows = []
+        if self.differentialSystem.leftBoundaryCondition.name == LeftFixedValueBoundaryCondition.name:
+            rows.append(numpy.arange(0, length, n))
+        if self.differentialSystem.rightBoundaryCondition.name == RightFixedValueBoundaryCondition.name:
+            rows.append(numpy.arange(n - 1, length, n))
+        return numpy.concatenate(rows) if rows else numpy.zeros(0, dtype=int)
+
+
+    def GetResidual(self, t, y):
+        self.numberOfRightHandSideEvaluations += 1
+        return self.differentialSystem.GenerateOrdinaryDifferentialEquationSystem(t, y)
+
+
+    # Returns delta solving (shift - J) delta = residual with the fixed value rows replaced by delta = 0
+    def GetUpdate(self, t, y, residual, shift, fixedRows):
+        bands = self.differentialSystem.GenerateJacobianBands(t, y)
+        self.numberOfJacobianEvaluations += 1
+        bands *= -1.0
+        halfBandwidth = bands.shape[0] // 2
+        bands[halfBandwidth] += shift
+        bands[halfBandwidth, fixedRows] = 1.0
+        residual[fixedRows] = 0.0
+        self.numberOfLinearSolves += 1
+        return solve_banded((halfBandwidth, halfBandwidth), bands, residual, overwrite_ab=True, check_finite=False)
+
+
+    # Returns (y, converged, iterations) starting from guess. The fixed value boundaries keep their values from guess.
+    def Solve(self, t, guess):
+        y = numpy.array(guess, dtype=float)
+        fixedRows = self.GetFixedRows(len(y))
+        residual = self.GetResidual(t, y)
+
+        if self.differentialSystem.IsLinear():
+            y += self.GetUpdate(t, y, residual, 0.0, fixedRows)
+            return y, True, 1
+
+        pseudoTimeStep = self.initialPseudoTimeStep
+        residualNorm = numpy.max(numpy.abs(residual))
+        for iteration in range(1, self.maximumIterations + 1):
+            shift = 0.0 if pseudoTimeStep is None else 1.0 / pseudoTimeStep
+            delta = self.GetUpdate(t, y, residual, shift, fixedRows)
+            newResidual = self.GetResidual(t, y + delta)
+            newResidualNorm = numpy.max(numpy.abs(newResidual))
+
+            # Reject steps that blow up and retry with a smaller pseudo time step
+            if not numpy.isfinite(newResidualNorm):
+                pseudoTimeStep = 0.1 * (self.initialPseudoTimeStep if pseudoTimeStep is None else pseudoTimeStep)
+                continue
+
+            y += delta
+            if pseudoTimeStep is None and numpy.max(numpy.abs(delta)) <= self.tolerance * (1.0 + numpy.max(numpy.abs(y))):
+                return y, True, iteration
+
+            if pseudoTimeStep is not None:
+                pseudoTimeStep *= residualNorm / max(newResidualNorm, numpy.finfo(float).tiny)
+                if pseudoTimeStep >= self.maximumPseudoTimeStep:
+                    pseudoTimeStep = None
+            residual = newResidual
+            residualNorm = newResidualNorm
+
+        return y, False, self.maximumIterations
+
+
+    # Returns a solve_ivp style result holding initialState at the first entry of timeSamplePoints and the steady state at the
+    # last. The times in between are not computed.
+    def Integrate(self, timeSamplePoints, initialState):
+        t = numpy.array([timeSamplePoints[0], timeSamplePoints[-1]], dtype=float)
+        y, converged, iterations = self.Solve(t[-1], initialState)
+        if converged:
+            status, message = 0, "The steady state solve converged in " + str(iterations) + " iterations."
+        else:
+            status, message = -1, "The steady state solve did not converge in " + str(iterations) + " iterations."
+
+        return OptimizeResult(t=t, y=numpy.stack([numpy.asarray(initialState, dtype=float), y], axis=1), sol=None, t_events=None, y_events=None,
+                              status=status, message=message, success=converged, nit=iterations, nfev=self.numberOfRightHandSideEvaluations,
+                              njev=self.numberOfJacobianEvaluations, nlu=self.numberOfLinearSolves)
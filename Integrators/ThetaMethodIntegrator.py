@@ -0,0 +1,55 @@
+import numpy
+from scipy.optimize import OptimizeResult
+from Integrators.NewtonSolver import NewtonSolver
+
+
+# Fixed-step theta method: y[n + 1] = y[n] + h * (theta * f(t[n + 1], y[n + 1]) + (1 - theta) * f(t[n], y[n])).
+# theta = 0.5 is Crank-Nicolson (second order), theta = 1 is backward Euler (first order, L-stable).
+# Every interval between output times is covered by the given number of equal substeps.
+class ThetaMethodIntegrator:
+    # Local Variables
+    differentialSystem = None
+    theta = None
+    substeps = None
+    newtonSolver = None
+
+
+    def __init__(self, differentialSystem, theta=0.5, substeps=1):
+        if not 0.0 < theta <= 1.0:
+            raise ValueError("theta must be in (0, 1], got " + str(theta))
+
+        self.differentialSystem = differentialSystem
+        self.theta = theta
+        self.substeps = int(substeps)
+        self.newtonSolver = NewtonSolver(differentialSystem)
+
+
+    # Integrates from initialState at timeSamplePoints[0] and returns a solve_ivp style result with y at every timeSamplePoints entry
+    def Integrate(self, timeSamplePoints, initialState):
+        timeSamplePoints = numpy.asarray(timeSamplePoints, dtype=float)
+        y = numpy.empty((len(initialState), len(timeSamplePoints)), dtype=float)
+        y[:, 0] = initialState
+
+        state = numpy.array(initialState, dtype=float)
+        t = timeSamplePoints[0]
+        f = self.differentialSystem.GenerateOrdinaryDifferentialEquationSystem(t, state)
+        self.newtonSolver.numberOfRightHandSideEvaluations += 1
+
+        for k in range(1, len(timeSamplePoints)):
+            h = (timeSamplePoints[k] - timeSamplePoints[k - 1]) / self.substeps
+            for substep in range(0, self.substeps):
+                tNext = timeSamplePoints[k - 1] + (substep + 1) * h
+                constant = state + (1.0 - self.theta) * h * f
+                state, f, converged = self.newtonSolver.Solve(tNext, state, constant, self.theta * h)
+                if not converged:
+                    return self.GetResult(timeSamplePoints[:k], y[:, :k], -1, "Newton iteration did not converge at t = " + str(tNext))
+                f = f.copy()
+
+            y[:, k] = state
+
+        return self.GetResult(timeSamplePoints, y, 0, "The solver successfully reached the end of the integration interval.")
+
+
+    def GetResult(self, t, y, status, message):
+        return OptimizeResult(t=t, y=y, sol=None, t_events=None, y_events=None, status=status, message=message, success=status >= 0,
+                              **self.newtonSolver.GetStatistics())
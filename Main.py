@@ -24,29 +24,131 @@
   python solver developed by Dr. Joseph Iannelli of Washington State University,
   USA"
 """
-import mplcursors as mplcursors
+import argparse
+import sys
 import numpy
-from matplotlib import animation
-import matplotlib.pyplot as plt
+import AnimationRenderer
+import Observables
+import SolutionStore
+from ResultCache import ResultCache
 from DifferentialSystem import DifferentialSystem
+from ProblemSpecification import ProblemSpecification
+from SolverInstrumentation import SolverInstrumentation
+# matplotlib is imported inside the plotting functions so runs that do not plot never pay for it
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Computationally solves time-dependent differential equations. '
+                                                 'Without --spec every value is prompted for and every output is produced.')
+    parser.add_argument('--spec', help='JSON or TOML problem specification file, solves without prompting')
+    parser.add_argument('--output', help='file the solution is written to (default: solution.bin or solution.txt)')
+    parser.add_argument('--format', choices=['binary', 'text'], default='binary',
+                        help='binary memory-mappable solution file (see SolutionStore) or text export (default: binary)')
+    parser.add_argument('--print', action='store_true', help='print the solution to the screen')
+    parser.add_argument('--animate', action='store_true', help='animate the solution')
+    parser.add_argument('--render', help='render the animation without a display to this .mp4, .gif or .html file')
+    parser.add_argument('--fps', type=float, default=AnimationRenderer.defaultFramesPerSecond, help='frames per second of --render (default: 30)')
+    parser.add_argument('--duration', type=float, default=AnimationRenderer.defaultDuration,
+                        help='seconds --render plays for; output times are skipped to fit (default: 10)')
+    parser.add_argument('--render-workers', type=int, default=1, help='processes --render draws frames with (default: 1)')
+    parser.add_argument('--plot', action='store_true', help='plot the starting and final values')
+    parser.add_argument('--report', help='write solver statistics and phase timings to this JSON file')
+    parser.add_argument('--progress', action='store_true', help='print solver progress every second')
+    parser.add_argument('--stream', action='store_true', help='integrate window by window straight into the binary output file, '
+                                                              'keeping memory independent of the number of output times')
+    parser.add_argument('--window', type=int, help='output times per streamed window (default: as many as fit in 64 MB)')
+    parser.add_argument('--cache', help='result cache directory; a problem solved before is loaded from it instead of being solved')
+    parser.add_argument('--checkpoint', help='checkpoint file rewritten during the solve, which --resume continues from')
+    parser.add_argument('--checkpoint-interval', type=int,
+                        help='output times between checkpoints (default: --window when streaming, otherwise a tenth of the run, at most 64 MB of output)')
+    parser.add_argument('--resume', help='continue the run saved in this checkpoint file instead of starting from --spec')
+    parser.add_argument('--end-time', type=float, help='with --resume, extend the run to this end time')
+    parser.add_argument('--observables', help='comma separated observables recorded at every output time, or "all" (options: ' + ', '.join(Observables.observables) + ')')
+    parser.add_argument('--observables-output', default='observables.csv', help='file the observables are written to (default: observables.csv)')
+    parser.add_argument('--no-field', action='store_true', help='keep only the observables: the solution is integrated window by window and '
+                                                                'never stored or written')
+    options = parser.parse_args(arguments)
+    if options.stream and options.format != 'binary':
+        parser.error('--stream writes the binary format only')
+    if options.resume is not None and options.spec is not None:
+        parser.error('--resume takes the problem from the checkpoint, --spec cannot be given as well')
+    if options.resume is not None and options.cache is not None:
+        parser.error('a resumed run starts from the checkpoint state, which the result cache key does not cover')
+    if options.end_time is not None and options.resume is None:
+        parser.error('--end-time needs --resume')
+    if options.no_field and options.observables is None:
+        parser.error('--no-field needs --observables')
+    if options.no_field and options.spec is None and options.resume is None:
+        parser.error('--no-field needs --spec or --resume, interactive runs show the solution')
+    if options.no_field and (options.stream or options.cache is not None or options.print or options.animate or options.plot or options.render is not None
+                             or options.format != 'binary' or options.output is not None):
+        parser.error('--no-field keeps no solution, so it cannot be combined with the solution outputs, --stream or --cache')
+    observableNames = None
+    if options.observables is not None:
+        try:
+            observableNames = Observables.ParseNames(options.observables)
+        except ValueError as error:
+            parser.error(str(error))
 
-
-def main():
     print()
     print('Welcome!')
     print()
 
-    # Object initialization
-    differentialSystem = DifferentialSystem()
+    # Instrumentation is only created when its output is asked for
+    instrumentation = None
+    if options.report is not None or options.progress:
+        instrumentation = SolverInstrumentation(PrintProgress if options.progress else None)
 
-    # Solve system
-    differentialSystem.SolveSystem()
+    # Object initialization
+    if options.resume is not None:
+        differentialSystem = DifferentialSystem.FromCheckpoint(options.resume, options.end_time, instrumentation)
+    elif options.spec is None:
+        differentialSystem = DifferentialSystem(instrumentation=instrumentation)
+        options.print = options.animate = options.plot = True
+    else:
+        differentialSystem = DifferentialSystem(ProblemSpecification.FromFile(options.spec), instrumentation)
+
+    # Solve system. A streamed solution is read back from its file through a memory map for the outputs below.
+    # A resumed run's outputs start at the checkpoint time. Observables are recorded from the streamed windows, or from the
+    # whole solution once it is complete.
+    recorder = None if observableNames is None else Observables.ObservableRecorder(differentialSystem, observableNames)
+    if options.no_field:
+        differentialSystem.SolveStreaming(recorder, options.checkpoint_interval or options.window, options.checkpoint)
+    elif options.stream:
+        outputPath = options.output or 'solution.bin'
+        with SolutionStore.SolutionWriter(outputPath, differentialSystem.xSamplePoints, SolutionStore.GetMetadata(differentialSystem)) as writer:
+            summary = differentialSystem.SolveStreaming(writer if recorder is None else recorder.Chain(writer), options.checkpoint_interval or options.window, options.checkpoint)
+        differentialSystem.computationalSolution = SolutionStore.ReadSolution(outputPath, summary)
+    elif options.cache is not None:
+        cache = ResultCache(options.cache)
+        if not cache.Load(differentialSystem):
+            differentialSystem.SolveSystem(options.checkpoint, options.checkpoint_interval)
+            cache.Store(differentialSystem)
+    else:
+        differentialSystem.SolveSystem(options.checkpoint, options.checkpoint_interval)
+    if recorder is not None and not (options.no_field or options.stream):
+        recorder.Append(differentialSystem.computationalSolution.t, differentialSystem.computationalSolution.y)
 
     # Output solution
-    PrintToScreen(differentialSystem)
-    PrintToFile(differentialSystem)
-    AnimateSolution(differentialSystem)
-    PlotFinalSolution(differentialSystem)
+    with differentialSystem.TimedPhase('output'):
+        if recorder is not None:
+            recorder.Write(options.observables_output)
+        if options.print:
+            PrintToScreen(differentialSystem)
+        if options.format == 'binary' and not (options.stream or options.no_field):
+            SolutionStore.WriteBinary(options.output or 'solution.bin', differentialSystem)
+        elif options.format == 'text':
+            PrintToFile(differentialSystem, options.output or 'solution.txt')
+    if options.render is not None:
+        with differentialSystem.TimedPhase('render'):
+            AnimationRenderer.RenderSolution(differentialSystem, options.render, options.fps, options.duration, numberOfWorkers=options.render_workers)
+    if options.animate:
+        AnimateSolution(differentialSystem)
+    if options.plot:
+        PlotFinalSolution(differentialSystem)
+
+    if options.report is not None:
+        instrumentation.WriteReport(options.report)
 
     print()
     print('Good bye!')
@@ -55,58 +157,27 @@ def main():
     return
 
 
-def PrintToScreen(differentialSystem):
-    # Instantiate local variables
-    number_of_rows = len(differentialSystem.computationalSolution.t)
-    number_of_columns = len(differentialSystem.computationalSolution.y)
-
-    print()
-    # Print X values along axis
-    string = ' '
-    for j in range(0, len(differentialSystem.xSamplePoints)):
-        string = string + str(differentialSystem.xSamplePoints[j]) + ' '
-
-    print(string)
-
-    # Print time followed by y values for each x at the time.
-    for i in range(number_of_rows):
-        string = str(differentialSystem.computationalSolution.t[i]) + ' '
-
-        for j in range(0, number_of_columns):
-            string = string + str(differentialSystem.computationalSolution.y[j][i]) + ' '
+def PrintProgress(progress):
+    print(f"t = {progress['t']:.6g} ({100.0 * progress.get('fraction', 0.0):.1f}%), {progress['rightHandSideEvaluations']} RHS evaluations, "
+          f"{progress['elapsedSeconds']:.1f} s", file=sys.stderr)
 
-        print(string)
 
+def PrintToScreen(differentialSystem):
+    print()
+    # Print X values along axis, then time followed by y values for each x at the time.
+    SolutionStore.WriteText(sys.stdout, differentialSystem)
 
-def PrintToFile(differentialSystem):
-    # Instantiate local variables
-    number_of_rows = len(differentialSystem.computationalSolution.t)
-    number_of_columns = len(differentialSystem.computationalSolution.y)
-
-    # Create filestream that writes to "solution.txt" file
-    fileStream = open('solution.txt', 'wt')
-
-    # Write X values along axis
-    string = ' '
-    for j in range(0, len(differentialSystem.xSamplePoints)):
-        string = string + str(differentialSystem.xSamplePoints[j]) + ' '
-    fileStream.write(string)
-    fileStream.write('\n')
-
-    # Print time followed by y values for each x at the time.
-    for i in range(number_of_rows):
-        string = str(differentialSystem.computationalSolution.t[i]) + ' '
-
-        for j in range(0, number_of_columns):
-            string = string + str(differentialSystem.computationalSolution.y[j][i]) + ' '
-
-        fileStream.write(string)
-        fileStream.write('\n')
 
-    fileStream.close()
+def PrintToFile(differentialSystem, path='solution.txt'):
+    # Create filestream that writes to the solution file
+    with open(path, 'wt') as fileStream:
+        SolutionStore.WriteText(fileStream, differentialSystem)
 
 
 def AnimateSolution(differentialSystem):
+    from matplotlib import animation
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots()
     minY = numpy.min(differentialSystem.computationalSolution.y[0:, :])
     maxY = numpy.max(differentialSystem.computationalSolution.y[0:, :])
@@ -120,10 +191,10 @@ def AnimateSolution(differentialSystem):
     precision = len(str(differentialSystem.deltaT).split('.')[-1])
 
     def update(frame):
-        ax.set(title=f't = {differentialSystem.timeSamplePoints[frame]: .{precision}f}')
+        ax.set(title=f't = {differentialSystem.computationalSolution.t[frame]: .{precision}f}')
         line1.set_ydata(differentialSystem.computationalSolution.y[0:, frame])
 
-    ani = animation.FuncAnimation(fig, update, frames = range(len(differentialSystem.timeSamplePoints)), interval=1000 * differentialSystem.deltaT)
+    ani = animation.FuncAnimation(fig, update, frames = range(len(differentialSystem.computationalSolution.t)), interval=1000 * differentialSystem.deltaT)
     # mplcursors.cursor()
     #ani.save('animation.html', writer='html')
     plt.show()
@@ -131,6 +202,8 @@ def AnimateSolution(differentialSystem):
     return
 
 def PlotFinalSolution(differentialSystem):
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots()
     minY = numpy.min(differentialSystem.computationalSolution.y[0:, :])
     maxY = numpy.max(differentialSystem.computationalSolution.y[0:, :])
@@ -144,10 +217,11 @@ def PlotFinalSolution(differentialSystem):
     ax.plot(x, y, label = 'Steady State')
 
     precision = len(str(differentialSystem.deltaT).split('.')[-1])
-    ax.set(title=f't = {len(differentialSystem.computationalSolution.t) * differentialSystem.deltaT: .{precision}f}', xlabel='Point on rod', ylabel='Value')
+    ax.set(title=f't = {differentialSystem.computationalSolution.t[-1]: .{precision}f}', xlabel='Point on rod', ylabel='Value')
     plt.legend()
     plt.show()
 
 # -------------------------------------------------------
-main()
+if __name__ == '__main__':
+    main()
 # -------------------------------------------------------
\ No newline at end of file
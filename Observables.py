@@ -0,0 +1,136 @@
+import numpy
+
+
+# Scalar series evaluated at every output time while a system is solved, so that consumers who only need a few numbers per
+# time never hold the full field (see ObservableRecorder). Every observable is a function (differentialSystem, state) that
+# returns one value per row of state, which holds one output time per row and one sample point per column. For an ensemble
+# (see EnsembleSystem) state is shaped (times, members, points), with the members on the axis that its (members, 1)
+# parameters broadcast against, and the values are (times, members).
+# Further observables are added with RegisterObservable.
+observables = {}
+
+
+def RegisterObservable(name):
+    def Register(function):
+        observables[name] = function
+        return function
+    return Register
+
+
+# Integral of the solution over the sample points by the trapezoidal rule
+@RegisterObservable('totalHeat')
+def TotalHeat(differentialSystem, state):
+    spacing = numpy.diff(differentialSystem.xSamplePoints)
+    weights = numpy.zeros(len(differentialSystem.xSamplePoints))
+    weights[:-1] += 0.5 * spacing
+    weights[1:] += 0.5 * spacing
+    return state @ weights
+
+
+@RegisterObservable('maximum')
+def Maximum(differentialSystem, state):
+    return numpy.max(state, axis=-1)
+
+
+@RegisterObservable('maximumLocation')
+def MaximumLocation(differentialSystem, state):
+    return differentialSystem.xSamplePoints[numpy.argmax(state, axis=-1)]
+
+
+@RegisterObservable('minimum')
+def Minimum(differentialSystem, state):
+    return numpy.min(state, axis=-1)
+
+
+@RegisterObservable('minimumLocation')
+def MinimumLocation(differentialSystem, state):
+    return differentialSystem.xSamplePoints[numpy.argmin(state, axis=-1)]
+
+
+# Boundary fluxes are alpha times the inward derivative at the end, the quantity a heat flux boundary sets, and are positive
+# when heat leaves through that end: d totalHeat / dt = -(leftFlux + rightFlux) without lateral cooling. A heat flux end
+# returns its flux, a cooling end its cooling law and a fixed value end a one-sided difference (see the boundary GetFlux methods).
+@RegisterObservable('leftFlux')
+def LeftFlux(differentialSystem, state):
+    return differentialSystem.leftBoundaryCondition.GetFlux(state)
+
+
+@RegisterObservable('rightFlux')
+def RightFlux(differentialSystem, state):
+    return differentialSystem.rightBoundaryCondition.GetFlux(state)
+
+
+def CheckNames(names):
+    unknownNames = [name for name in names if name not in observables]
+    if unknownNames:
+        raise ValueError("Unknown observables: " + ", ".join(unknownNames) + " (options: " + ", ".join(observables) + ")")
+    return names
+
+
+# Returns the observable names in a comma separated list, every registered one for "all"
+def ParseNames(text):
+    return CheckNames(list(observables) if text.strip() == 'all' else [name.strip() for name in text.split(',') if name.strip()])
+
+
+# Sink for DifferentialSystem.SolveStreaming that evaluates the named observables on every window and keeps only the series.
+# The field is dropped unless another sink is chained behind the recorder, which then receives every window unchanged.
+# Ensemble windows hold every member's points one after the other, and give one series column per member.
+class ObservableRecorder:
+    # Local Variables
+    differentialSystem = None
+    names = None
+    sink = None
+    times = None
+    values = None
+
+
+    def __init__(self, differentialSystem, names=None):
+        self.differentialSystem = differentialSystem
+        self.names = CheckNames(list(observables) if names is None else list(names))
+        self.times = []
+        self.values = {name: [] for name in self.names}
+
+
+    # Passes every window on to sink as well, either an object with an Append(t, y) method or a function. Returns the recorder.
+    def Chain(self, sink):
+        self.sink = sink
+        return self
+
+
+    # Evaluates the observables at output times t from the solution columns y (shaped like solve_ivp's y: points x times)
+    def Append(self, t, y):
+        t = numpy.atleast_1d(t)
+        state = numpy.asarray(y).reshape(-1, len(self.differentialSystem.xSamplePoints), len(t)).transpose(2, 0, 1)
+        if getattr(self.differentialSystem, 'numberOfMembers', None) is None:
+            state = state[:, 0, :]
+        self.times.append(numpy.array(t, dtype=float))
+        for name in self.names:
+            self.values[name].append(numpy.array(observables[name](self.differentialSystem, state), dtype=float))
+
+        if self.sink is not None:
+            (self.sink.Append if hasattr(self.sink, 'Append') else self.sink)(t, y)
+
+
+    # Returns a dictionary holding the output times under 't' and every observable's series under its name
+    def GetSeries(self):
+        series = {'t': numpy.concatenate(self.times) if self.times else numpy.zeros(0)}
+        for name in self.names:
+            series[name] = numpy.concatenate(self.values[name]) if self.values[name] else numpy.zeros(0)
+        return series
+
+
+    # Writes the series as comma separated columns with a header row. Ensemble series have a column per member, name[member].
+    def Write(self, path):
+        series = self.GetSeries()
+        header = []
+        for name, values in series.items():
+            header += [name] if values.ndim == 1 else [name + "[" + str(i) + "]" for i in range(0, values.shape[1])]
+        numpy.savetxt(path, numpy.column_stack(list(series.values())), delimiter=',', header=','.join(header), comments='')
+
+
+# Solves the system window by window (see DifferentialSystem.IterateSolution) keeping only the named observables, every
+# registered one by default, and returns their series (see ObservableRecorder.GetSeries)
+def SolveObservables(differentialSystem, names=None, windowSize=None):
+    recorder = ObservableRecorder(differentialSystem, names)
+    differentialSystem.SolveStreaming(recorder, windowSize)
+    return recorder.GetSeries()
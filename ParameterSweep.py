@@ -0,0 +1,161 @@
+import argparse
+import itertools
+import json
+from concurrent.futures import ProcessPoolExecutor
+import numpy
+from DifferentialSystem import DifferentialSystem
+from ProblemSpecification import ProblemSpecification
+from ResultCache import ResultCache
+
+
+# Solves one point of a sweep and returns its time and solution arrays, going through the result cache in cacheDirectory when given.
+# Defined at module level so that worker processes can unpickle it.
+def SolvePoint(specification, cacheDirectory=None):
+    if cacheDirectory is None:
+        differentialSystem = DifferentialSystem(specification)
+        differentialSystem.SolveSystem()
+    else:
+        differentialSystem = ResultCache(cacheDirectory).Solve(specification)
+
+    solution = differentialSystem.computationalSolution
+    if not solution.success:
+        raise RuntimeError(solution.message)
+
+    return numpy.asarray(solution.t), numpy.array(solution.y)
+
+
+# Results of a parameter sweep, keyed by parameter tuple in the order of parameterNames
+class SweepResult:
+    # Local Variables
+    parameterNames = None
+    points = None
+    solutions = None
+    errors = None
+
+
+    def __init__(self, parameterNames, points):
+        self.parameterNames = tuple(parameterNames)
+        self.points = list(points)
+        self.solutions = {}
+        self.errors = {}
+
+
+    # Returns (t, y) for a point, or None if the point failed
+    def GetSolution(self, point):
+        return self.solutions.get(tuple(point))
+
+
+    # Stacks every solution into one (points, x, t) array. Failed points are filled with NaN.
+    def Stack(self):
+        if not self.solutions:
+            raise ValueError("No point of the sweep was solved")
+
+        shapes = {y.shape for t, y in self.solutions.values()}
+        if len(shapes) != 1:
+            raise ValueError("Solutions do not share a grid and cannot be stacked: " + str(sorted(shapes)))
+
+        t = next(iter(self.solutions.values()))[0]
+        stackedY = numpy.full((len(self.points),) + shapes.pop(), numpy.nan)
+        for i in range(0, len(self.points)):
+            if self.points[i] in self.solutions:
+                stackedY[i] = self.solutions[self.points[i]][1]
+
+        return t, stackedY
+
+
+    # Writes the stacked solutions to a .npz file. Row i of points and y belong to the same parameter tuple. The points are kept
+    # as JSON text, since sweep values need not be numbers (for example integrationMethod); Load restores them.
+    def Save(self, path):
+        t, stackedY = self.Stack()
+        errorMessages = [self.errors.get(point, "") for point in self.points]
+        numpy.savez(path, parameterNames=numpy.array(self.parameterNames), points=numpy.array(json.dumps(self.points)),
+                    t=t, y=stackedY, failed=numpy.array([point in self.errors for point in self.points]), errors=numpy.array(errorMessages))
+
+
+    # Reads a result written by Save
+    @classmethod
+    def Load(cls, path):
+        with numpy.load(path) as data:
+            result = cls(data['parameterNames'].tolist(), [tuple(point) for point in json.loads(str(data['points']))])
+            t, y = data['t'], data['y']
+            for i in range(0, len(result.points)):
+                if data['failed'][i]:
+                    result.errors[result.points[i]] = str(data['errors'][i])
+                else:
+                    result.solutions[result.points[i]] = (t, y[i])
+
+        return result
+
+
+class ParameterSweep:
+    # Local Variables
+    baseSpecification = None
+    parameterGrid = None
+    numberOfWorkers = None
+    cacheDirectory = None
+
+
+    # parameterGrid maps ProblemSpecification field names to the values to scan; every combination is solved.
+    # numberOfWorkers defaults to the number of processors. Points already in the result cache in cacheDirectory are not re-solved.
+    def __init__(self, baseSpecification, parameterGrid, numberOfWorkers=None, cacheDirectory=None):
+        unknownNames = set(parameterGrid) - set(baseSpecification.ToDictionary())
+        if unknownNames:
+            raise ValueError("Unknown sweep parameters: " + ", ".join(sorted(unknownNames)))
+
+        self.baseSpecification = baseSpecification
+        self.parameterGrid = dict(parameterGrid)
+        self.numberOfWorkers = numberOfWorkers
+        self.cacheDirectory = cacheDirectory
+
+
+    def GetParameterNames(self):
+        return tuple(self.parameterGrid)
+
+
+    def GetPoints(self):
+        return list(itertools.product(*self.parameterGrid.values()))
+
+
+    def GetSpecification(self, point):
+        return self.baseSpecification.Replace(**dict(zip(self.GetParameterNames(), point)))
+
+
+    # Solves every point on a process pool. A point that raises is recorded in the result's errors and does not stop the sweep.
+    def Run(self):
+        result = SweepResult(self.GetParameterNames(), self.GetPoints())
+
+        with ProcessPoolExecutor(max_workers=self.numberOfWorkers) as executor:
+            futures = {point: executor.submit(SolvePoint, self.GetSpecification(point), self.cacheDirectory) for point in result.points}
+
+            for point, future in futures.items():
+                try:
+                    result.solutions[point] = future.result()
+                except Exception as error:
+                    result.errors[point] = type(error).__name__ + ": " + str(error)
+
+        return result
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Solves a problem specification over a grid of parameter values.')
+    parser.add_argument('--spec', required=True, help='JSON or TOML base problem specification file')
+    parser.add_argument('--grid', required=True, help='JSON file mapping specification field names to lists of values')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: number of processors)')
+    parser.add_argument('--output', default='sweep.npz', help='file the stacked results are written to (default: sweep.npz)')
+    parser.add_argument('--cache', help='result cache directory, points solved before are loaded from it')
+    options = parser.parse_args(arguments)
+
+    with open(options.grid, 'rt') as fileStream:
+        parameterGrid = json.load(fileStream)
+
+    sweep = ParameterSweep(ProblemSpecification.FromFile(options.spec), parameterGrid, options.workers, options.cache)
+    result = sweep.Run()
+    result.Save(options.output)
+
+    print(str(len(result.solutions)) + " of " + str(len(result.points)) + " points solved")
+    for point, message in result.errors.items():
+        print("Failed " + str(dict(zip(result.parameterNames, point))) + ": " + message)
+
+
+if __name__ == '__main__':
+    main()
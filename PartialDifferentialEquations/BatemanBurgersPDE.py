@@ -1,37 +1,85 @@
+import copy
+import numpy
 import BoundaryConditions
 from BoundaryConditions.FixedValueBoundaryConditions import LeftFixedValueBoundaryCondition, RightFixedValueBoundaryCondition
+from PartialDifferentialEquations import CompiledKernels
+from PartialDifferentialEquations.FiniteDifferenceWeights import BandedProduct, CentralDifferenceWeights, DerivativeBands
 
 
 class BatemanBurgersPDE:
     # Local Variables
-    leftBoundaryConditions = []
-    rightBoundaryConditions = []
-
-    # PDE variables
-    deltaX = None
-    alpha = None
-
-
-    def __init__(self, deltaX):
+    name = "Bateman-Burgers"
+    isLinear = False
+    # Boundary condition types offered at each end; DifferentialSystem builds only the two it selects
+    leftBoundaryConditionTypes = (LeftFixedValueBoundaryCondition,)
+    rightBoundaryConditionTypes = (RightFixedValueBoundaryCondition,)
+    # PDE variables, parameterNames lists the ones read from a specification
+    parameterNames = ("alpha",)
+
+    # Per instance: deltaX and the parameters, then the grid variables set by SetGrid. The derivative bands hold the first and
+    # second derivative at the interior nodes in solve_banded layout (see FiniteDifferenceWeights.DerivativeBands). For second
+    # order, the weights are also kept as one entry per interior node for the compiled kernels. leftBoundaryDistances and
+    # rightBoundaryDistances are the distances of the four nodes nearest each end from that end, inwards, enough for the
+    # widest boundary condition row.
+    __slots__ = ("deltaX", "alpha", "xSamplePoints", "spatialOrder", "leftDeltaX", "rightDeltaX", "leftBoundaryDistances", "rightBoundaryDistances",
+                 "firstDerivativeBands", "secondDerivativeBands", "lowerWeights", "centerWeights", "upperWeights", "advectionWeights")
+
+
+    # Reads the PDE parameters from specification when one is given, otherwise prompts for them
+    def __init__(self, deltaX, specification=None):
         self.deltaX = deltaX
-        self.alpha = float(input('Enter alpha value: '))  # Future work: Add error handling
-
-
-        # Initialize boundary conditions
-        self.leftBoundaryConditions.append(LeftFixedValueBoundaryCondition(self))
-        self.rightBoundaryConditions.append(RightFixedValueBoundaryCondition(self))
+        self.leftDeltaX = deltaX
+        self.rightDeltaX = deltaX
+        self.leftBoundaryDistances = deltaX * numpy.arange(0, 4)
+        self.rightBoundaryDistances = deltaX * numpy.arange(0, 4)
+        self.xSamplePoints = None
+        self.spatialOrder = 2
+        self.firstDerivativeBands = self.secondDerivativeBands = None
+        self.lowerWeights = self.centerWeights = self.upperWeights = self.advectionWeights = None
+        if specification is None:
+            self.alpha = float(input('Enter alpha value: '))  # Future work: Add error handling
+        else:
+            self.alpha = float(specification.alpha)
+
+
+    # Sets the (possibly non-uniform) sample points the stencils are evaluated on, and optionally their order of accuracy.
+    # Boundary conditions attached to the PDE must be rebound afterwards (see DifferentialSystem.SetGrid).
+    def SetGrid(self, xSamplePoints, spatialOrder=None):
+        self.xSamplePoints = numpy.asarray(xSamplePoints, dtype=float)
+        if spatialOrder is not None:
+            self.spatialOrder = spatialOrder
+        self.firstDerivativeBands = DerivativeBands(self.xSamplePoints, 1, self.spatialOrder)
+        self.secondDerivativeBands = DerivativeBands(self.xSamplePoints, 2, self.spatialOrder)
+        if self.spatialOrder == 2:
+            self.lowerWeights, self.centerWeights, self.upperWeights = self.secondDerivativeBands[2, :-2], self.secondDerivativeBands[1, 1:-1], self.secondDerivativeBands[0, 2:]
+            self.advectionWeights = CentralDifferenceWeights(self.xSamplePoints)
+        self.leftDeltaX = self.xSamplePoints[1] - self.xSamplePoints[0]
+        self.rightDeltaX = self.xSamplePoints[-1] - self.xSamplePoints[-2]
+        self.leftBoundaryDistances = self.xSamplePoints[:4] - self.xSamplePoints[0]
+        self.rightBoundaryDistances = self.xSamplePoints[-1] - self.xSamplePoints[:-5:-1]
+        self.deltaX = float(numpy.min(numpy.diff(self.xSamplePoints)))
+
+
+    # Returns a copy with the named parameters changed. The grid arrays are shared, they are replaced rather than modified.
+    def Clone(self, **changes):
+        clone = copy.copy(self)
+        for name, value in changes.items():
+            if name not in self.parameterNames:
+                raise ValueError("Unknown " + self.name + " PDE parameter: " + name + " (options: " + ", ".join(self.parameterNames) + ")")
+            setattr(clone, name, float(value))
+        return clone
 
 
     def GetLeftBoundaryConditions(self):
-        return self.leftBoundaryConditions
+        return self.leftBoundaryConditionTypes
 
 
     def GetRightBoundaryConditions(self, leftBoundaryIndex):
         # Ensures at least one end is a fixed value boundary
         if leftBoundaryIndex == 0:
-            return self.rightBoundaryConditions
+            return self.rightBoundaryConditionTypes
         else:
-            onlyFixed = [self.rightBoundaryConditions[0]]
+            onlyFixed = self.rightBoundaryConditionTypes[:1]
             return onlyFixed
 
 
@@ -40,16 +88,71 @@ class BatemanBurgersPDE:
         return self.alpha / (self.deltaX * self.deltaX)
 
 
-    # Called to create system of ODE's out of the PDE.
+    # Called to create system of ODE's out of the PDE: -d(y^2 / 2)/dx + alpha * y''
     def ODE(self, state, i):
-        simplifiedConstants = self.alphaOverDeltaXSquared()
-        return (((state[i + 1]**2) - (state[i - 1]**2)) / (-4.0 * self.deltaX)) + (simplifiedConstants * (state[i - 1] - 2.0 * state[i] + state[i + 1]))
+        halfBandwidth = self.secondDerivativeBands.shape[0] // 2
+        value = 0.0
+        for j in range(max(0, i - halfBandwidth), min(len(state), i + halfBandwidth + 1)):
+            value += -0.5 * self.firstDerivativeBands[halfBandwidth + i - j, j] * state[j]**2 + self.alpha * self.secondDerivativeBands[halfBandwidth + i - j, j] * state[j]
+        return value
+
+
+    # Called to fill the interior of the ODE system in one pass with slice arithmetic. ODEs is a caller owned buffer written in place.
+    # Equivalent to calling ODE(state, i) for every interior node, which is kept as the reference implementation.
+    # Leading axes of state and ODEs are members of an ensemble, whose parameters are then (members, 1) arrays (see EnsembleSystem).
+    def VectorizedODE(self, state, ODEs):
+        if self.spatialOrder == 2:
+            interior = ODEs[..., 1:-1]
+            left = state[..., :-2]
+            right = state[..., 2:]
+
+            # -(y[i + 1]^2 - y[i - 1]^2) * w = (y[i - 1] - y[i + 1]) * (y[i + 1] + y[i - 1]) * w
+            numpy.subtract(left, right, out=interior)
+            interior *= right + left
+            interior *= self.advectionWeights
+            interior += self.alpha * (self.lowerWeights * left + self.centerWeights * state[..., 1:-1] + self.upperWeights * right)
+            return ODEs
+
+        # -D1 (y^2 / 2) + alpha * D2 y; the boundary rows are zero and are overwritten by the boundary conditions
+        BandedProduct(self.firstDerivativeBands, state * state, ODEs)
+        ODEs *= -0.5
+        ODEs += self.alpha * BandedProduct(self.secondDerivativeBands, state, numpy.empty_like(ODEs))
+        return ODEs
+
+
+    # Called to fill jacobian matrix with partial derivatives of ODE with respect to the state within the stencil of node i
+    def PartialDerivative(self, jacobianMatrix, state, i):
+        halfBandwidth = self.secondDerivativeBands.shape[0] // 2
+        for j in range(max(0, i - halfBandwidth), min(len(state), i + halfBandwidth + 1)):
+            jacobianMatrix[i][j] = -self.firstDerivativeBands[halfBandwidth + i - j, j] * state[j] + self.alpha * self.secondDerivativeBands[halfBandwidth + i - j, j]
 
 
-    # Called to fill jacobian matrix with partial derivatives of ODE with respect or state[i - 1], state[i], and state[i + 1]
-    def PartialDerivative(self, jacobianMatrix, state, i):
-        simplifiedConstants = self.alphaOverDeltaXSquared()
+    # Called to fill the interior rows of the banded jacobian in one pass. bands uses the scipy.linalg.solve_banded layout with
+    # half bandwidth b of FiniteDifferenceWeights.GetHalfBandwidth: bands[b + i - j, j] = J[i][j] (see HeatPDE FillJacobianBands). Column j of the
+    # advection term is the first derivative weight times -y[j].
+    # Leading axes of bands and state are members of an ensemble (see EnsembleSystem).
+    def FillJacobianBands(self, state, bands):
+        self.FillLinearJacobianBands(bands)
+        for row in range(0, bands.shape[-2]):
+            bands[..., row, :] -= self.firstDerivativeBands[row] * state
+        return bands
+
+
+    # Called to fill the interior rows of the linear part of the jacobian: the alpha diffusion term without the state**2 advection
+    def FillLinearJacobianBands(self, bands):
+        for row in range(0, bands.shape[-2]):
+            bands[..., row, :] = self.alpha * self.secondDerivativeBands[row]
+        return bands
+
+
+    # Fills the whole ODE system, boundary rows included, in one compiled pass (see CompiledKernels). One-dimensional state only.
+    def CompiledODE(self, state, ODEs, leftRow, rightRow):
+        CompiledKernels.BatemanBurgersODE(state, self.lowerWeights, self.centerWeights, self.upperWeights, self.advectionWeights, self.alpha,
+                                          leftRow, rightRow, ODEs)
+        return ODEs
+
 
-        jacobianMatrix[i][i - 1] = (state[i - 1] / (-2.0 * self.deltaX)) + simplifiedConstants
-        jacobianMatrix[i][i] = -2.0 * simplifiedConstants
-        jacobianMatrix[i][i + 1] = (state[i + 1]  / (2.0 * self.deltaX)) + simplifiedConstants
\ No newline at end of file
+    def CompiledJacobianBands(self, state, bands, leftRow, rightRow):
+        CompiledKernels.BatemanBurgersJacobianBands(state, self.lowerWeights, self.centerWeights, self.upperWeights, self.advectionWeights,
+                                                    self.alpha, leftRow, rightRow, bands)
+        return bands
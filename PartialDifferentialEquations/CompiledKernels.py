@@ -0,0 +1,89 @@
+# Numba compiled kernels that evaluate a whole ODE system, or its Jacobian bands, in a single loop over the nodes with no
+# temporary arrays. They mirror the PDE VectorizedODE and FillJacobianBands methods plus the boundary rows, which every boundary
+# condition describes with GetRowCoefficients as ODE = diagonal * y[end] + offDiagonal * y[neighbour] + constant.
+# Numba is optional and only imported by LoadNumba, which DifferentialSystem calls when the numba backend is selected, so
+# that importing the solver does not pay for it. LoadNumba replaces every kernel of this module with its compiled version;
+# without numba it returns False, the kernels stay plain Python and DifferentialSystem keeps using the NumPy methods.
+numba = None
+# None until LoadNumba has run, then whether numba could be imported
+numbaAvailable = None
+# Names of the functions LoadNumba compiles
+kernelNames = []
+
+
+def Compile(function):
+    kernelNames.append(function.__name__)
+    return function
+
+
+# Imports numba and compiles the kernels the first time it is called. Returns whether numba is available.
+def LoadNumba():
+    global numba, numbaAvailable
+    if numbaAvailable is None:
+        try:
+            import numba as numbaModule
+        except ImportError:
+            numbaAvailable = False
+            return numbaAvailable
+
+        numba = numbaModule
+        # Compilation happens at the first call, by which time the kernels calling each other see the compiled versions
+        for name in kernelNames:
+            globals()[name] = numba.njit(cache=True, nogil=True)(globals()[name])
+        numbaAvailable = True
+
+    return numbaAvailable
+
+
+@Compile
+def FillBoundaryRows(state, leftRow, rightRow, ODEs):
+    n = state.shape[0]
+    ODEs[0] = leftRow[0] * state[0] + leftRow[1] * state[1] + leftRow[2]
+    ODEs[n - 1] = rightRow[0] * state[n - 1] + rightRow[1] * state[n - 2] + rightRow[2]
+
+
+# Also clears the two padding entries of the band layout, so bands may come from numpy.empty
+@Compile
+def FillBoundaryBands(leftRow, rightRow, bands):
+    n = bands.shape[1]
+    bands[0, 0] = 0.0
+    bands[2, n - 1] = 0.0
+    bands[1, 0] = leftRow[0]
+    bands[0, 1] = leftRow[1]
+    bands[1, n - 1] = rightRow[0]
+    bands[2, n - 2] = rightRow[1]
+
+
+@Compile
+def HeatODE(state, lower, center, upper, alpha, lateralCoefficientOfCooling, lateralAmbientY, leftRow, rightRow, ODEs):
+    for i in range(1, state.shape[0] - 1):
+        secondDerivative = lower[i - 1] * state[i - 1] + center[i - 1] * state[i] + upper[i - 1] * state[i + 1]
+        ODEs[i] = alpha * secondDerivative + lateralCoefficientOfCooling * (lateralAmbientY - state[i])
+    FillBoundaryRows(state, leftRow, rightRow, ODEs)
+
+
+@Compile
+def HeatJacobianBands(lower, center, upper, alpha, lateralCoefficientOfCooling, leftRow, rightRow, bands):
+    for i in range(1, bands.shape[1] - 1):
+        bands[0, i + 1] = alpha * upper[i - 1]
+        bands[1, i] = alpha * center[i - 1] - lateralCoefficientOfCooling
+        bands[2, i - 1] = alpha * lower[i - 1]
+    FillBoundaryBands(leftRow, rightRow, bands)
+
+
+@Compile
+def BatemanBurgersODE(state, lower, center, upper, advection, alpha, leftRow, rightRow, ODEs):
+    for i in range(1, state.shape[0] - 1):
+        left = state[i - 1]
+        right = state[i + 1]
+        ODEs[i] = (left - right) * (left + right) * advection[i - 1] + alpha * (lower[i - 1] * left + center[i - 1] * state[i] + upper[i - 1] * right)
+    FillBoundaryRows(state, leftRow, rightRow, ODEs)
+
+
+@Compile
+def BatemanBurgersJacobianBands(state, lower, center, upper, advection, alpha, leftRow, rightRow, bands):
+    for i in range(1, state.shape[0] - 1):
+        bands[0, i + 1] = -2.0 * advection[i - 1] * state[i + 1] + alpha * upper[i - 1]
+        bands[1, i] = alpha * center[i - 1]
+        bands[2, i - 1] = 2.0 * advection[i - 1] * state[i - 1] + alpha * lower[i - 1]
+    FillBoundaryBands(leftRow, rightRow, bands)
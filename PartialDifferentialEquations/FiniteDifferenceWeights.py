@@ -0,0 +1,134 @@
+import numpy
+
+
+# Spatial orders of accuracy with stencils below
+supportedOrders = (2, 4)
+
+
+# Half bandwidth of the derivative and Jacobian bands of a spatial order. Centered stencils reach spatialOrder / 2 nodes
+# either side, but the one-sided closures at the ends reach spatialOrder - 1 nodes inwards: three diagonals for second
+# order, seven for fourth order (whose outermost two only hold the rows next to the ends).
+def GetHalfBandwidth(spatialOrder):
+    return spatialOrder - 1
+
+
+# Three point finite difference weights at the interior nodes of a possibly non-uniform grid.
+# With h- = x[i] - x[i - 1] and h+ = x[i + 1] - x[i]:
+#   y''(x[i]) ~ lower[i - 1] * y[i - 1] + center[i - 1] * y[i] + upper[i - 1] * y[i + 1]
+# which reduces to (y[i - 1] - 2 y[i] + y[i + 1]) / deltaX^2 on a uniform grid.
+def SecondDerivativeWeights(xSamplePoints):
+    spacing = numpy.diff(numpy.asarray(xSamplePoints, dtype=float))
+    if numpy.any(spacing <= 0.0):
+        raise ValueError("Sample points must be strictly increasing")
+
+    leftSpacing = spacing[:-1]
+    rightSpacing = spacing[1:]
+    lower = 2.0 / (leftSpacing * (leftSpacing + rightSpacing))
+    upper = 2.0 / (rightSpacing * (leftSpacing + rightSpacing))
+    return lower, -(lower + upper), upper
+
+
+# Weight w[i - 1] of the central difference y'(x[i]) ~ (y[i + 1] - y[i - 1]) * 2 * w[i - 1], that is w = 1 / (2 * (h- + h+)),
+# which is 1 / (4 deltaX) on a uniform grid
+def CentralDifferenceWeights(xSamplePoints):
+    xSamplePoints = numpy.asarray(xSamplePoints, dtype=float)
+    return 1.0 / (2.0 * (xSamplePoints[2:] - xSamplePoints[:-2]))
+
+
+# Weights w of y^(derivativeOrder)(x0) ~ sum_j w[j] y(points[j]), exact for polynomials of degree len(points) - 1.
+# With boundaryDerivative a final weight is added that multiplies y'(x0) instead of a value, which closes a stencil at a
+# heat flux or cooling boundary where the derivative is known, and the result is exact to one degree higher.
+# Leading axes of x0 and points are independent stencils, solved as a batch.
+def StencilWeights(x0, points, derivativeOrder, boundaryDerivative=False):
+    offsets = numpy.asarray(points, dtype=float) - numpy.asarray(x0, dtype=float)[..., None]
+    # Moments are taken in units of the stencil width, which keeps the matrix well conditioned on fine grids
+    scale = numpy.max(numpy.abs(offsets), axis=-1, keepdims=True)
+    offsets = offsets / scale
+
+    numberOfWeights = offsets.shape[-1] + (1 if boundaryDerivative else 0)
+    powers = numpy.arange(numberOfWeights)
+    moments = offsets[..., None, :] ** powers[:, None]
+    if boundaryDerivative:
+        # d/ds s^k at s = 0 is 1 for k = 1 and 0 otherwise
+        derivativeMoments = numpy.zeros(offsets.shape[:-1] + (numberOfWeights, 1))
+        derivativeMoments[..., 1, 0] = 1.0
+        moments = numpy.concatenate([moments, derivativeMoments], axis=-1)
+
+    # The derivativeOrder-th derivative of s^k at s = 0
+    target = numpy.zeros(offsets.shape[:-1] + (numberOfWeights, 1))
+    target[..., derivativeOrder, 0] = float(numpy.prod(numpy.arange(1, derivativeOrder + 1)))
+    weights = numpy.linalg.solve(moments, target)[..., 0] / scale ** derivativeOrder
+    if boundaryDerivative:
+        weights[..., -1] *= scale[..., 0]
+    return weights
+
+
+def CheckGrid(xSamplePoints, spatialOrder):
+    if spatialOrder not in supportedOrders:
+        raise ValueError("Unsupported spatial order: " + str(spatialOrder) + " (options: " + ", ".join(map(str, supportedOrders)) + ")")
+    if numpy.any(numpy.diff(xSamplePoints) <= 0.0):
+        raise ValueError("Sample points must be strictly increasing")
+    if len(xSamplePoints) < spatialOrder + 1:
+        raise ValueError("A spatial order of " + str(spatialOrder) + " needs at least " + str(spatialOrder + 1) + " sample points")
+
+
+# Returns the matrix of the derivativeOrder-th derivative (1 or 2) at the interior nodes in scipy.linalg.solve_banded layout,
+# bands[halfBandwidth + i - j, j] = D[i][j], with the half bandwidth of GetHalfBandwidth. The boundary rows are left zero for the
+# boundary conditions to fill.
+# The second order first derivative keeps the (y[i + 1] - y[i - 1]) / (x[i + 1] - x[i - 1]) difference of CentralDifferenceWeights.
+def DerivativeBands(xSamplePoints, derivativeOrder, spatialOrder=2):
+    xSamplePoints = numpy.asarray(xSamplePoints, dtype=float)
+    CheckGrid(xSamplePoints, spatialOrder)
+    n = len(xSamplePoints)
+    halfBandwidth = GetHalfBandwidth(spatialOrder)
+    bands = numpy.zeros((2 * halfBandwidth + 1, n), dtype=float)
+    nodes = numpy.arange(1, n - 1)
+
+    if spatialOrder == 2:
+        if derivativeOrder == 2:
+            lower, center, upper = SecondDerivativeWeights(xSamplePoints)
+        else:
+            upper = 2.0 * CentralDifferenceWeights(xSamplePoints)
+            lower, center = -upper, numpy.zeros(n - 2)
+        bands[0, 2:], bands[1, 1:-1], bands[2, :-2] = upper, center, lower
+        return bands
+
+    # Fourth order: five point centered stencils, and five point one-sided stencils at the nodes next to the ends. Those are
+    # one order lower, which does not lower the order of the solution.
+    stencils = [(nodes[1:-1], nodes[1:-1, None] + numpy.arange(-2, 3)), (nodes[:1], numpy.arange(0, 5)[None, :]),
+                (nodes[-1:], numpy.arange(n - 5, n)[None, :])]
+    for rows, columns in stencils:
+        weights = StencilWeights(xSamplePoints[rows], xSamplePoints[columns], derivativeOrder)
+        for k in range(0, columns.shape[1]):
+            bands[halfBandwidth + rows - columns[:, k], columns[:, k]] = weights[:, k]
+    return bands
+
+
+# Returns (weights, derivativeWeight) of the boundary row at a heat flux or cooling end, where the inward derivative
+# y_s = dy/ds, with s the distance from the end, is known:
+#   y''(end) ~ sum_j weights[j] * y[end +- j] + derivativeWeight * y_s(end)
+# distances are the distances of the nodes from the end, in order inwards starting with 0. spatialOrder nodes are used, so the
+# row is exact for polynomials of degree spatialOrder, one order lower than the interior, which the solution does not notice.
+# For second order this is the classic ghost node closure, 2 (y[1] - y[0]) / h^2 - 2 y_s / h.
+def BoundaryWeights(distances, spatialOrder=2):
+    numberOfNodes = spatialOrder
+    weights = StencilWeights(0.0, numpy.asarray(distances[:numberOfNodes], dtype=float), 2, boundaryDerivative=True)
+    return weights[:-1], float(weights[-1])
+
+
+# Returns D @ state for D in solve_banded layout (see DerivativeBands) into out. Leading axes of state and out are members of
+# an ensemble. Every row of out is written.
+def BandedProduct(bands, state, out):
+    halfBandwidth = bands.shape[-2] // 2
+    numpy.multiply(bands[..., halfBandwidth, :], state, out=out)
+    for offset in range(1, halfBandwidth + 1):
+        out[..., :-offset] += bands[..., halfBandwidth - offset, offset:] * state[..., offset:]
+        out[..., offset:] += bands[..., halfBandwidth + offset, :-offset] * state[..., :-offset]
+    return out
+
+
+# Returns weights . values over the last axis, keeping it with length 1. weights is one row, or one row per ensemble member.
+def RowProduct(weights, values):
+    if weights.ndim == 1:
+        return values @ weights
+    return (values * weights).sum(axis=-1, keepdims=True)
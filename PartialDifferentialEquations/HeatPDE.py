@@ -1,47 +1,89 @@
+import copy
+import numpy
 import BoundaryConditions
 from BoundaryConditions.CoolingBoundaryCondition import LeftCoolingBoundaryCondition, RightCoolingBoundaryCondition
 from BoundaryConditions.FixedValueBoundaryConditions import LeftFixedValueBoundaryCondition, RightFixedValueBoundaryCondition
 from BoundaryConditions.HeatFluxBoundaryConditions import LeftHeatFluxBoundaryCondition, RightHeatFluxBoundaryCondition
+from PartialDifferentialEquations import CompiledKernels
+from PartialDifferentialEquations.FiniteDifferenceWeights import BandedProduct, DerivativeBands
 
 
 class HeatPDE:
     # Local Variables
-    leftBoundaryConditions = []
-    rightBoundaryConditions = []
-
-    # PDE variables
-    deltaX = None
-    alpha = None
-    lateralCoefficientOfCooling = None
-    lateralAmbientY = None
-
-
-    def __init__(self, deltaX):
+    name = "Heat"
+    isLinear = True  # The ODEs are linear in the state, so the Jacobian does not depend on it
+    # Boundary condition types offered at each end; DifferentialSystem builds only the two it selects
+    leftBoundaryConditionTypes = (LeftFixedValueBoundaryCondition, LeftHeatFluxBoundaryCondition, LeftCoolingBoundaryCondition)
+    rightBoundaryConditionTypes = (RightFixedValueBoundaryCondition, RightHeatFluxBoundaryCondition, RightCoolingBoundaryCondition)
+    # PDE variables, parameterNames lists the ones read from a specification
+    parameterNames = ("alpha", "lateralCoefficientOfCooling", "lateralAmbientY")
+
+    # Per instance: deltaX and the parameters, then the grid variables set by SetGrid. secondDerivativeBands holds the second
+    # derivative at the interior nodes in solve_banded layout (see FiniteDifferenceWeights.DerivativeBands). For second order,
+    # the weights are also kept as one entry per interior node for the compiled kernels. leftBoundaryDistances and
+    # rightBoundaryDistances are the distances of the four nodes nearest each end from that end, inwards, enough for the
+    # widest boundary condition row.
+    __slots__ = ("deltaX", "alpha", "lateralCoefficientOfCooling", "lateralAmbientY", "xSamplePoints", "spatialOrder", "leftDeltaX", "rightDeltaX",
+                 "leftBoundaryDistances", "rightBoundaryDistances", "secondDerivativeBands", "lowerWeights", "centerWeights", "upperWeights")
+
+
+    # Reads the PDE parameters from specification when one is given, otherwise prompts for them
+    def __init__(self, deltaX, specification=None):
         self.deltaX = deltaX
-        self.alpha = float(input('Enter alpha value: '))  # Future work: Add error handling
-        self.lateralCoefficientOfCooling = float(input('Enter lateral coefficient of cooling value: '))  # Future work: Add error handling
-        self.lateralAmbientY = float(input('Enter temperature an infinite distance from the sample space: '))  # Future work: Add error handling
-
-        # Initialize boundary conditions
-        self.leftBoundaryConditions.append(LeftFixedValueBoundaryCondition(self))
-        self.leftBoundaryConditions.append(LeftHeatFluxBoundaryCondition(self))
-        self.leftBoundaryConditions.append(LeftCoolingBoundaryCondition(self))
-
-        self.rightBoundaryConditions.append(RightFixedValueBoundaryCondition(self))
-        self.rightBoundaryConditions.append(RightHeatFluxBoundaryCondition(self))
-        self.rightBoundaryConditions.append(RightCoolingBoundaryCondition(self))
+        self.leftDeltaX = deltaX
+        self.rightDeltaX = deltaX
+        self.leftBoundaryDistances = deltaX * numpy.arange(0, 4)
+        self.rightBoundaryDistances = deltaX * numpy.arange(0, 4)
+        self.xSamplePoints = None
+        self.spatialOrder = 2
+        self.secondDerivativeBands = None
+        self.lowerWeights = self.centerWeights = self.upperWeights = None
+        if specification is None:
+            self.alpha = float(input('Enter alpha value: '))  # Future work: Add error handling
+            self.lateralCoefficientOfCooling = float(input('Enter lateral coefficient of cooling value: '))  # Future work: Add error handling
+            self.lateralAmbientY = float(input('Enter temperature an infinite distance from the sample space: '))  # Future work: Add error handling
+        else:
+            self.alpha = float(specification.alpha)
+            self.lateralCoefficientOfCooling = float(specification.lateralCoefficientOfCooling)
+            self.lateralAmbientY = float(specification.lateralAmbientY)
+
+
+    # Sets the (possibly non-uniform) sample points the stencils are evaluated on, and optionally their order of accuracy.
+    # Boundary conditions attached to the PDE must be rebound afterwards (see DifferentialSystem.SetGrid).
+    def SetGrid(self, xSamplePoints, spatialOrder=None):
+        self.xSamplePoints = numpy.asarray(xSamplePoints, dtype=float)
+        if spatialOrder is not None:
+            self.spatialOrder = spatialOrder
+        self.secondDerivativeBands = DerivativeBands(self.xSamplePoints, 2, self.spatialOrder)
+        if self.spatialOrder == 2:
+            self.lowerWeights, self.centerWeights, self.upperWeights = self.secondDerivativeBands[2, :-2], self.secondDerivativeBands[1, 1:-1], self.secondDerivativeBands[0, 2:]
+        self.leftDeltaX = self.xSamplePoints[1] - self.xSamplePoints[0]
+        self.rightDeltaX = self.xSamplePoints[-1] - self.xSamplePoints[-2]
+        self.leftBoundaryDistances = self.xSamplePoints[:4] - self.xSamplePoints[0]
+        self.rightBoundaryDistances = self.xSamplePoints[-1] - self.xSamplePoints[:-5:-1]
+        self.deltaX = float(numpy.min(numpy.diff(self.xSamplePoints)))
+
+
+    # Returns a copy with the named parameters changed. The grid arrays are shared, they are replaced rather than modified.
+    def Clone(self, **changes):
+        clone = copy.copy(self)
+        for name, value in changes.items():
+            if name not in self.parameterNames:
+                raise ValueError("Unknown " + self.name + " PDE parameter: " + name + " (options: " + ", ".join(self.parameterNames) + ")")
+            setattr(clone, name, float(value))
+        return clone
 
 
     def GetLeftBoundaryConditions(self):
-        return self.leftBoundaryConditions
+        return self.leftBoundaryConditionTypes
 
 
     def GetRightBoundaryConditions(self, leftBoundaryIndex):
         # Ensures at least one end is a fixed value boundary
         if leftBoundaryIndex == 0:
-            return self.rightBoundaryConditions
+            return self.rightBoundaryConditionTypes
         else:
-            onlyFixed = [self.rightBoundaryConditions[0]]
+            onlyFixed = self.rightBoundaryConditionTypes[:1]
             return onlyFixed
 
 
@@ -52,15 +94,59 @@ class HeatPDE:
 
     # Called to create system of ODE's out of the PDE.
     def ODE(self, state, i):
-        simplifiedConstants = self.alphaOverDeltaXSquared()
-        return simplifiedConstants * (state[i - 1] - 2.0 * state[i] + state[i + 1]) + self.lateralCoefficientOfCooling * (self.lateralAmbientY - state[i])
+        halfBandwidth = self.secondDerivativeBands.shape[0] // 2
+        secondDerivative = 0.0
+        for j in range(max(0, i - halfBandwidth), min(len(state), i + halfBandwidth + 1)):
+            secondDerivative += self.secondDerivativeBands[halfBandwidth + i - j, j] * state[j]
+        return self.alpha * secondDerivative + self.lateralCoefficientOfCooling * (self.lateralAmbientY - state[i])
+
+
+    # Called to fill the interior of the ODE system in one pass with slice arithmetic. ODEs is a caller owned buffer written in place.
+    # Equivalent to calling ODE(state, i) for every interior node, which is kept as the reference implementation.
+    # Leading axes of state and ODEs are members of an ensemble, whose parameters are then (members, 1) arrays (see EnsembleSystem).
+    def VectorizedODE(self, state, ODEs):
+        # alpha * D2 y + k * (ambient - y); the boundary rows of D2 are zero and are overwritten by the boundary conditions
+        BandedProduct(self.secondDerivativeBands, state, ODEs)
+        interior = ODEs[..., 1:-1]
+        interior *= self.alpha
+        interior -= self.lateralCoefficientOfCooling * state[..., 1:-1]
+        interior += self.lateralCoefficientOfCooling * self.lateralAmbientY
+        return ODEs
+
+
+    # Called to fill jacobian matrix with partial derivatives of ODE with respect to the state within the stencil of node i
+    def PartialDerivative(self, jacobianMatrix, state, i):
+        halfBandwidth = self.secondDerivativeBands.shape[0] // 2
+        for j in range(max(0, i - halfBandwidth), min(len(state), i + halfBandwidth + 1)):
+            jacobianMatrix[i][j] = self.alpha * self.secondDerivativeBands[halfBandwidth + i - j, j]
+        jacobianMatrix[i][i] -= self.lateralCoefficientOfCooling
 
 
+    # Called to fill the interior rows of the banded jacobian in one pass. bands uses the scipy.linalg.solve_banded layout with
+    # half bandwidth b of FiniteDifferenceWeights.GetHalfBandwidth: bands[b + i - j, j] = J[i][j], so for second order
+    # bands[0, i + 1] = J[i][i + 1], bands[1, i] = J[i][i], bands[2, i - 1] = J[i][i - 1]
+    # Leading axes of bands and state are members of an ensemble (see EnsembleSystem).
+    def FillJacobianBands(self, state, bands):
+        halfBandwidth = self.secondDerivativeBands.shape[0] // 2
+        for row in range(0, 2 * halfBandwidth + 1):
+            bands[..., row, :] = self.alpha * self.secondDerivativeBands[row]
+        bands[..., halfBandwidth, 1:-1] -= self.lateralCoefficientOfCooling
+        return bands
+
+
+    # Called to fill the interior rows of the linear part of the jacobian. The Heat PDE is linear, so this is the whole jacobian.
+    def FillLinearJacobianBands(self, bands):
+        return self.FillJacobianBands(None, bands)
+
+
+    # Fills the whole ODE system, boundary rows included, in one compiled pass (see CompiledKernels). One-dimensional state only.
+    def CompiledODE(self, state, ODEs, leftRow, rightRow):
+        CompiledKernels.HeatODE(state, self.lowerWeights, self.centerWeights, self.upperWeights, self.alpha, self.lateralCoefficientOfCooling,
+                                self.lateralAmbientY, leftRow, rightRow, ODEs)
+        return ODEs
 
-    # Called to fill jacobian matrix with partial derivatives of ODE with respect or state[i - 1], state[i], and state[i + 1]
-    def PartialDerivative(self, jacobianMatrix, state, i):
-        simplifiedConstants = self.alphaOverDeltaXSquared()
 
-        jacobianMatrix[i][i - 1] = simplifiedConstants
-        jacobianMatrix[i][i] = simplifiedConstants * (- 2.0) - self.lateralCoefficientOfCooling
-        jacobianMatrix[i][i + 1] = simplifiedConstants
\ No newline at end of file
+    def CompiledJacobianBands(self, state, bands, leftRow, rightRow):
+        CompiledKernels.HeatJacobianBands(self.lowerWeights, self.centerWeights, self.upperWeights, self.alpha, self.lateralCoefficientOfCooling,
+                                          leftRow, rightRow, bands)
+        return bands
@@ -0,0 +1,118 @@
+import dataclasses
+import json
+import os
+from dataclasses import dataclass
+
+
+# Complete description of a problem, used to build a DifferentialSystem without prompting for input.
+# Field names match the attribute names of the objects they configure. Parameters of a boundary condition that is not
+# selected are ignored.
+@dataclass
+class ProblemSpecification:
+    # Space parameters. xSamplePoints, when given, lists strictly increasing points from 0 to 1 and replaces the numberOfPoints
+    # evenly spaced ones, for example to cluster points around a steep front.
+    numberOfPoints: int = 51
+    xSamplePoints: list = None
+    # Order of accuracy of the spatial differences: 2 (three point stencils) or 4 (five point stencils, fourth order
+    # boundary closures, at least 5 points). Fourth order reaches a given error on a much coarser grid for smooth solutions.
+    spatialOrder: int = 2
+
+    # Time parameters
+    startTime: float = 0.0
+    endTime: float = 1.0
+    deltaT: float = 0.01
+
+    # PDE: "Heat" or "Bateman-Burgers"
+    PDE: str = "Heat"
+    alpha: float = 1.0
+    lateralCoefficientOfCooling: float = 0.0  # Heat only
+    lateralAmbientY: float = 0.0  # Heat only
+
+    # Boundary conditions: "Fixed value", "Heat flux" or "Cooling". At least one end must be a fixed value.
+    leftBoundaryCondition: str = "Fixed value"
+    leftFlux: float = 0.0
+    leftCoefficientOfCooling: float = 0.0
+    leftAmbientY: float = 0.0
+    rightBoundaryCondition: str = "Fixed value"
+    rightFlux: float = 0.0
+    rightCoefficientOfCooling: float = 0.0
+    rightAmbientY: float = 0.0
+
+    # Initial condition: "Linear"
+    initialCondition: str = "Linear"
+    leftStartingY: float = 1.0
+    rightStartingY: float = 0.0
+
+    # Solver: any solve_ivp method ("Radau", "BDF", "LSODA", "RK45", ...) or one of the fixed-step integrators "Crank-Nicolson",
+    # "Theta", "BDF2" and "IMEX". Tolerances and dense output only apply to solve_ivp methods, theta and substeps only to fixed-step ones.
+    # "Steady state" solves for the steady state directly, and its solution only holds the start and end times.
+    # "Exponential" evaluates the exact solution of a linear problem (Heat with any boundary conditions) at every output time
+    # with the matrix exponential, without time stepping; its tolerances are those of the Krylov approximation on large grids.
+    # "Parareal" splits the output times into pararealSlices slices (0: one per processor) solved with Radau in parallel worker
+    # processes, corrected serially by backward Euler until the slice starts change by less than pararealTolerance (relative to
+    # 1 + |y|). It only pays off with several cores and long runs; see Integrators/PararealIntegrator. Not available for ensembles.
+    # A positive steadyStateTolerance stops solve_ivp runs early once max|dy/dt| falls below it.
+    # With storeTimeSamples off, solve_ivp runs keep only the first and last time plus the dense interpolant, which
+    # SolutionQuery evaluates at any time.
+    integrationMethod: str = "Radau"
+    absoluteTolerance: float = 1.0e-9
+    relativeTolerance: float = 1.0e-9
+    denseOutput: bool = True
+    theta: float = 0.5
+    substeps: int = 1
+    steadyStateTolerance: float = 0.0
+    storeTimeSamples: bool = True
+    pararealSlices: int = 0
+    pararealTolerance: float = 1.0e-6
+    # "numpy" or "numba" (fused compiled kernels, falls back to numpy with a warning when numba is not installed)
+    kernelBackend: str = "numpy"
+
+
+    @classmethod
+    def FromDictionary(cls, values):
+        knownNames = {field.name for field in dataclasses.fields(cls)}
+        unknownNames = set(values) - knownNames
+        if unknownNames:
+            raise ValueError("Unknown problem specification fields: " + ", ".join(sorted(unknownNames)))
+        return cls(**values)
+
+
+    # Reads a specification from a JSON or TOML (.toml) file
+    @classmethod
+    def FromFile(cls, path):
+        if os.path.splitext(path)[1].lower() == ".toml":
+            import tomllib
+            with open(path, 'rb') as fileStream:
+                return cls.FromDictionary(tomllib.load(fileStream))
+
+        with open(path, 'rt') as fileStream:
+            return cls.FromDictionary(json.load(fileStream))
+
+
+    def ToDictionary(self):
+        return dataclasses.asdict(self)
+
+
+    # Returns the specification as JSON with sorted keys, no whitespace and every field converted to its declared type, so equal
+    # problems give equal strings (for example alpha = 1 and alpha = 1.0). Used to hash specifications.
+    def ToCanonicalJSON(self):
+        values = self.ToDictionary()
+        for field in dataclasses.fields(self):
+            value = values[field.name]
+            if value is None:
+                continue
+            if field.type in (float, int, bool, str):
+                values[field.name] = field.type(value)
+            elif field.name == "xSamplePoints":
+                values[field.name] = [float(x) for x in value]
+        return json.dumps(values, sort_keys=True, separators=(',', ':'))
+
+
+    def ToFile(self, path):
+        with open(path, 'wt') as fileStream:
+            json.dump(self.ToDictionary(), fileStream, indent=4)
+
+
+    # Returns a copy with the given fields changed
+    def Replace(self, **changes):
+        return dataclasses.replace(self, **changes)
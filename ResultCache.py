@@ -0,0 +1,125 @@
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+import SolutionStore
+from DifferentialSystem import DifferentialSystem
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# Bump when a change alters the solutions of unchanged specifications, so earlier cache entries stop matching.
+# 2: lateral cooling at Heat flux and Cooling ends
+cacheFormatVersion = 2
+defaultMaximumBytes = 1024 * 1024 * 1024
+
+
+# sha256 of the canonical specification JSON (see ProblemSpecification.ToCanonicalJSON), which covers the grid, PDE, boundary
+# and initial conditions and every solver setting
+def GetKey(specification):
+    return hashlib.sha256((str(cacheFormatVersion) + specification.ToCanonicalJSON()).encode('utf-8')).hexdigest()
+
+
+# On-disk cache of solved systems, keyed by GetKey of their specification. Every entry is a binary solution file (see
+# SolutionStore) named after its key, which is memory mapped on a hit instead of being read.
+# Entries are written to a temporary file and moved into place with os.replace, so readers never see a partial entry and
+# concurrent writers of the same key simply replace each other's identical result. When the total size exceeds maximumBytes
+# the least recently used entries (oldest modification time, refreshed on every hit) are removed, under an exclusive flock
+# on the directory's .lock file where fcntl is available.
+class ResultCache:
+    # Local Variables
+    directory = None
+    maximumBytes = None
+    hits = 0
+    misses = 0
+
+
+    def __init__(self, directory, maximumBytes=defaultMaximumBytes):
+        self.directory = directory
+        self.maximumBytes = maximumBytes
+        os.makedirs(directory, exist_ok=True)
+
+
+    def GetPath(self, key):
+        return os.path.join(self.directory, key + '.bin')
+
+
+    # Sets the system's computationalSolution from the cache and returns True, or returns False when it is not cached
+    def Load(self, differentialSystem):
+        path = self.GetPath(GetKey(differentialSystem.GetSpecification()))
+        try:
+            solution = SolutionStore.ReadSolution(path, {'message': "The solution was loaded from the result cache."})
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return False
+
+        self.hits += 1
+        differentialSystem.computationalSolution = solution
+        return True
+
+
+    # Stores the solution of a solved system. Unsuccessful solutions are not cached.
+    def Store(self, differentialSystem):
+        if not differentialSystem.computationalSolution.success:
+            return
+
+        path = self.GetPath(GetKey(differentialSystem.GetSpecification()))
+        fileDescriptor, temporaryPath = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        os.close(fileDescriptor)
+        try:
+            SolutionStore.WriteBinary(temporaryPath, differentialSystem)
+            os.replace(temporaryPath, path)
+        except BaseException:
+            os.remove(temporaryPath)
+            raise
+
+        self.Evict()
+
+
+    # Builds the system for specification and loads its solution from the cache, solving and storing it on a miss
+    def Solve(self, specification, instrumentation=None):
+        differentialSystem = DifferentialSystem(specification, instrumentation)
+        if not self.Load(differentialSystem):
+            differentialSystem.SolveSystem()
+            self.Store(differentialSystem)
+        return differentialSystem
+
+
+    @contextmanager
+    def Lock(self):
+        with open(os.path.join(self.directory, '.lock'), 'a') as lockFile:
+            if fcntl is not None:
+                fcntl.flock(lockFile, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lockFile, fcntl.LOCK_UN)
+
+
+    # Removes least recently used entries until the cache fits in maximumBytes
+    def Evict(self):
+        with self.Lock():
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith('.bin'):
+                    continue
+                try:
+                    status = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((status.st_mtime, status.st_size, name))
+
+            totalBytes = sum(size for modified, size, name in entries)
+            for modified, size, name in sorted(entries):
+                if totalBytes <= self.maximumBytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+                totalBytes -= size
@@ -0,0 +1,137 @@
+from collections import OrderedDict
+import numpy
+
+
+# Evaluates a solved DifferentialSystem at arbitrary times and positions. Times go through the solver's dense interpolant
+# (computationalSolution.sol) when there is one, and otherwise through linear interpolation between the stored output times,
+# which covers the fixed-step integrators, streamed runs and solutions read back from a file. Positions are interpolated
+# linearly between xSamplePoints, matching the piecewise linear profile the finite differences assume.
+# Full time slices are kept in an LRU cache of cacheSize entries, so repeated queries at the same time are evaluated once.
+class SolutionQuery:
+    # Local Variables
+    xSamplePoints = None
+    t = None
+    y = None
+    interpolant = None
+    cacheSize = None
+    cache = None
+    cacheHits = 0
+    cacheMisses = 0
+
+
+    def __init__(self, differentialSystem, cacheSize=128):
+        solution = differentialSystem.computationalSolution
+        if solution is None:
+            raise ValueError("The system has not been solved")
+
+        self.xSamplePoints = numpy.asarray(differentialSystem.xSamplePoints, dtype=float)
+        self.t = numpy.asarray(solution.t, dtype=float)
+        self.y = solution.y
+        self.interpolant = solution.get('sol')
+        self.cacheSize = cacheSize
+        self.cache = OrderedDict()
+
+
+    # Earliest and latest time that can be queried
+    def GetTimeRange(self):
+        if self.interpolant is not None:
+            return float(self.interpolant.t_min), float(self.interpolant.t_max)
+        return float(self.t[0]), float(self.t[-1])
+
+
+    # Evaluates every sample point at the given times, returning a (points, times) array
+    def EvaluateTimes(self, times):
+        times = numpy.asarray(times, dtype=float)
+        start, end = self.GetTimeRange()
+        if numpy.any(times < start) or numpy.any(times > end):
+            raise ValueError("Query times must lie within [" + str(start) + ", " + str(end) + "]")
+
+        if self.interpolant is not None:
+            return self.interpolant(times)
+
+        # Linear interpolation between the stored output times
+        upper = numpy.clip(numpy.searchsorted(self.t, times, side='right'), 1, len(self.t) - 1)
+        lower = upper - 1
+        weight = (times - self.t[lower]) / (self.t[upper] - self.t[lower])
+        return numpy.asarray(self.y[:, lower]) * (1.0 - weight) + numpy.asarray(self.y[:, upper]) * weight
+
+
+    # Values at every sample point at time t, through the cache. The returned array is shared with the cache and read-only.
+    def TimeSlice(self, t):
+        key = float(t)
+        if key in self.cache:
+            self.cacheHits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        self.cacheMisses += 1
+        values = self.EvaluateTimes([key])[:, 0]
+        values.flags.writeable = False
+        self.Remember(key, values)
+        return values
+
+
+    def Remember(self, key, values):
+        self.cache[key] = values
+        if len(self.cache) > self.cacheSize:
+            self.cache.popitem(last=False)
+
+
+    # Returns the solution at every combination of times and positions as a (positions, times) array. Omitting x returns every
+    # sample point. Times already in the cache are reused and the rest are evaluated in one batch and cached.
+    def Evaluate(self, times, x=None):
+        times = numpy.atleast_1d(numpy.asarray(times, dtype=float))
+        uniqueTimes, inverse = numpy.unique(times, return_inverse=True)
+
+        columns = numpy.empty((len(self.xSamplePoints), len(uniqueTimes)), dtype=float)
+        missing = []
+        for k, time in enumerate(uniqueTimes.tolist()):
+            if time in self.cache:
+                self.cacheHits += 1
+                self.cache.move_to_end(time)
+                columns[:, k] = self.cache[time]
+            else:
+                missing.append(k)
+
+        if missing:
+            self.cacheMisses += len(missing)
+            columns[:, missing] = self.EvaluateTimes(uniqueTimes[missing])
+            for k in missing:
+                column = columns[:, k].copy()
+                column.flags.writeable = False
+                self.Remember(float(uniqueTimes[k]), column)
+
+        columns = columns[:, inverse.reshape(-1)]
+        if x is None:
+            return columns
+        lower, upper, weight = self.GetPositionWeights(x)
+        weight = weight[:, None]
+        return columns[lower] * (1.0 - weight) + columns[upper] * weight
+
+
+    # Returns the sample point indices on either side of every position in x and the linear interpolation weight of the upper one
+    def GetPositionWeights(self, x):
+        x = numpy.atleast_1d(numpy.asarray(x, dtype=float)).reshape(-1)
+        if numpy.any(x < self.xSamplePoints[0]) or numpy.any(x > self.xSamplePoints[-1]):
+            raise ValueError("Query positions must lie within [" + str(self.xSamplePoints[0]) + ", " + str(self.xSamplePoints[-1]) + "]")
+
+        upper = numpy.clip(numpy.searchsorted(self.xSamplePoints, x, side='right'), 1, len(self.xSamplePoints) - 1)
+        lower = upper - 1
+        return lower, upper, (x - self.xSamplePoints[lower]) / (self.xSamplePoints[upper] - self.xSamplePoints[lower])
+
+
+    # Returns the solution at the pairs (times[k], x[k]), broadcasting the two against each other
+    def EvaluatePoints(self, times, x):
+        times, x = numpy.broadcast_arrays(numpy.asarray(times, dtype=float), numpy.asarray(x, dtype=float))
+        uniqueTimes, inverse = numpy.unique(times.ravel(), return_inverse=True)
+        columns = self.Evaluate(uniqueTimes)
+
+        lower, upper, weight = self.GetPositionWeights(x)
+        inverse = inverse.reshape(-1)
+        values = columns[lower, inverse] * (1.0 - weight) + columns[upper, inverse] * weight
+        return values.reshape(times.shape)
+
+
+    # Values at position x at every stored output time, or at the given times
+    def Probe(self, x, times=None):
+        return self.Evaluate(self.t if times is None else times, [x])[0]
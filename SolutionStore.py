@@ -0,0 +1,166 @@
+import json
+import os
+import numpy
+from scipy.optimize import OptimizeResult
+
+
+# Binary solution file layout (all numbers little-endian):
+#
+#   offset 0    8 bytes    magic b'PDESOL01'
+#   offset 8    uint64     length L of the JSON header
+#   offset 16   L bytes    JSON header, space padded so the data starts on a 64 byte boundary:
+#                          {"numberOfPoints": n, "dtype": "<f8", "metadata": {...}}
+#   data        n float64  x sample points
+#   records     (n + 1) float64 per output time: t, y(x_0), ..., y(x_n-1)
+#
+# The number of records follows from the file size, so records can be appended while a run is in progress.
+# Records are stored one time per row, so a time slice is contiguous and a spatial probe is a strided read.
+magic = b'PDESOL01'
+alignment = 64
+# Upper bound on the temporary record block built by SolutionWriter.Append
+maximumBlockBytes = 64 * 1024 * 1024
+
+
+# Returns the JSON-serializable metadata stored with a solution: the problem specification plus grid spacing
+def GetMetadata(differentialSystem):
+    metadata = differentialSystem.GetSpecification().ToDictionary()
+    metadata['deltaX'] = differentialSystem.deltaX
+    return metadata
+
+
+class SolutionWriter:
+    # Local Variables
+    fileStream = None
+    numberOfPoints = None
+
+
+    def __init__(self, path, xSamplePoints, metadata=None):
+        self.numberOfPoints = len(xSamplePoints)
+        header = json.dumps({'numberOfPoints': self.numberOfPoints, 'dtype': '<f8', 'metadata': metadata or {}}).encode('utf-8')
+        headerLength = -(-(len(magic) + 8 + len(header)) // alignment) * alignment - len(magic) - 8
+        header = header.ljust(headerLength, b' ')
+
+        self.fileStream = open(path, 'wb')
+        self.fileStream.write(magic)
+        self.fileStream.write(numpy.uint64(headerLength).astype('<u8').tobytes())
+        self.fileStream.write(header)
+        numpy.asarray(xSamplePoints, dtype='<f8').tofile(self.fileStream)
+
+
+    # Appends output times t and the matching solution columns y (shaped like solve_ivp's y: points x times)
+    def Append(self, t, y):
+        t = numpy.atleast_1d(t)
+        y = numpy.asarray(y).reshape(self.numberOfPoints, len(t))
+
+        # Build and write records in blocks to bound the temporary memory used for the transpose
+        rowsPerBlock = max(1, maximumBlockBytes // (8 * (self.numberOfPoints + 1)))
+        for start in range(0, len(t), rowsPerBlock):
+            stop = min(start + rowsPerBlock, len(t))
+            records = numpy.empty((stop - start, self.numberOfPoints + 1), dtype='<f8')
+            records[:, 0] = t[start:stop]
+            records[:, 1:] = y[:, start:stop].T
+            records.tofile(self.fileStream)
+
+
+    def Close(self):
+        if self.fileStream is not None:
+            self.fileStream.close()
+            self.fileStream = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exceptionType, exception, traceback):
+        self.Close()
+
+
+# Read access to a binary solution file through numpy.memmap; only the pages that are indexed are read from disk
+class SolutionFile:
+    # Local Variables
+    path = None
+    metadata = None
+    numberOfPoints = None
+    x = None
+    records = None
+
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fileStream:
+            if fileStream.read(len(magic)) != magic:
+                raise ValueError(path + " is not a binary solution file")
+            headerLength = int(numpy.frombuffer(fileStream.read(8), dtype='<u8')[0])
+            header = json.loads(fileStream.read(headerLength).decode('utf-8'))
+
+        self.metadata = header['metadata']
+        self.numberOfPoints = header['numberOfPoints']
+        xOffset = len(magic) + 8 + headerLength
+        recordsOffset = xOffset + 8 * self.numberOfPoints
+        numberOfRecords = (os.path.getsize(path) - recordsOffset) // (8 * (self.numberOfPoints + 1))
+
+        self.x = numpy.memmap(path, dtype='<f8', mode='r', offset=xOffset, shape=(self.numberOfPoints,))
+        if numberOfRecords > 0:
+            self.records = numpy.memmap(path, dtype='<f8', mode='r', offset=recordsOffset, shape=(numberOfRecords, self.numberOfPoints + 1))
+        else:
+            self.records = numpy.empty((0, self.numberOfPoints + 1))
+
+
+    # Output times
+    @property
+    def t(self):
+        return self.records[:, 0]
+
+
+    # Solution values as a (times, points) view
+    @property
+    def y(self):
+        return self.records[:, 1:]
+
+
+    # Values at every point at output time index i
+    def TimeSlice(self, i):
+        return self.records[i, 1:]
+
+
+    # Values at every output time at point index j
+    def Probe(self, j):
+        return self.records[:, j + 1]
+
+
+# Returns a solve_ivp style result whose t and y (points x times) are memory mapped views of a binary solution file, so a
+# streamed run can be printed or plotted without loading it. status, message and success are taken from summary when given.
+def ReadSolution(path, summary=None):
+    solutionFile = SolutionFile(path)
+    solution = OptimizeResult(t=solutionFile.t, y=solutionFile.y.T, sol=None, status=0, success=True)
+    if summary is not None:
+        solution.update({name: summary[name] for name in ['status', 'message', 'success', 'nfev', 'njev', 'nlu'] if name in summary})
+    return solution
+
+
+# Writes the solution of a solved system to a binary solution file
+def WriteBinary(path, differentialSystem):
+    solution = differentialSystem.computationalSolution
+    with SolutionWriter(path, differentialSystem.xSamplePoints, GetMetadata(differentialSystem)) as writer:
+        writer.Append(solution.t, solution.y)
+
+
+# Writes the solution as text in the solution.txt layout: a row of x values, then one row per time of t followed by y values.
+# Values are converted in blocks with repr, which gives the shortest string that reads back to the same float.
+def WriteText(fileStream, differentialSystem, rowsPerBlock=256):
+    solution = differentialSystem.computationalSolution
+    xSamplePoints = numpy.asarray(differentialSystem.xSamplePoints, dtype=float)
+    rowLength = len(xSamplePoints) + 1
+
+    fileStream.write(' ' + ' '.join(map(repr, xSamplePoints.tolist())) + ' \n')
+
+    for start in range(0, len(solution.t), rowsPerBlock):
+        stop = min(start + rowsPerBlock, len(solution.t))
+        block = numpy.empty((stop - start, rowLength))
+        block[:, 0] = solution.t[start:stop]
+        block[:, 1:] = solution.y[:, start:stop].T
+
+        values = list(map(repr, block.ravel().tolist()))
+        rows = [' '.join(values[i:i + rowLength]) + ' \n' for i in range(0, len(values), rowLength)]
+        fileStream.write(''.join(rows))
@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import Observables
+from ProblemSpecification import ProblemSpecification
+from SolveServer import maximumMessageBytes
+
+
+# Client of a SolveServer. Requests may be issued concurrently over the one connection: replies are matched to them by id.
+#   client = await SolveClient.Connect('solve.sock')
+#   result = await client.Solve(specification, observables=['totalHeat'], progressCallback=print)
+#   await client.Close()
+class SolveClient:
+    # Local Variables
+    reader = None
+    writer = None
+    pending = None
+    requestIds = None
+    readerTask = None
+
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        # Request id -> (future for the final reply, callback for "accepted" and "progress" messages or None)
+        self.pending = {}
+        self.requestIds = itertools.count(1)
+        self.readerTask = asyncio.create_task(self.ReadReplies())
+
+
+    # Connects to the server's Unix socket at socketPath, or to port of 127.0.0.1 when port is given
+    @classmethod
+    async def Connect(cls, socketPath='solve.sock', port=None):
+        if port is not None:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port, limit=maximumMessageBytes)
+        else:
+            reader, writer = await asyncio.open_unix_connection(socketPath, limit=maximumMessageBytes)
+        return cls(reader, writer)
+
+
+    # Hands every reply to its request until the server closes the connection, which fails the requests still waiting
+    async def ReadReplies(self):
+        try:
+            while line := await self.reader.readline():
+                message = json.loads(line)
+                future, progressCallback = self.pending.get(message.get('id'), (None, None))
+                if future is None:
+                    continue
+                if message['type'] in ('accepted', 'progress'):
+                    if progressCallback is not None:
+                        progressCallback(message)
+                else:
+                    del self.pending[message['id']]
+                    future.set_result(message)
+            error = ConnectionError("The solve server closed the connection")
+        except Exception as readError:
+            error = readError
+
+        for future, progressCallback in self.pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self.pending.clear()
+
+
+    # Sends a request and returns the server's final reply to it
+    async def Request(self, message, progressCallback=None):
+        requestId = next(self.requestIds)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[requestId] = (future, progressCallback)
+        self.writer.write((json.dumps(dict(message, id=requestId)) + '\n').encode('utf-8'))
+        await self.writer.drain()
+        return await future
+
+
+    # Solves specification (a ProblemSpecification or its dictionary) and returns the "result" message, raising RuntimeError
+    # on an "error" reply. observables names the series to evaluate, and inline asks for the solution arrays as well.
+    async def Solve(self, specification, observables=None, inline=False, progressCallback=None):
+        if isinstance(specification, ProblemSpecification):
+            specification = specification.ToDictionary()
+        reply = await self.Request({'type': 'solve', 'specification': specification, 'observables': list(observables or []),
+                                    'inline': inline}, progressCallback)
+        if reply['type'] == 'error':
+            raise RuntimeError(reply['message'])
+        return reply
+
+
+    async def Status(self):
+        return await self.Request({'type': 'status'})
+
+
+    async def Shutdown(self):
+        return await self.Request({'type': 'shutdown'})
+
+
+    async def Close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        await self.readerTask
+
+
+def PrintProgress(path, message):
+    if message['type'] == 'accepted':
+        print(path + ": accepted" + (" (shared with an identical request in flight)" if message['shared'] else ""))
+    elif 'fraction' in message:
+        print(path + f": {100.0 * message['fraction']:.1f}% (t = {message['t']:g})")
+
+
+# Submits every specification at once and prints one line per result. Returns the exit status: 1 when any solve failed.
+async def Run(options, names):
+    client = await SolveClient.Connect(options.socket, options.port)
+    try:
+        async def SolveFile(path):
+            progressCallback = (lambda message: PrintProgress(path, message)) if options.progress else None
+            try:
+                return await client.Solve(ProblemSpecification.FromFile(path), names, options.inline, progressCallback)
+            except (RuntimeError, OSError, ValueError) as error:
+                return {'type': 'error', 'message': str(error)}
+
+        results = await asyncio.gather(*[SolveFile(path) for path in options.spec])
+        for path, result in zip(options.spec, results):
+            if result['type'] == 'error' or not result['success']:
+                print(path + ": failed: " + result['message'])
+            else:
+                print(path + ": " + ("loaded from cache" if result['cached'] else "solved") + (", shared" if result['shared'] else "")
+                      + ", " + str(result['numberOfTimes']) + " output times at " + result['path'])
+
+        if options.output is not None:
+            with open(options.output, 'wt') as fileStream:
+                json.dump([dict(result, spec=path) for path, result in zip(options.spec, results)], fileStream, indent=4)
+
+        if options.status:
+            print(json.dumps(await client.Status()))
+        if options.shutdown:
+            await client.Shutdown()
+    finally:
+        await client.Close()
+
+    return 1 if any(result['type'] == 'error' or not result['success'] for result in results) else 0
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Submits problem specifications to a running SolveServer and prints the results.')
+    parser.add_argument('--spec', nargs='*', default=[], help='JSON or TOML problem specification files, solved concurrently')
+    parser.add_argument('--socket', default='solve.sock', help='Unix socket path of the server (default: solve.sock)')
+    parser.add_argument('--port', type=int, help='connect to this port of 127.0.0.1 instead of a Unix socket')
+    parser.add_argument('--observables', help='comma separated observables to evaluate on every solution, or "all"')
+    parser.add_argument('--inline', action='store_true', help='return the solution arrays in the results instead of only the cache file path')
+    parser.add_argument('--progress', action='store_true', help='print progress messages')
+    parser.add_argument('--output', help='write the result messages to this JSON file as a list, each with its specification file under "spec"')
+    parser.add_argument('--status', action='store_true', help='print the server\'s request counts')
+    parser.add_argument('--shutdown', action='store_true', help='stop the server afterwards')
+    options = parser.parse_args(arguments)
+
+    names = None
+    if options.observables is not None:
+        try:
+            names = Observables.ParseNames(options.observables)
+        except ValueError as error:
+            parser.error(str(error))
+
+    return asyncio.run(Run(options, names))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,308 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy
+import Observables
+import SolutionStore
+from DifferentialSystem import DifferentialSystem
+from ProblemSpecification import ProblemSpecification
+from ResultCache import ResultCache, GetKey
+from SolverInstrumentation import SolverInstrumentation
+
+# Longest message line either side reads, enough for explicit xSamplePoints and inline solutions of typical runs
+maximumMessageBytes = 256 * 1024 * 1024
+
+# Queue the worker processes put (key, progress) tuples on, set by InitializeWorker
+progressQueue = None
+
+
+# Runs once in every worker process. Solves never prompt, so input is closed: a prompt raises EOFError instead of blocking.
+def InitializeWorker(queue):
+    global progressQueue
+    progressQueue = queue
+    sys.stdin = io.StringIO()
+
+
+# Solves one specification through the result cache in cacheDirectory and returns a summary of the solution, whose arrays
+# stay in the cache file at 'path' (None when the solve failed, as failed solutions are not cached).
+# Defined at module level so that worker processes can unpickle it.
+def SolveJob(specificationValues, cacheDirectory, key, progressInterval):
+    instrumentation = SolverInstrumentation(lambda progress: progressQueue.put((key, progress)), progressInterval)
+    cache = ResultCache(cacheDirectory)
+    with contextlib.redirect_stdout(io.StringIO()):
+        differentialSystem = cache.Solve(ProblemSpecification.FromDictionary(specificationValues), instrumentation)
+
+    solution = differentialSystem.computationalSolution
+    summary = {'cached': cache.hits > 0, 'status': int(solution.status), 'message': str(solution.message), 'success': bool(solution.success),
+               'path': cache.GetPath(GetKey(differentialSystem.GetSpecification())) if solution.success else None,
+               'numberOfPoints': len(differentialSystem.xSamplePoints), 'numberOfTimes': len(solution.t)}
+    for name in ['nfev', 'njev', 'nlu']:
+        summary[name] = None if solution.get(name) is None else int(solution[name])
+    return summary
+
+
+# Evaluates the named observables (see Observables) on the cached solution at path, as lists keyed by name plus 't'
+def EvaluateObservables(specification, path, names):
+    with contextlib.redirect_stdout(io.StringIO()):
+        differentialSystem = DifferentialSystem(specification)
+    solution = SolutionStore.ReadSolution(path)
+    recorder = Observables.ObservableRecorder(differentialSystem, names)
+    recorder.Append(solution.t, solution.y)
+    return {name: series.tolist() for name, series in recorder.GetSeries().items()}
+
+
+def ReadInlineSolution(path):
+    solution = SolutionStore.ReadSolution(path)
+    return numpy.asarray(solution.t).tolist(), numpy.asarray(solution.y).tolist()
+
+
+# One solve in flight, shared by every request for the same specification key
+class Job:
+    # Local Variables
+    key = None
+    future = None
+    subscribers = None
+
+
+    def __init__(self, key, future):
+        self.key = key
+        self.future = future
+        # (request id, send) of every request waiting on the job, which receive its progress messages
+        self.subscribers = []
+
+
+# Local solve service. Clients connect to a Unix socket (or a TCP port on 127.0.0.1 where Unix sockets are unavailable) and
+# exchange newline delimited JSON messages, each carrying the client's 'id' so that one connection can have several requests
+# in flight. Requests:
+#   {"type": "solve", "id": ..., "specification": {...}, "observables": [...], "inline": false}
+#   {"type": "status", "id": ...}
+#   {"type": "shutdown", "id": ...}
+# A solve is answered with an "accepted" message (with 'key' and 'shared'), "progress" messages while the solver runs (see
+# SolverInstrumentation.GetProgress) and finally a "result" message (see SolveJob, plus 'key', 'shared', the requested
+# observables and, with inline, the solution's 't' and 'y' in solve_ivp layout) or an "error" message.
+# Solves run on a pool of worker processes, so the imports are paid once per worker instead of once per run, and go through the
+# result cache in cacheDirectory: a specification solved before is loaded from it. Requests for a specification whose solve is
+# still in flight (equal GetKey) do not start another one but wait on the first and receive its progress too.
+class SolveServer:
+    # Local Variables
+    cacheDirectory = None
+    numberOfWorkers = None
+    progressInterval = None
+    jobs = None
+    executor = None
+    progressQueue = None
+    progressThread = None
+    server = None
+    connections = None
+    stopped = None
+    loop = None
+    numberOfRequests = 0
+    numberOfSharedRequests = 0
+    numberOfSolves = 0
+
+
+    # numberOfWorkers defaults to the number of processors. Progress is reported at most once every progressInterval seconds per solve.
+    def __init__(self, cacheDirectory, numberOfWorkers=None, progressInterval=0.5):
+        # Absolute, as result paths are handed to clients that may run elsewhere
+        self.cacheDirectory = os.path.abspath(cacheDirectory)
+        self.numberOfWorkers = numberOfWorkers
+        self.progressInterval = progressInterval
+        self.jobs = {}
+        self.connections = set()
+        os.makedirs(cacheDirectory, exist_ok=True)
+
+
+    # Starts listening on socketPath, or on port of 127.0.0.1 when port is given, and starts the worker pool
+    async def Start(self, socketPath=None, port=None):
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+
+        context = multiprocessing.get_context()
+        self.progressQueue = context.Queue()
+        self.executor = ProcessPoolExecutor(max_workers=self.numberOfWorkers, mp_context=context, initializer=InitializeWorker,
+                                            initargs=(self.progressQueue,))
+        self.progressThread = threading.Thread(target=self.RelayProgress, daemon=True)
+        self.progressThread.start()
+
+        if port is not None:
+            self.server = await asyncio.start_server(self.HandleConnection, '127.0.0.1', port, limit=maximumMessageBytes)
+        else:
+            if os.path.exists(socketPath):
+                os.remove(socketPath)
+            self.server = await asyncio.start_unix_server(self.HandleConnection, socketPath, limit=maximumMessageBytes)
+            os.chmod(socketPath, 0o600)
+
+
+    # Returns the address clients connect to: the socket path, or the port actually bound (useful when port 0 was asked for)
+    def GetAddress(self):
+        address = self.server.sockets[0].getsockname()
+        return address[1] if isinstance(address, tuple) else address
+
+
+    # Serves until a shutdown request arrives, then stops the workers and removes the socket file
+    async def Serve(self):
+        try:
+            await self.stopped.wait()
+        finally:
+            await self.Close()
+
+
+    async def Close(self):
+        address = self.GetAddress()
+        self.server.close()
+        # Connections still open would otherwise keep wait_closed waiting
+        for writer in list(self.connections):
+            writer.close()
+        await self.server.wait_closed()
+        await self.loop.run_in_executor(None, self.executor.shutdown)
+        self.progressQueue.put(None)
+        self.progressThread.join()
+        if isinstance(address, str) and os.path.exists(address):
+            os.remove(address)
+
+
+    # Runs on its own thread: hands progress from the worker processes over to the event loop until the None sentinel arrives
+    def RelayProgress(self):
+        while True:
+            item = self.progressQueue.get()
+            if item is None:
+                return
+            self.loop.call_soon_threadsafe(self.DispatchProgress, *item)
+
+
+    def DispatchProgress(self, key, progress):
+        job = self.jobs.get(key)
+        if job is None:
+            return
+        for requestId, send in job.subscribers:
+            self.loop.create_task(send(dict(progress, type='progress', id=requestId)))
+
+
+    async def HandleConnection(self, reader, writer):
+        lock = asyncio.Lock()
+
+        async def Send(message):
+            async with lock:
+                try:
+                    writer.write((json.dumps(message) + '\n').encode('utf-8'))
+                    await writer.drain()
+                except ConnectionError:
+                    # The client went away; the solve carries on for other requests and the result cache
+                    pass
+
+        tasks = set()
+        self.connections.add(writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError as error:
+                    await Send({'type': 'error', 'id': None, 'message': "Invalid JSON request: " + str(error)})
+                    continue
+                task = asyncio.create_task(self.HandleRequest(request, Send))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            # Answer what the client already asked for before closing its side
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+
+    async def HandleRequest(self, request, send):
+        requestId = request.get('id') if isinstance(request, dict) else None
+        try:
+            match request.get('type'):
+                case 'solve':
+                    await self.HandleSolve(request, send)
+                case 'status':
+                    await send(dict(self.GetStatus(), type='status', id=requestId))
+                case 'shutdown':
+                    await send({'type': 'shutdown', 'id': requestId})
+                    self.stopped.set()
+                case other:
+                    raise ValueError("Unknown request type: " + str(other) + " (options: solve, status, shutdown)")
+        except Exception as error:
+            await send({'type': 'error', 'id': requestId, 'message': type(error).__name__ + ": " + str(error)})
+
+
+    async def HandleSolve(self, request, send):
+        requestId = request.get('id')
+        specification = ProblemSpecification.FromDictionary(request.get('specification', {}))
+        names = Observables.CheckNames(list(request.get('observables') or []))
+        key = GetKey(specification)
+        self.numberOfRequests += 1
+
+        job = self.jobs.get(key)
+        shared = job is not None
+        if shared:
+            self.numberOfSharedRequests += 1
+        else:
+            self.numberOfSolves += 1
+            future = self.loop.run_in_executor(self.executor, SolveJob, specification.ToDictionary(), self.cacheDirectory, key, self.progressInterval)
+            job = self.jobs[key] = Job(key, future)
+            future.add_done_callback(lambda finished: self.jobs.pop(key, None))
+
+        subscriber = (requestId, send)
+        job.subscribers.append(subscriber)
+        await send({'type': 'accepted', 'id': requestId, 'key': key, 'shared': shared})
+        try:
+            summary = await asyncio.shield(job.future)
+        finally:
+            if subscriber in job.subscribers:
+                job.subscribers.remove(subscriber)
+
+        result = dict(summary, type='result', id=requestId, key=key, shared=shared)
+        if summary['path'] is not None:
+            if names:
+                result['observables'] = await self.loop.run_in_executor(None, EvaluateObservables, specification, summary['path'], names)
+            if request.get('inline'):
+                result['t'], result['y'] = await self.loop.run_in_executor(None, ReadInlineSolution, summary['path'])
+        await send(result)
+
+
+    def GetStatus(self):
+        return {'inFlight': len(self.jobs), 'requests': self.numberOfRequests, 'sharedRequests': self.numberOfSharedRequests,
+                'solves': self.numberOfSolves, 'workers': self.numberOfWorkers or os.cpu_count()}
+
+
+async def Run(options):
+    server = SolveServer(options.cache, options.workers, options.progress_interval)
+    await server.Start(options.socket, options.port)
+    print("Listening on " + (("127.0.0.1:" + str(server.GetAddress())) if options.port is not None else server.GetAddress()), flush=True)
+    await server.Serve()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Serves problem solves to local clients over a Unix socket or a localhost port (see SolveClient).')
+    parser.add_argument('--socket', default='solve.sock', help='Unix socket path to listen on (default: solve.sock)')
+    parser.add_argument('--port', type=int, help='listen on this port of 127.0.0.1 instead of a Unix socket (0 picks a free port)')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: number of processors)')
+    parser.add_argument('--cache', default='solve-cache', help='result cache directory solutions are kept in (default: solve-cache)')
+    parser.add_argument('--progress-interval', type=float, default=0.5, help='seconds between progress messages of a solve (default: 0.5)')
+    options = parser.parse_args(arguments)
+
+    if options.port is None and not hasattr(asyncio, 'start_unix_server'):
+        parser.error("Unix sockets are not available on this platform, use --port")
+
+    asyncio.run(Run(options))
+
+
+if __name__ == '__main__':
+    main()
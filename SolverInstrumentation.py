@@ -0,0 +1,108 @@
+import json
+import time
+from contextlib import contextmanager
+import numpy
+
+
+# Opt-in runtime statistics for a DifferentialSystem: evaluation counts, phase timings and accepted step sizes.
+# progressCallback, when given, is called with a progress dictionary at most once every progressInterval seconds of wall time.
+class SolverInstrumentation:
+    # Local Variables
+    rightHandSideEvaluations = 0
+    jacobianEvaluations = 0
+    phaseSeconds = None
+    solverStatistics = None
+    stepTimes = None
+    timeRange = None
+    progressCallback = None
+    progressInterval = None
+    solveStartTime = None
+    lastProgressTime = None
+
+
+    def __init__(self, progressCallback=None, progressInterval=1.0):
+        self.phaseSeconds = {}
+        self.solverStatistics = {}
+        self.progressCallback = progressCallback
+        self.progressInterval = progressInterval
+
+
+    # Times the body of a with statement and adds it to the named phase
+    @contextmanager
+    def Phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phaseSeconds[name] = self.phaseSeconds.get(name, 0.0) + time.perf_counter() - start
+
+
+    # Called before integration starts
+    def StartSolve(self, timeRange):
+        self.timeRange = (float(timeRange[0]), float(timeRange[1]))
+        self.solveStartTime = time.perf_counter()
+        self.lastProgressTime = self.solveStartTime
+
+
+    # Called on every right hand side evaluation, reports progress when the interval has elapsed
+    def RecordRightHandSide(self, t):
+        self.rightHandSideEvaluations += 1
+
+        if self.progressCallback is not None:
+            now = time.perf_counter()
+            if now - self.lastProgressTime >= self.progressInterval:
+                self.lastProgressTime = now
+                self.progressCallback(self.GetProgress(t, now))
+
+
+    def RecordJacobian(self):
+        self.jacobianEvaluations += 1
+
+
+    # Called with the solve_ivp result once integration finishes
+    def RecordSolution(self, solution):
+        for name in ['nfev', 'njev', 'nlu']:
+            if name in solution:
+                self.solverStatistics[name] = int(solution[name])
+
+        # Accepted steps are only known through the dense output interpolant
+        if solution.get('sol') is not None:
+            self.stepTimes = numpy.asarray(solution.sol.ts)
+
+
+    def GetProgress(self, t, now=None):
+        now = time.perf_counter() if now is None else now
+        progress = {'t': float(t), 'elapsedSeconds': now - self.solveStartTime, 'rightHandSideEvaluations': self.rightHandSideEvaluations,
+                    'jacobianEvaluations': self.jacobianEvaluations}
+        if self.timeRange is not None and self.timeRange[1] > self.timeRange[0]:
+            progress['fraction'] = (float(t) - self.timeRange[0]) / (self.timeRange[1] - self.timeRange[0])
+        return progress
+
+
+    # Returns every statistic as a JSON-serializable dictionary
+    def Report(self):
+        report = {
+            'rightHandSideEvaluations': self.rightHandSideEvaluations,
+            'jacobianEvaluations': self.jacobianEvaluations,
+            'solverStatistics': dict(self.solverStatistics),
+            'phaseSeconds': dict(self.phaseSeconds),
+            'steps': None,
+        }
+
+        if self.stepTimes is not None and len(self.stepTimes) > 1:
+            stepSizes = numpy.diff(self.stepTimes)
+            report['steps'] = {
+                'count': len(stepSizes),
+                'minimum': float(stepSizes.min()),
+                'maximum': float(stepSizes.max()),
+                'mean': float(stepSizes.mean()),
+                'times': self.stepTimes[1:].tolist(),
+                'sizes': stepSizes.tolist(),
+            }
+
+        return report
+
+
+    def WriteReport(self, path):
+        with open(path, 'wt') as fileStream:
+            json.dump(self.Report(), fileStream, indent=4)
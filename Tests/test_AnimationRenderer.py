@@ -0,0 +1,56 @@
+import numpy
+import pytest
+import AnimationRenderer
+
+pytest.importorskip("matplotlib")
+Image = pytest.importorskip("PIL.Image")
+
+
+# A front that moves across 500 points over 301 output times, decimated to 12 frames of at most 100 points
+def GetSolution():
+    x = numpy.linspace(0.0, 1.0, 500)
+    t = numpy.linspace(0.0, 1.0, 301)
+    return x, t, numpy.tanh(20.0 * (x[:, None] - 0.2 - 0.6 * t[None, :]))
+
+
+@pytest.mark.parametrize("numberOfWorkers", [1, 2])
+def test_RenderGIF(tmp_path, numberOfWorkers):
+    x, t, y = GetSolution()
+    path = str(tmp_path / "solution.gif")
+    numberOfFrames = AnimationRenderer.RenderAnimation(path, x, t, y, framesPerSecond=4, duration=3.0, maximumPoints=100, numberOfWorkers=numberOfWorkers,
+                                                       figureSize=(3.2, 2.4), dpi=50)
+    assert numberOfFrames == 12
+    with Image.open(path) as image:
+        assert image.n_frames == numberOfFrames
+        assert image.size == (160, 120)
+
+
+@pytest.mark.parametrize("numberOfWorkers", [1, 2])
+def test_RenderHTML(tmp_path, numberOfWorkers):
+    x, t, y = GetSolution()
+    path = tmp_path / "solution.html"
+    numberOfFrames = AnimationRenderer.RenderAnimation(str(path), x, t, y, framesPerSecond=4, duration=3.0, maximumPoints=100, numberOfWorkers=numberOfWorkers,
+                                                       figureSize=(3.2, 2.4), dpi=50)
+    assert path.read_text().count('"data:image/png;base64,') == numberOfFrames
+
+
+# Adaptive meshes give one column of sample points per output time
+def test_RenderPerFrameSamplePoints(tmp_path):
+    x, t, y = GetSolution()
+    meshes = x[:, None] ** (1.0 + t[None, :])
+    path = str(tmp_path / "solution.gif")
+    numberOfFrames = AnimationRenderer.RenderAnimation(path, meshes, t, y, framesPerSecond=4, duration=3.0, maximumPoints=100, figureSize=(3.2, 2.4), dpi=50)
+    with Image.open(path) as image:
+        assert image.n_frames == numberOfFrames
+
+
+# Frames differ as the front moves, and the line is drawn over the cached background
+def test_FramesShowTheSolution():
+    x, t, y = GetSolution()
+    renderer = AnimationRenderer.FrameRenderer((0.0, 1.0), (-1.0, 1.0), figureSize=(3.2, 2.4), dpi=50)
+    empty = renderer.Render([], [], '')
+    first = renderer.Render(x, y[:, 0], 't = 0')
+    last = renderer.Render(x, y[:, -1], 't = 1')
+    assert first.shape == (120, 160, 4)
+    assert not numpy.array_equal(first, empty)
+    assert not numpy.array_equal(first, last)
@@ -0,0 +1,28 @@
+import numpy
+import Checkpoint
+from DifferentialSystem import DifferentialSystem
+from ProblemSpecification import ProblemSpecification
+
+
+# Without a checkpoint interval a run that fits in one window still writes checkpointsPerRun checkpoints, and joining the
+# windows gives the solution of a run without checkpoints
+def test_DefaultIntervalWritesPeriodicCheckpoints(tmp_path, monkeypatch):
+    specification = ProblemSpecification(numberOfPoints=51, endTime=1.0, deltaT=0.01)
+    reference = DifferentialSystem(specification).SolveSystem()
+
+    times = []
+    writeCheckpoint = Checkpoint.WriteCheckpoint
+    def RecordCheckpoint(path, specification, t, *arguments):
+        times.append(float(t))
+        writeCheckpoint(path, specification, t, *arguments)
+    monkeypatch.setattr(Checkpoint, "WriteCheckpoint", RecordCheckpoint)
+
+    solution = DifferentialSystem(specification).SolveSystem(str(tmp_path / "run.npz"))
+    assert len(times) == DifferentialSystem.checkpointsPerRun
+    numpy.testing.assert_allclose(times, numpy.linspace(0.1, 1.0, 10))
+    numpy.testing.assert_allclose(solution.y, reference.y, atol=1e-12)
+
+    # The last checkpoint extends the run
+    extension = DifferentialSystem.FromCheckpoint(str(tmp_path / "run.npz"), endTime=2.0)
+    assert extension.timeSamplePoints[0] == 1.0
+    numpy.testing.assert_array_equal(extension.initialState, solution.y[:, -1])
@@ -0,0 +1,9 @@
+import pytest
+from EnsembleSystem import EnsembleSystem
+from ProblemSpecification import ProblemSpecification
+
+
+def test_PararealIsRejected():
+    baseSpecification = ProblemSpecification(numberOfPoints=11, integrationMethod="Parareal")
+    with pytest.raises(ValueError, match="Parareal"):
+        EnsembleSystem.FromVariations(baseSpecification, [dict(alpha=1.0), dict(alpha=0.5)])
@@ -0,0 +1,25 @@
+import numpy
+import pytest
+import Observables
+from DifferentialSystem import DifferentialSystem
+from EnsembleSystem import EnsembleSystem
+from ProblemSpecification import ProblemSpecification
+
+
+# Members differ in alpha and in the parameters of both boundary conditions
+variations = [dict(alpha=1.0, leftFlux=0.5, rightCoefficientOfCooling=1.0), dict(alpha=0.3, leftFlux=-1.0, rightCoefficientOfCooling=3.0),
+              dict(alpha=2.0, leftFlux=0.0, rightCoefficientOfCooling=0.5)]
+
+
+# Every observable of an ensemble, one column per member, matches the one of the member solved on its own
+@pytest.mark.parametrize("leftBoundaryCondition, rightBoundaryCondition", [("Fixed value", "Fixed value"), ("Heat flux", "Fixed value"), ("Fixed value", "Cooling")])
+def test_EnsembleObservablesMatchMembers(leftBoundaryCondition, rightBoundaryCondition):
+    baseSpecification = ProblemSpecification(numberOfPoints=21, endTime=0.2, deltaT=0.05, leftBoundaryCondition=leftBoundaryCondition,
+                                             rightBoundaryCondition=rightBoundaryCondition, rightAmbientY=0.3)
+    ensembleSeries = Observables.SolveObservables(EnsembleSystem.FromVariations(baseSpecification, variations), windowSize=2)
+
+    for i, changes in enumerate(variations):
+        memberSeries = Observables.SolveObservables(DifferentialSystem(baseSpecification.Replace(**changes)))
+        for name in Observables.observables:
+            assert ensembleSeries[name].shape == (len(memberSeries['t']), len(variations))
+            numpy.testing.assert_allclose(ensembleSeries[name][:, i], memberSeries[name], atol=1e-6)
@@ -0,0 +1,112 @@
+# Checks the vectorized ODEs and banded Jacobian of DifferentialSystem against the node by node reference implementations
+# (GenerateReferenceOrdinaryDifferentialEquationSystem and GenerateDenseJacobian) for every PDE and boundary condition pairing.
+# Run from the repository root with: python -m pytest -q
+import os
+import subprocess
+import sys
+import numpy
+import pytest
+from DifferentialSystem import DifferentialSystem
+from ProblemSpecification import ProblemSpecification
+
+
+# Every boundary condition parameter and the lateral cooling are nonzero, so every term of every row is exercised
+baseSpecification = ProblemSpecification(numberOfPoints=21, alpha=0.7, lateralCoefficientOfCooling=0.3, lateralAmbientY=0.2, leftFlux=0.4,
+                                         leftCoefficientOfCooling=1.5, leftAmbientY=0.6, rightFlux=-0.8, rightCoefficientOfCooling=2.5, rightAmbientY=0.1)
+
+# (PDE, left boundary condition, right boundary condition): at least one end is a fixed value, and Bateman-Burgers only has fixed values
+pairings = [
+    ("Heat", "Fixed value", "Fixed value"),
+    ("Heat", "Fixed value", "Heat flux"),
+    ("Heat", "Fixed value", "Cooling"),
+    ("Heat", "Heat flux", "Fixed value"),
+    ("Heat", "Cooling", "Fixed value"),
+    ("Bateman-Burgers", "Fixed value", "Fixed value"),
+]
+
+
+def BuildSystem(PDE, leftBoundaryCondition, rightBoundaryCondition, **changes):
+    return DifferentialSystem(baseSpecification.Replace(PDE=PDE, leftBoundaryCondition=leftBoundaryCondition, rightBoundaryCondition=rightBoundaryCondition, **changes))
+
+
+# A smooth state plus noise, so that neither the stencils nor the nonlinear terms see a special case
+def GetState(differentialSystem, seed=0):
+    x = differentialSystem.xSamplePoints
+    return numpy.cos(3.0 * x) + 0.5 * x + 0.1 * numpy.random.default_rng(seed).standard_normal(len(x))
+
+
+@pytest.mark.parametrize("spatialOrder", [2, 4])
+@pytest.mark.parametrize("PDE, leftBoundaryCondition, rightBoundaryCondition", pairings)
+def test_VectorizedODEsMatchReference(PDE, leftBoundaryCondition, rightBoundaryCondition, spatialOrder):
+    differentialSystem = BuildSystem(PDE, leftBoundaryCondition, rightBoundaryCondition, spatialOrder=spatialOrder)
+    state = GetState(differentialSystem)
+
+    reference = differentialSystem.GenerateReferenceOrdinaryDifferentialEquationSystem(0.0, state)
+    numpy.testing.assert_allclose(differentialSystem.GenerateOrdinaryDifferentialEquationSystem(0.0, state), reference, rtol=1e-12, atol=1e-9)
+
+    # The caller owned buffer is overwritten completely
+    buffer = numpy.full(len(state), numpy.nan)
+    differentialSystem.GenerateOrdinaryDifferentialEquationSystem(0.0, state, buffer)
+    numpy.testing.assert_allclose(buffer, reference, rtol=1e-12, atol=1e-9)
+
+
+@pytest.mark.parametrize("spatialOrder", [2, 4])
+@pytest.mark.parametrize("PDE, leftBoundaryCondition, rightBoundaryCondition", pairings)
+def test_JacobianMatchesReference(PDE, leftBoundaryCondition, rightBoundaryCondition, spatialOrder):
+    differentialSystem = BuildSystem(PDE, leftBoundaryCondition, rightBoundaryCondition, spatialOrder=spatialOrder)
+    state = GetState(differentialSystem)
+
+    reference = differentialSystem.GenerateDenseJacobian(0.0, state)
+    numpy.testing.assert_allclose(differentialSystem.GenerateJacobian(0.0, state).toarray(), reference, rtol=1e-12, atol=1e-9)
+
+
+@pytest.mark.parametrize("spatialOrder", [2, 4])
+@pytest.mark.parametrize("PDE, leftBoundaryCondition, rightBoundaryCondition", pairings)
+def test_JacobianMatchesFiniteDifferences(PDE, leftBoundaryCondition, rightBoundaryCondition, spatialOrder):
+    differentialSystem = BuildSystem(PDE, leftBoundaryCondition, rightBoundaryCondition, spatialOrder=spatialOrder)
+    state = GetState(differentialSystem)
+
+    # Central differences of the reference ODEs, column by column
+    step = 1.0e-6
+    n = len(state)
+    finiteDifferences = numpy.empty((n, n))
+    for j in range(0, n):
+        offset = numpy.zeros(n)
+        offset[j] = step
+        finiteDifferences[:, j] = (differentialSystem.GenerateReferenceOrdinaryDifferentialEquationSystem(0.0, state + offset)
+                                   - differentialSystem.GenerateReferenceOrdinaryDifferentialEquationSystem(0.0, state - offset)) / (2.0 * step)
+    numpy.testing.assert_allclose(differentialSystem.GenerateJacobian(0.0, state).toarray(), finiteDifferences, rtol=1e-6, atol=1e-4)
+
+
+# The lateral cooling term of a right end row depends on the right end node alone. The state differs at the two ends and
+# only the end nodes change, so a row taking the term from another node does not match.
+@pytest.mark.parametrize("spatialOrder", [2, 4])
+@pytest.mark.parametrize("rightBoundaryCondition", ["Heat flux", "Cooling"])
+def test_RightBoundaryRowsWithLateralCooling(rightBoundaryCondition, spatialOrder):
+    differentialSystem = BuildSystem("Heat", "Fixed value", rightBoundaryCondition, spatialOrder=spatialOrder, lateralCoefficientOfCooling=5.0)
+    state = GetState(differentialSystem)
+    for leftValue, rightValue in [(3.0, -2.0), (-4.0, 1.0)]:
+        state[0], state[-1] = leftValue, rightValue
+        reference = differentialSystem.GenerateReferenceOrdinaryDifferentialEquationSystem(0.0, state)
+        ODEs = differentialSystem.GenerateOrdinaryDifferentialEquationSystem(0.0, state)
+        assert ODEs[-1] == pytest.approx(reference[-1], rel=1e-12, abs=1e-9)
+        assert differentialSystem.rightBoundaryCondition.ODE(state) == pytest.approx(ODEs[-1], rel=1e-12, abs=1e-9)
+
+
+@pytest.mark.parametrize("PDE, leftBoundaryCondition, rightBoundaryCondition", pairings)
+def test_CompiledKernelsMatchReference(PDE, leftBoundaryCondition, rightBoundaryCondition):
+    pytest.importorskip("numba")
+    differentialSystem = BuildSystem(PDE, leftBoundaryCondition, rightBoundaryCondition, kernelBackend="numba")
+    assert differentialSystem.kernelBackend == "numba"
+    state = GetState(differentialSystem)
+
+    numpy.testing.assert_allclose(differentialSystem.GenerateOrdinaryDifferentialEquationSystem(0.0, state),
+                                  differentialSystem.GenerateReferenceOrdinaryDifferentialEquationSystem(0.0, state), rtol=1e-12, atol=1e-9)
+    numpy.testing.assert_allclose(differentialSystem.GenerateJacobian(0.0, state).toarray(), differentialSystem.GenerateDenseJacobian(0.0, state),
+                                  rtol=1e-12, atol=1e-9)
+
+
+# numba is only imported once a system selects the numba backend
+def test_NumbaIsImportedLazily():
+    command = "import sys, Main; assert 'numba' not in sys.modules"
+    subprocess.run([sys.executable, "-c", command], check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
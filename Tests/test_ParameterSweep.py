@@ -0,0 +1,21 @@
+import numpy
+from ParameterSweep import SweepResult
+
+
+# Sweep values of every type a specification field takes survive Save and Load, together with the solutions and failures
+def test_SaveAndLoadKeepPointValues(tmp_path):
+    result = SweepResult(("integrationMethod", "alpha", "denseOutput"), [("Radau", 1, True), ("BDF2", 0.5, False), ("Unknown", 0.5, True)])
+    t = numpy.linspace(0.0, 1.0, 3)
+    result.solutions[result.points[0]] = (t, numpy.ones((4, 3)))
+    result.solutions[result.points[1]] = (t, 2.0 * numpy.ones((4, 3)))
+    result.errors[result.points[2]] = "ValueError: unknown method"
+    result.Save(tmp_path / "sweep.npz")
+
+    loaded = SweepResult.Load(tmp_path / "sweep.npz")
+    assert loaded.parameterNames == result.parameterNames
+    assert loaded.points == result.points
+    assert [type(value) for value in loaded.points[0]] == [str, int, bool]
+    assert loaded.errors == result.errors
+    for point, (t, y) in result.solutions.items():
+        numpy.testing.assert_array_equal(loaded.GetSolution(point)[0], t)
+        numpy.testing.assert_array_equal(loaded.GetSolution(point)[1], y)